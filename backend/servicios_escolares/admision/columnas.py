@@ -0,0 +1,124 @@
+"""
+Columnas de ``SolicitudAdmision`` copiadas de ``respuestas_json``.
+
+Los filtros y estadísticas de admisión (búsqueda por nombre, carrera de
+interés, género, edad) leían las respuestas con ``JSON_EXTRACT`` o lookups
+sobre el JSON: una pasada completa sobre la tabla por cada cifra y SQL que
+solo entendía MySQL/SQLite. ``SolicitudAdmision.save()`` copia esos datos a
+columnas con índice (``columnas_de``); lo que escribe sin ``save()``
+(``QuerySet.update``, SQL directo) se corrige con ``rellenar_columnas`` o
+``manage.py rellenar_columnas_solicitudes``.
+
+Cada columna acepta los nombres de campo de los dos formularios: el base del
+periodo (``carrera_interes``, ``genero``, ``promedio``) y el público
+(``carrera_primera_opcion``, ``sexo``, ``promedio_general``).
+"""
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from datos_academicos.busqueda import normalizar, palabras
+
+CLAVES = {
+    'carrera_interes': ('carrera_interes', 'carrera_primera_opcion'),
+    'genero': ('genero', 'sexo'),
+    'fecha_nacimiento': ('fecha_nacimiento',),
+    'promedio': ('promedio', 'promedio_general'),
+}
+
+CAMPOS_DERIVADOS = ['nombre_busqueda', 'carrera_interes', 'genero', 'fecha_nacimiento', 'promedio']
+
+# max_length de las columnas en SolicitudAdmision
+LONGITUD_NOMBRE = 300
+LONGITUD_CARRERA = 200
+LONGITUD_GENERO = 10
+
+
+def _primera(respuestas, claves):
+    for clave in claves:
+        valor = respuestas.get(clave)
+        if valor not in (None, ''):
+            return valor
+    return None
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(str(valor)[:10]) if valor else None
+    except ValueError:
+        return None
+
+
+def _promedio(valor):
+    try:
+        promedio = Decimal(str(valor).strip().replace(',', '.')) if valor not in (None, '') else None
+    except InvalidOperation:
+        return None
+    # DecimalField(max_digits=5, decimal_places=2)
+    if promedio is None or not promedio.is_finite() or not 0 <= promedio < 1000:
+        return None
+    return promedio.quantize(Decimal('0.01'))
+
+
+def columnas_de(respuestas):
+    """{columna: valor} de las columnas derivadas para unas respuestas."""
+    if not isinstance(respuestas, dict):
+        respuestas = {}
+    nombre = ' '.join(
+        str(respuestas.get(clave) or '') for clave in ('apellido_paterno', 'apellido_materno', 'nombre')
+    )
+    carrera = _primera(respuestas, CLAVES['carrera_interes'])
+    genero = _primera(respuestas, CLAVES['genero'])
+    return {
+        'nombre_busqueda': normalizar(nombre)[:LONGITUD_NOMBRE],
+        'carrera_interes': str(carrera).strip()[:LONGITUD_CARRERA] if carrera is not None else '',
+        'genero': str(genero).strip()[:LONGITUD_GENERO] if genero is not None else '',
+        'fecha_nacimiento': _fecha(_primera(respuestas, CLAVES['fecha_nacimiento'])),
+        'promedio': _promedio(_primera(respuestas, CLAVES['promedio'])),
+    }
+
+
+def rellenar_columnas(solicitudes, tamano_lote=500):
+    """
+    Recalcula las columnas derivadas de ``solicitudes`` (queryset) y guarda
+    con ``bulk_update`` las que cambiaron. Devuelve cuántas se actualizaron.
+    """
+    from servicios_escolares.cache_etiquetas import invalidar_modelo
+
+    from .models import SolicitudAdmision
+
+    actualizadas = 0
+    pendientes = []
+    filas = solicitudes.order_by('pk').values('pk', 'respuestas_json', *CAMPOS_DERIVADOS)
+    for fila in filas.iterator(chunk_size=2000):
+        columnas = columnas_de(fila['respuestas_json'])
+        if all(fila[campo] == valor for campo, valor in columnas.items()):
+            continue
+        pendientes.append(SolicitudAdmision(pk=fila['pk'], **columnas))
+        if len(pendientes) >= tamano_lote:
+            SolicitudAdmision.objects.bulk_update(pendientes, CAMPOS_DERIVADOS)
+            actualizadas += len(pendientes)
+            pendientes = []
+    if pendientes:
+        SolicitudAdmision.objects.bulk_update(pendientes, CAMPOS_DERIVADOS)
+        actualizadas += len(pendientes)
+    if actualizadas:
+        # bulk_update no envía señales: los tableros de admisión se recalculan
+        invalidar_modelo(SolicitudAdmision)
+    return actualizadas
+
+
+def filtrar_busqueda(solicitudes, busqueda):
+    """
+    Solicitudes cuyo folio, CURP o correo contienen ``busqueda``, o cuyo
+    nombre completo tiene todas sus palabras (sin acentos ni mayúsculas).
+    """
+    condicion = Q(folio__icontains=busqueda) | Q(curp__icontains=busqueda) | Q(email__icontains=busqueda)
+    buscadas = palabras(busqueda)
+    if buscadas:
+        por_nombre = Q()
+        for palabra in buscadas:
+            por_nombre &= Q(nombre_busqueda__contains=palabra)
+        condicion |= por_nombre
+    return solicitudes.filter(condicion)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from admision.columnas import rellenar_columnas
+from admision.models import PeriodoAdmision, SolicitudAdmision
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las columnas de búsqueda y estadística de las solicitudes a partir de sus respuestas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            type=int,
+            help='ID del período de admisión a procesar (opcional)',
+        )
+
+    def handle(self, *args, **options):
+        periodo_id = options.get('periodo')
+
+        solicitudes = SolicitudAdmision.objects.all()
+        if periodo_id:
+            if not PeriodoAdmision.objects.filter(pk=periodo_id).exists():
+                self.stdout.write(self.style.ERROR(f"No se encontró el período con ID: {periodo_id}"))
+                return
+            solicitudes = solicitudes.filter(periodo_id=periodo_id)
+
+        inicio = time.monotonic()
+        total = rellenar_columnas(solicitudes)
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(f"✓ Se actualizaron {total} solicitudes en {duracion:.1f} s"))
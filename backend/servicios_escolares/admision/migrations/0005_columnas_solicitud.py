@@ -0,0 +1,88 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+from admision.columnas import CAMPOS_DERIVADOS, columnas_de
+
+
+def indice_trigramas(apps, schema_editor):
+    # GIN con gin_trgm_ops: acelera nombre_busqueda LIKE '%...%' (ver columnas.py). Solo PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS admision_sol_nombre_trgm_idx '
+        'ON admision_solicitudadmision USING gin (nombre_busqueda gin_trgm_ops)'
+    )
+
+
+def quitar_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS admision_sol_nombre_trgm_idx')
+
+
+def rellenar_columnas(apps, schema_editor):
+    SolicitudAdmision = apps.get_model('admision', 'SolicitudAdmision')
+
+    pendientes = []
+    filas = SolicitudAdmision.objects.order_by('pk').values_list('pk', 'respuestas_json')
+    for pk, respuestas in filas.iterator(chunk_size=2000):
+        pendientes.append(SolicitudAdmision(pk=pk, **columnas_de(respuestas)))
+        if len(pendientes) >= 500:
+            SolicitudAdmision.objects.bulk_update(pendientes, CAMPOS_DERIVADOS)
+            pendientes = []
+    if pendientes:
+        SolicitudAdmision.objects.bulk_update(pendientes, CAMPOS_DERIVADOS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admision', '0004_solicitudestadolog_solicitudadjunto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitudadmision',
+            name='carrera_interes',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='solicitudadmision',
+            name='fecha_nacimiento',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitudadmision',
+            name='genero',
+            field=models.CharField(blank=True, default='', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='solicitudadmision',
+            name='nombre_busqueda',
+            field=models.CharField(blank=True, default='', editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='solicitudadmision',
+            name='promedio',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=5, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudadmision',
+            index=models.Index(fields=['carrera_interes'], name='admision_sol_carrera_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudadmision',
+            index=models.Index(fields=['periodo', 'carrera_interes'], name='admision_sol_per_carrera_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudadmision',
+            index=models.Index(fields=['periodo', 'genero'], name='admision_sol_per_genero_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudadmision',
+            index=models.Index(fields=['periodo', 'fecha_nacimiento'], name='admision_sol_per_nac_idx'),
+        ),
+        migrations.RunPython(indice_trigramas, quitar_indice_trigramas),
+        migrations.RunPython(rellenar_columnas, migrations.RunPython.noop),
+    ]
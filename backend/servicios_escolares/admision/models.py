@@ -8,6 +8,8 @@ import json
 import uuid
 import random
 
+from .columnas import CAMPOS_DERIVADOS, columnas_de
+
 
 class PeriodoAdmision(models.Model):
     """Modelo para gestionar los períodos de admisión anuales"""
@@ -253,11 +255,24 @@ class SolicitudAdmision(models.Model):
     ]
     estado = models.CharField(max_length=20, choices=ESTADOS, default='borrador')
     
+    # Copias de respuestas_json para filtrar y agrupar con índices (ver columnas.py)
+    nombre_busqueda = models.CharField(max_length=300, blank=True, default='', editable=False)
+    carrera_interes = models.CharField(max_length=200, blank=True, default='', editable=False)
+    genero = models.CharField(max_length=10, blank=True, default='', editable=False)
+    fecha_nacimiento = models.DateField(null=True, blank=True, editable=False)
+    promedio = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, editable=False)
+    
     class Meta:
         verbose_name = "Solicitud de Admisión"
         verbose_name_plural = "Solicitudes de Admisión"
         unique_together = ['curp', 'periodo']  # Un CURP por período
         ordering = ['-fecha_registro']
+        indexes = [
+            models.Index(fields=['carrera_interes'], name='admision_sol_carrera_idx'),
+            models.Index(fields=['periodo', 'carrera_interes'], name='admision_sol_per_carrera_idx'),
+            models.Index(fields=['periodo', 'genero'], name='admision_sol_per_genero_idx'),
+            models.Index(fields=['periodo', 'fecha_nacimiento'], name='admision_sol_per_nac_idx'),
+        ]
     
     def __str__(self):
         return f"Solicitud {self.folio} - {self.curp}"
@@ -265,8 +280,17 @@ class SolicitudAdmision(models.Model):
     def save(self, *args, **kwargs):
         if not self.folio:
             self.folio = self.generar_folio()
+        self.asignar_columnas()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'respuestas_json' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *CAMPOS_DERIVADOS}
         super().save(*args, **kwargs)
     
+    def asignar_columnas(self):
+        """Copia de ``respuestas_json`` nombre, carrera, género, fecha de nacimiento y promedio."""
+        for campo, valor in columnas_de(self.respuestas_json).items():
+            setattr(self, campo, valor)
+    
     def generar_folio(self):
         """Genera un folio único para la solicitud"""
         año = self.periodo.año
@@ -10,6 +10,7 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.db import transaction
+from django.db.models import Count, Q
 from django.urls import reverse
 from datetime import datetime
 from .models import (
@@ -17,7 +18,8 @@ from .models import (
     FichaAdmision, ConfiguracionAdmision
 )
 from .forms import FormularioDinamicoAdmision, SolicitudAdmisionForm
-from audit.models import AuditLog
+from audit.archivo import historial_objeto
+from servicios_escolares.cache_etiquetas import en_cache, registrar_etiquetas
 import re
 import json
 
@@ -236,44 +238,57 @@ def admin_visualizar_formulario(request, formulario_id):
     return render(request, 'admision/admin/visualizar_formulario.html', context)
 
 
+ETIQUETAS_TABLERO_ADMISION = registrar_etiquetas(SolicitudAdmision, FichaAdmision, PeriodoAdmision)
+
+
+def _kpis_admision(periodo_activo):
+    """Totales de solicitudes y fichas, y solicitudes por estado, en tres consultas."""
+    solicitudes = SolicitudAdmision.objects.order_by().aggregate(
+        total=Count('id'),
+        periodo_activo=Count('id', filter=Q(periodo=periodo_activo)),
+    )
+    fichas = FichaAdmision.objects.order_by().aggregate(
+        generadas=Count('id'),
+        emails_enviados=Count('id', filter=Q(email_enviado=True)),
+    )
+    por_estado = dict(SolicitudAdmision.objects.order_by().values_list('estado').annotate(count=Count('id')))
+    resumen_por_estado = {code: por_estado.get(code, 0) for code, _name in SolicitudAdmision.ESTADOS}
+    return {
+        'stats': {
+            'total_solicitudes': solicitudes['total'],
+            'solicitudes_periodo_activo': solicitudes['periodo_activo'],
+            'fichas_generadas': fichas['generadas'],
+            'emails_enviados': fichas['emails_enviados'],
+        },
+        'conteos_estados': list(resumen_por_estado.values()),
+        'resumen_por_estado': resumen_por_estado,
+    }
+
+
 @login_required(login_url='/datos_academicos/servicios/login/')
 @user_passes_test(_es_servicios_escolares, login_url='/datos_academicos/servicios/login/')
 def admin_dashboard(request):
     """Dashboard administrativo para el sistema de admisión"""
-    # Estadísticas generales
     periodo_activo = PeriodoAdmision.objects.filter(activo=True).first()
     
-    stats = {
-        'total_solicitudes': SolicitudAdmision.objects.count(),
-        'solicitudes_periodo_activo': 0,
-        'fichas_generadas': FichaAdmision.objects.count(),
-        'emails_enviados': FichaAdmision.objects.filter(email_enviado=True).count(),
-    }
-    
-    if periodo_activo:
-        stats['solicitudes_periodo_activo'] = SolicitudAdmision.objects.filter(
-            periodo=periodo_activo
-        ).count()
-    
-    # Conteo por estado para gráfica y resumen
+    # Estadísticas generales y conteo por estado: en caché hasta que cambie una
+    # solicitud, una ficha o el período activo
+    kpis = en_cache(
+        'tablero:admision', ETIQUETAS_TABLERO_ADMISION,
+        lambda: _kpis_admision(periodo_activo),
+    )
     estados = SolicitudAdmision.ESTADOS
-    conteos_estados = []
-    resumen_por_estado = {}
-    for code, _name in estados:
-        count = SolicitudAdmision.objects.filter(estado=code).count()
-        conteos_estados.append(count)
-        resumen_por_estado[code] = count
     
     # Solicitudes recientes
     solicitudes_recientes = SolicitudAdmision.objects.select_related('periodo').order_by('-fecha_registro')[:10]
     
     return render(request, 'admision/admin/dashboard.html', {
-        'stats': stats,
+        'stats': kpis['stats'],
         'periodo_activo': periodo_activo,
         'solicitudes_recientes': solicitudes_recientes,
         'estados': estados,
-        'conteos_estados': conteos_estados,
-        'resumen_por_estado': resumen_por_estado,
+        'conteos_estados': kpis['conteos_estados'],
+        'resumen_por_estado': kpis['resumen_por_estado'],
     })
 
 
@@ -338,7 +353,7 @@ def admin_ver_solicitud(request, solicitud_id):
     # Logs de auditoría asociados a esta Solicitud
     try:
         ct = ContentType.objects.get_for_model(SolicitudAdmision)
-        audit_logs = AuditLog.objects.filter(content_type=ct, object_id=str(solicitud.pk)).order_by('-created_at')[:200]
+        audit_logs = historial_objeto(ct, solicitud.pk, limite=200)
     except Exception:
         audit_logs = []
     
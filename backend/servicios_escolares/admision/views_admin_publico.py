@@ -6,7 +6,7 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db.models import Q, Count, F
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
@@ -22,7 +22,10 @@ from .models import (
     SolicitudEstadoLog, SolicitudAdjunto
 )
 from django.contrib.contenttypes.models import ContentType
-from audit.models import AuditLog
+from audit.bulk import audited_update
+from audit.archivo import historial_objeto
+from servicios_escolares.series import serie_temporal, ventana
+from .columnas import filtrar_busqueda
 from .email_utils import (
     enviar_notificacion_cambio_estado, 
     enviar_ficha_por_email,
@@ -65,24 +68,14 @@ def admin_dashboard_publico(request):
         solicitudes_recientes = solicitudes_periodo.order_by('-fecha_registro')[:10]
         
         # Estadísticas por carrera
-        stats_carrera = solicitudes_periodo.exclude(
-            respuestas_json__carrera_interes__isnull=True
-        ).extra(
-            select={'carrera': "JSON_EXTRACT(respuestas_json, '$.carrera_interes')"}
-        ).values('carrera').annotate(
+        stats_carrera = solicitudes_periodo.exclude(carrera_interes='').values(
+            carrera=F('carrera_interes')
+        ).annotate(
             count=Count('id')
         ).order_by('-count')[:10]
         
-        # Gráfico de registros por día (últimos 30 días)
-        fecha_inicio = timezone.now().date() - timedelta(days=30)
-        registros_por_dia = []
-        for i in range(30):
-            fecha = fecha_inicio + timedelta(days=i)
-            count = solicitudes_periodo.filter(fecha_registro__date=fecha).count()
-            registros_por_dia.append({
-                'fecha': fecha.strftime('%Y-%m-%d'),
-                'count': count
-            })
+        # Gráfico de registros por día (últimos 30 días, una consulta)
+        registros_por_dia = serie_temporal(solicitudes_periodo, 'fecha_registro', *ventana())
         
         # Periodos de admisión para gestión en el dashboard público
         periodos_admision = PeriodoAdmision.objects.all().order_by('-año', '-fecha_inicio')
@@ -147,14 +140,7 @@ def admin_solicitudes_publico(request):
         solicitudes = solicitudes.filter(estado=estado)
     
     if busqueda:
-        solicitudes = solicitudes.filter(
-            Q(folio__icontains=busqueda) |
-            Q(curp__icontains=busqueda) |
-            Q(email__icontains=busqueda) |
-            Q(respuestas_json__nombre__icontains=busqueda) |
-            Q(respuestas_json__apellido_paterno__icontains=busqueda) |
-            Q(respuestas_json__apellido_materno__icontains=busqueda)
-        )
+        solicitudes = filtrar_busqueda(solicitudes, busqueda)
     
     if fecha_desde:
         try:
@@ -171,10 +157,7 @@ def admin_solicitudes_publico(request):
             pass
     
     if carrera:
-        solicitudes = solicitudes.extra(
-            where=["JSON_EXTRACT(respuestas_json, '$.carrera_interes') = %s"],
-            params=[carrera]
-        )
+        solicitudes = solicitudes.filter(carrera_interes=carrera)
     
     # Paginación
     paginator = Paginator(solicitudes, 25)
@@ -185,18 +168,16 @@ def admin_solicitudes_publico(request):
     periodos = PeriodoAdmision.objects.filter(activo=True).order_by('-fecha_inicio')
     estados_choices = SolicitudAdmision.ESTADOS
     
-    # Carreras disponibles (extraer de JSON)
-    carreras_disponibles = SolicitudAdmision.objects.exclude(
-        respuestas_json__carrera_interes__isnull=True
-    ).extra(
-        select={'carrera': "JSON_EXTRACT(respuestas_json, '$.carrera_interes')"}
-    ).values_list('carrera', flat=True).distinct()
+    # Carreras disponibles
+    carreras_disponibles = SolicitudAdmision.objects.exclude(carrera_interes='').order_by(
+        'carrera_interes'
+    ).values_list('carrera_interes', flat=True).distinct()
     
     context = {
         'page_obj': page_obj,
         'periodos': periodos,
         'estados_choices': estados_choices,
-        'carreras_disponibles': sorted(set(carreras_disponibles)),
+        'carreras_disponibles': list(carreras_disponibles),
         'filtros': {
             'periodo_id': periodo_id,
             'estado': estado,
@@ -229,7 +210,7 @@ def admin_ver_solicitud_publico(request, folio):
     # Logs de auditoría asociados a esta Solicitud
     try:
         ct = ContentType.objects.get_for_model(SolicitudAdmision)
-        audit_logs = AuditLog.objects.filter(content_type=ct, object_id=str(solicitud.pk)).order_by('-created_at')[:200]
+        audit_logs = historial_objeto(ct, solicitud.pk, limite=200)
     except Exception:
         audit_logs = []
 
@@ -306,7 +287,7 @@ def admin_solicitud_detalle_json(request, folio):
     # Logs de auditoría de cambios específicos en la Solicitud
     try:
         ct = ContentType.objects.get_for_model(SolicitudAdmision)
-        audits = AuditLog.objects.filter(content_type=ct, object_id=str(solicitud.pk)).order_by('-created_at')[:200]
+        audits = historial_objeto(ct, solicitud.pk, limite=200)
         audit_items = [
             {
                 'type': 'audit',
@@ -618,46 +599,35 @@ def admin_estadisticas_avanzadas(request):
     ).order_by('estado'))
     
     # Estadísticas por género
-    stats_genero = []
-    for genero in ['M', 'F', 'Otro']:
-        count = solicitudes.extra(
-            where=["JSON_EXTRACT(respuestas_json, '$.genero') = %s"],
-            params=[genero]
-        ).count()
-        if count > 0:
-            stats_genero.append({'genero': genero, 'count': count})
+    generos = ['M', 'F', 'Otro']
+    por_genero = dict(
+        solicitudes.filter(genero__in=generos).order_by().values_list('genero').annotate(count=Count('id'))
+    )
+    stats_genero = [
+        {'genero': genero, 'count': por_genero[genero]} for genero in generos if por_genero.get(genero)
+    ]
     
-    # Estadísticas por rango de edad
-    stats_edad = []
+    # Estadísticas por rango de edad: un conteo condicional por rango en una consulta
     rangos_edad = [
         ('17-18', 17, 18),
         ('19-20', 19, 20),
         ('21-22', 21, 22),
         ('23+', 23, 100)
     ]
+    hoy = timezone.now().date()
+    conteos_edad = solicitudes.aggregate(**{
+        rango: Count('id', filter=Q(fecha_nacimiento__range=(
+            hoy - timedelta(days=(max_edad + 1) * 365),
+            hoy - timedelta(days=min_edad * 365),
+        )))
+        for rango, min_edad, max_edad in rangos_edad
+    })
+    stats_edad = [
+        {'rango': rango, 'count': conteos_edad[rango]} for rango, _, _ in rangos_edad if conteos_edad[rango]
+    ]
     
-    for rango, min_edad, max_edad in rangos_edad:
-        # Calcular fechas límite
-        fecha_max = timezone.now().date() - timedelta(days=min_edad * 365)
-        fecha_min = timezone.now().date() - timedelta(days=(max_edad + 1) * 365)
-        
-        count = solicitudes.extra(
-            where=["JSON_EXTRACT(respuestas_json, '$.fecha_nacimiento') BETWEEN %s AND %s"],
-            params=[fecha_min.strftime('%Y-%m-%d'), fecha_max.strftime('%Y-%m-%d')]
-        ).count()
-        
-        if count > 0:
-            stats_edad.append({'rango': rango, 'count': count})
-    
-    # Registros por día (últimos 30 días)
-    registros_por_dia = []
-    for i in range(30):
-        fecha = timezone.now().date() - timedelta(days=29-i)
-        count = solicitudes.filter(fecha_registro__date=fecha).count()
-        registros_por_dia.append({
-            'fecha': fecha.strftime('%Y-%m-%d'),
-            'count': count
-        })
+    # Registros por día (últimos 30 días, una consulta)
+    registros_por_dia = serie_temporal(solicitudes, 'fecha_registro', *ventana())
     
     context = {
         'periodo_actual': periodo_actual,
@@ -727,14 +697,7 @@ def admin_accion_masiva(request):
             if estado:
                 solicitudes = solicitudes.filter(estado=estado)
             if busqueda:
-                solicitudes = solicitudes.filter(
-                    Q(folio__icontains=busqueda) |
-                    Q(curp__icontains=busqueda) |
-                    Q(email__icontains=busqueda) |
-                    Q(respuestas_json__nombre__icontains=busqueda) |
-                    Q(respuestas_json__apellido_paterno__icontains=busqueda) |
-                    Q(respuestas_json__apellido_materno__icontains=busqueda)
-                )
+                solicitudes = filtrar_busqueda(solicitudes, busqueda)
             if fecha_desde:
                 try:
                     fecha_desde_dt = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
@@ -748,10 +711,7 @@ def admin_accion_masiva(request):
                 except ValueError:
                     pass
             if carrera:
-                solicitudes = solicitudes.extra(
-                    where=["JSON_EXTRACT(respuestas_json, '$.carrera_interes') = %s"],
-                    params=[carrera]
-                )
+                solicitudes = solicitudes.filter(carrera_interes=carrera)
 
         if accion == 'cambiar_estado':
             nuevo_estado = data.get('nuevo_estado')
@@ -763,14 +723,18 @@ def admin_accion_masiva(request):
             if not candidatos.exists():
                 return JsonResponse({'success': False, 'error': 'No hay solicitudes en estado aceptada para actualizar'})
 
-            actualizados = 0
             errores_envio = []
             from .email_utils import enviar_notificacion_cambio_estado
-            for s in candidatos:
+            # Un solo UPDATE auditado; las instancias leídas antes se usan para los correos
+            lista = list(candidatos)
+            actualizados = audited_update(
+                SolicitudAdmision.objects.filter(pk__in=[s.pk for s in lista]),
+                estado=nuevo_estado,
+                fecha_modificacion=timezone.now(),
+            )
+            for s in lista:
                 anterior = s.estado
                 s.estado = nuevo_estado
-                s.save()
-                actualizados += 1
                 try:
                     ok = enviar_notificacion_cambio_estado(s, anterior)
                     if not ok:
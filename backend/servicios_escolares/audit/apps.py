@@ -6,5 +6,7 @@ class AuditConfig(AppConfig):
     verbose_name = 'Auditoría'
 
     def ready(self):
-        # Importa señales para registrar cambios
+        # Modelos auditados (settings.AUDIT_MODELS) y señales que registran sus cambios
+        from .registry import cargar_desde_settings
+        cargar_desde_settings()
         from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+Archivo de la bitácora.
+
+``AuditLog`` recibe una fila por cada cambio auditado; para que la tabla no
+crezca sin límite, ``manage.py archivar_auditoria`` mueve las entradas de
+meses cerrados más antiguas que la retención a archivos JSONL comprimidos,
+uno por mes, bajo ``AUDIT_ARCHIVO_DIR``:
+
+    <AUDIT_ARCHIVO_DIR>/2024/auditlog-2024-03.jsonl.gz
+
+Los archivos solo se anexan: cada lote archivado es un miembro gzip nuevo al
+final (gzip admite miembros concatenados, así que ``zcat`` lee el mes
+completo) y se registra como ``SegmentoAuditoria`` con su offset. El índice
+``IndiceAuditoriaArchivada`` dice qué objetos aparecen en cada segmento, de
+modo que el historial de un objeto se lee descomprimiendo solo sus
+segmentos.
+
+El segmento, su índice y el borrado de las filas se confirman en una misma
+transacción después de escribir el archivo; si algo falla a la mitad queda a
+lo más un miembro huérfano en el archivo, que nadie referencia.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog, IndiceAuditoriaArchivada, SegmentoAuditoria
+
+CAMPOS = [
+    'id', 'created_at', 'action', 'content_type_id', 'object_id', 'app_label', 'model_name',
+    'changes', 'actor_id', 'actor_username', 'ip', 'request_id', 'source', 'extra',
+]
+
+# Filas por DELETE ... WHERE id IN (...)
+LOTE_BORRADO = 500
+
+
+def directorio_archivo():
+    return getattr(settings, 'AUDIT_ARCHIVO_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'archive', 'audit')
+
+
+def retencion_meses():
+    return getattr(settings, 'AUDIT_RETENCION_MESES', 12)
+
+
+def inicio_de_mes(valor):
+    """Primer día del mes (hora local) de una fecha o datetime."""
+    if isinstance(valor, datetime):
+        valor = timezone.localtime(valor).date() if timezone.is_aware(valor) else valor.date()
+    return valor.replace(day=1)
+
+
+def fecha_corte(meses, ahora=None):
+    """Inicio del mes de hace ``meses`` meses: se archiva lo anterior, siempre meses completos."""
+    hoy = timezone.localtime(ahora or timezone.now()).date()
+    total = hoy.year * 12 + hoy.month - 1 - meses
+    return timezone.make_aware(datetime(total // 12, total % 12 + 1, 1))
+
+
+def ruta_mes(mes):
+    return os.path.join(f"{mes:%Y}", f"auditlog-{mes:%Y-%m}.jsonl.gz")
+
+
+def _linea(fila):
+    fila = dict(fila)
+    fila['created_at'] = fila['created_at'].isoformat()
+    return json.dumps(fila, ensure_ascii=False, default=str) + '\n'
+
+
+def _anexar(relativa, lineas):
+    """Anexa las líneas como un miembro gzip y devuelve (offset, longitud)."""
+    ruta = os.path.join(directorio_archivo(), relativa)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    datos = gzip.compress(''.join(lineas).encode('utf-8'))
+    with open(ruta, 'ab') as f:
+        f.seek(0, os.SEEK_END)
+        offset = f.tell()
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+    return offset, len(datos)
+
+
+def archivar_mes(mes, filas):
+    """Escribe ``filas`` (dicts con ``CAMPOS``, del mismo mes) como un segmento y las borra de ``AuditLog``."""
+    relativa = ruta_mes(mes)
+    offset, longitud = _anexar(relativa, [_linea(fila) for fila in filas])
+    objetos = {(fila['content_type_id'], fila['object_id']) for fila in filas}
+    ids = [fila['id'] for fila in filas]
+    with transaction.atomic():
+        segmento = SegmentoAuditoria.objects.create(
+            mes=mes,
+            archivo=relativa,
+            offset=offset,
+            longitud=longitud,
+            filas=len(filas),
+            desde=min(fila['created_at'] for fila in filas),
+            hasta=max(fila['created_at'] for fila in filas),
+        )
+        IndiceAuditoriaArchivada.objects.bulk_create([
+            IndiceAuditoriaArchivada(segmento=segmento, content_type_id=ct_id, object_id=object_id)
+            for ct_id, object_id in objetos
+        ], batch_size=1000)
+        for i in range(0, len(ids), LOTE_BORRADO):
+            AuditLog.objects.filter(pk__in=ids[i:i + LOTE_BORRADO]).delete()
+    return segmento
+
+
+def pendientes_de_archivar(corte):
+    return AuditLog.objects.filter(created_at__lt=corte)
+
+
+def archivar(corte, tamano_lote=5000):
+    """
+    Archiva por lotes todo lo anterior a ``corte``. Cada lote se parte por
+    mes y genera un segmento por mes. Devuelve {mes: entradas archivadas}.
+    """
+    archivadas = {}
+    while True:
+        filas = list(
+            pendientes_de_archivar(corte).order_by('created_at', 'id').values(*CAMPOS)[:tamano_lote]
+        )
+        if not filas:
+            return archivadas
+        por_mes = {}
+        for fila in filas:
+            por_mes.setdefault(inicio_de_mes(fila['created_at']), []).append(fila)
+        for mes, del_mes in por_mes.items():
+            archivar_mes(mes, del_mes)
+            archivadas[mes] = archivadas.get(mes, 0) + len(del_mes)
+
+
+def leer_segmento(segmento):
+    """Entradas (dicts) de un segmento; solo se descomprime su miembro."""
+    with open(os.path.join(directorio_archivo(), segmento.archivo), 'rb') as f:
+        f.seek(segmento.offset)
+        datos = f.read(segmento.longitud)
+    for linea in gzip.decompress(datos).decode('utf-8').splitlines():
+        if linea:
+            yield json.loads(linea)
+
+
+def _como_auditlog(fila):
+    fila = dict(fila)
+    fila['created_at'] = parse_datetime(fila['created_at'])
+    return AuditLog(**fila)
+
+
+def historial_archivado(content_type, object_id):
+    """Entradas archivadas de un objeto como ``AuditLog`` sin guardar, de la más reciente a la más antigua."""
+    object_id = str(object_id)
+    segmentos = SegmentoAuditoria.objects.filter(
+        objetos__content_type=content_type, objetos__object_id=object_id,
+    ).order_by('-hasta')
+    entradas = [
+        _como_auditlog(fila)
+        for segmento in segmentos
+        for fila in leer_segmento(segmento)
+        if fila['content_type_id'] == content_type.pk and fila['object_id'] == object_id
+    ]
+    entradas.sort(key=lambda e: (e.created_at, e.pk), reverse=True)
+    return entradas
+
+
+def historial_objeto(content_type, object_id, limite=None):
+    """
+    Historial completo de un objeto (tabla y archivo), del más reciente al
+    más antiguo. El archivo solo se lee si la tabla no alcanza ``limite``.
+    """
+    recientes = AuditLog.objects.filter(
+        content_type=content_type, object_id=str(object_id),
+    ).order_by('-created_at', '-id')
+    recientes = list(recientes[:limite] if limite else recientes)
+    if limite and len(recientes) >= limite:
+        return recientes
+    entradas = recientes + historial_archivado(content_type, object_id)
+    return entradas[:limite] if limite else entradas
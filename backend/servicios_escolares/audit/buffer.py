@@ -0,0 +1,152 @@
+"""
+Escritura en lote de la bitácora.
+
+Las señales no insertan cada ``AuditLog`` al momento: lo entregan a
+``registrar``, que lo guarda según dónde ocurrió el cambio:
+
+- Dentro de una transacción: se acumula y se escribe con un solo
+  ``bulk_create`` en ``on_commit``. Si la transacción (o el savepoint) se
+  revierte, las entradas se descartan con ella (lo pendiente de un bloque
+  revertido se limpia al abrir el siguiente).
+- En autocommit dentro de ``auditoria_en_lote()`` (el middleware envuelve
+  cada request con él): se acumula y se escribe al salir del bloque, aunque
+  haya una excepción.
+- En cualquier otro caso (shell, comandos sin el context manager): se
+  escribe de inmediato, como antes.
+
+Los lotes abiertos por ``auditoria_en_lote`` siguen al contexto (igual que
+``audit.context``), así que un request async los comparte con el código
+síncrono que corre vía ``sync_to_async``. Lo pendiente de transacciones es
+por hilo porque las conexiones a la BD también lo son.
+"""
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Pila de lotes abiertos; una tupla para no mutar la de otro contexto
+_lotes = ContextVar('audit_lotes', default=())
+
+
+def guardar(entradas):
+    """
+    Inserta las entradas en un solo INSERT. Si el lote falla, se guardan una
+    por una para no perder las válidas; las que fallan quedan en el log.
+    """
+    if not entradas:
+        return
+    from .models import AuditLog
+    try:
+        AuditLog.objects.bulk_create(entradas, batch_size=1000)
+        return
+    except Exception:
+        logger.error(
+            f"No se pudo guardar el lote de {len(entradas)} entradas de auditoría; se guardan una por una",
+            exc_info=True,
+        )
+    for entrada in entradas:
+        try:
+            with transaction.atomic():
+                entrada.save()
+        except Exception:
+            logger.error(
+                f"Entrada de auditoría no guardada: {entrada.action} {entrada.app_label}.{entrada.model_name}"
+                f"({entrada.object_id}) por {entrada.actor_username} cambios={entrada.changes}",
+                exc_info=True,
+            )
+
+
+def _transacciones():
+    if not hasattr(_local, 'transacciones'):
+        _local.transacciones = {}
+    return _local.transacciones
+
+
+def _sigue_registrado(conexion, callback):
+    # Django descarta los on_commit de un savepoint revertido
+    return any(item[1] is callback for item in conexion.run_on_commit)
+
+
+def _descartar_revertidas(transacciones, conexion, using):
+    """
+    Quita los pendientes cuyo on_commit ya no existe: su savepoint o su
+    transacción se revirtió y ``al_confirmar`` nunca va a correr.
+    """
+    vigentes = {id(item[1]) for item in conexion.run_on_commit}
+    for clave in [c for c, grupo in transacciones.items() if c[0] == using and id(grupo[1]) not in vigentes]:
+        del transacciones[clave]
+
+
+def _pendiente_de_transaccion(entradas_nuevas, using):
+    conexion = connections[using]
+    clave = (using, tuple(conexion.savepoint_ids))
+    transacciones = _transacciones()
+    grupo = transacciones.get(clave)
+    if grupo is None or not _sigue_registrado(conexion, grupo[1]):
+        _descartar_revertidas(transacciones, conexion, using)
+        entradas = []
+
+        def al_confirmar():
+            if transacciones.get(clave, (None,))[0] is entradas:
+                del transacciones[clave]
+            guardar(entradas)
+
+        transaction.on_commit(al_confirmar, using=using)
+        grupo = (entradas, al_confirmar)
+        transacciones[clave] = grupo
+    grupo[0].extend(entradas_nuevas)
+
+
+def registrar(entrada, using='default'):
+    """Encola una entrada de ``AuditLog`` (sin guardar) producida por un cambio en ``using``."""
+    registrar_varias([entrada], using)
+
+
+def registrar_varias(entradas, using='default'):
+    """Como ``registrar`` para las entradas de una operación masiva."""
+    if not entradas:
+        return
+    if connections[using].in_atomic_block:
+        _pendiente_de_transaccion(entradas, using)
+    elif _lotes.get():
+        _lotes.get()[-1].extend(entradas)
+    else:
+        guardar(entradas)
+
+
+@contextmanager
+def auditoria_en_lote():
+    """
+    Acumula las entradas de auditoría en autocommit y las escribe juntas al
+    salir. Útil en comandos de gestión y scripts:
+
+        with auditoria_en_lote():
+            for alumno in alumnos:
+                alumno.save()
+    """
+    buffer = []
+    token = _lotes.set(_lotes.get() + (buffer,))
+    try:
+        yield buffer
+    finally:
+        _lotes.reset(token)
+        guardar(buffer)
+
+
+@asynccontextmanager
+async def auditoria_en_lote_async():
+    """``auditoria_en_lote`` para código async: la escritura final va a un hilo."""
+    buffer = []
+    token = _lotes.set(_lotes.get() + (buffer,))
+    try:
+        yield buffer
+    finally:
+        _lotes.reset(token)
+        await sync_to_async(guardar)(buffer)
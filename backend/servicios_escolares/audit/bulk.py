@@ -0,0 +1,165 @@
+"""
+Operaciones masivas auditadas.
+
+``QuerySet.update``, ``bulk_create`` y ``bulk_update`` no disparan señales,
+así que quedaban sin bitácora o se cambiaban por ``save()`` fila por fila.
+Estas funciones ejecutan la sentencia masiva y registran una entrada por
+objeto afectado (solo con los campos que cambiaron), leyendo el estado
+anterior con una sola consulta y escribiendo la bitácora en lote
+(ver ``audit.buffer``).
+
+    audited_update(Alumno.objects.filter(...), estatus='No Inscrito')
+
+Los modelos que quieran exponerlo como método pueden usar
+``AuditedQuerySet`` en su manager.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, router, transaction
+
+from servicios_escolares.cache_etiquetas import invalidar_modelo
+
+from .buffer import registrar_varias
+from .registry import politica_de
+from .signals import SNAPSHOT_ATTR, _json_safe, build_entry
+
+BULK_EXTRA = 'bulk'
+
+
+def _valor_nuevo(field, valor):
+    if isinstance(field, models.ForeignKey):
+        return getattr(valor, 'pk', valor)
+    try:
+        return field.to_python(valor)
+    except Exception:
+        return valor
+
+
+def _delta(campos, anterior, nuevo):
+    return {
+        campo: {'old': _json_safe(anterior[campo]), 'new': _json_safe(nuevo[campo])}
+        for campo in campos
+        if anterior[campo] != nuevo[campo]
+    }
+
+
+def _registrar(model, action, deltas, using, operacion):
+    """
+    Una entrada por objeto; ``deltas`` es [(pk, cambios)]. Aplica la
+    política del modelo: campos rastreados, modo y muestreo.
+    """
+    politica = politica_de(model)
+    if politica is None:
+        return
+    ct = ContentType.objects.get_for_model(model)
+    entradas = []
+    for pk, cambios in deltas:
+        if action == 'update':
+            cambios = {k: v for k, v in (cambios or {}).items() if k in politica.campos}
+            if not cambios or not politica.registrar_cambio():
+                continue
+        entradas.append(build_entry(
+            ct, action, pk,
+            cambios if politica.guarda_diff else None, extra={BULK_EXTRA: operacion},
+        ))
+    registrar_varias(entradas, using)
+
+
+def audited_update(queryset, **kwargs):
+    """
+    ``queryset.update(**kwargs)`` con bitácora. Lee pk y valores anteriores
+    de los campos a modificar en una consulta, actualiza exactamente esas
+    filas y devuelve cuántas se actualizaron. Si algún valor es una
+    expresión (``F()``, ``Case``...), los valores nuevos se leen después.
+    """
+    model = queryset.model
+    using = queryset.db
+    fields = [model._meta.get_field(nombre) for nombre in kwargs]
+    campos = [f.name for f in fields]
+    attnames = [f.attname for f in fields]
+    con_expresiones = any(hasattr(v, 'resolve_expression') for v in kwargs.values())
+
+    with transaction.atomic(using=using):
+        anteriores = {
+            fila[0]: dict(zip(campos, fila[1:]))
+            for fila in queryset.values_list('pk', *attnames)
+        }
+        if not anteriores:
+            return 0
+        objetivo = model._base_manager.using(using).filter(pk__in=list(anteriores))
+        actualizados = objetivo.update(**kwargs)
+
+        if con_expresiones:
+            nuevos = {
+                fila[0]: dict(zip(campos, fila[1:]))
+                for fila in objetivo.values_list('pk', *attnames)
+            }
+        else:
+            valores = {f.name: _valor_nuevo(f, kwargs[f.name]) for f in fields}
+            nuevos = {pk: valores for pk in anteriores}
+
+        deltas = [(pk, _delta(campos, anteriores[pk], nuevos[pk])) for pk in anteriores if pk in nuevos]
+        _registrar(model, 'update', [(pk, cambios) for pk, cambios in deltas if cambios], using, 'update')
+    # Sin señales: la caché de tableros se invalida aquí
+    invalidar_modelo(model)
+    return actualizados
+
+
+def audited_bulk_create(model, objs, **kwargs):
+    """``bulk_create`` con una entrada 'create' por objeto (requiere que la BD devuelva los pk)."""
+    using = kwargs.pop('using', None) or router.db_for_write(model)
+    with transaction.atomic(using=using):
+        creados = model._base_manager.using(using).bulk_create(objs, **kwargs)
+        _registrar(model, 'create', [(obj.pk, None) for obj in creados if obj.pk is not None], using, 'bulk_create')
+    invalidar_modelo(model)
+    return creados
+
+
+def audited_bulk_update(model, objs, fields, **kwargs):
+    """
+    ``bulk_update`` con bitácora: los valores anteriores de ``fields`` se
+    leen en una sola consulta y solo se registran los objetos que cambiaron.
+    """
+    using = kwargs.pop('using', None) or router.db_for_write(model)
+    objs = list(objs)
+    if not objs:
+        return 0
+    meta_fields = [model._meta.get_field(nombre) for nombre in fields]
+    campos = [f.name for f in meta_fields]
+    attnames = [f.attname for f in meta_fields]
+
+    with transaction.atomic(using=using):
+        anteriores = {
+            fila[0]: dict(zip(campos, fila[1:]))
+            for fila in model._base_manager.using(using)
+            .filter(pk__in=[obj.pk for obj in objs]).values_list('pk', *attnames)
+        }
+        actualizados = model._base_manager.using(using).bulk_update(objs, fields, **kwargs)
+
+        deltas = []
+        for obj in objs:
+            if obj.pk not in anteriores:
+                continue
+            nuevo = {campo: getattr(obj, attname) for campo, attname in zip(campos, attnames)}
+            cambios = _delta(campos, anteriores[obj.pk], nuevo)
+            if cambios:
+                deltas.append((obj.pk, cambios))
+            # El siguiente save() de la instancia compara contra lo ya guardado
+            snapshot = getattr(obj, SNAPSHOT_ATTR, None)
+            if snapshot is not None:
+                snapshot.update(nuevo)
+        _registrar(model, 'update', deltas, using, 'bulk_update')
+    invalidar_modelo(model)
+    return actualizados
+
+
+class AuditedQuerySet(models.QuerySet):
+    """QuerySet con las variantes auditadas de las operaciones masivas."""
+
+    def audited_update(self, **kwargs):
+        return audited_update(self, **kwargs)
+
+    def audited_bulk_create(self, objs, **kwargs):
+        return audited_bulk_create(self.model, objs, using=self.db, **kwargs)
+
+    def audited_bulk_update(self, objs, fields, **kwargs):
+        return audited_bulk_update(self.model, objs, fields, using=self.db, **kwargs)
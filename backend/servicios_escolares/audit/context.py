@@ -1,19 +1,69 @@
-import threading
+"""
+Contexto del request para la bitácora (usuario, ip, request_id, origen).
 
-_local = threading.local()
+Vive en un ``ContextVar`` y no en un ``threading.local``: bajo ASGI varios
+requests comparten hilo y una vista async puede continuar en otro, así que
+el contexto debe seguir a la tarea y no al hilo. El middleware lo fija al
+entrar y lo restablece al salir, de modo que no se filtra al siguiente
+request que atienda el mismo hilo.
+
+Los hilos de un pool no heredan el contexto de quien les entrega el
+trabajo; para que lo auditado ahí quede atribuido al request que lo originó
+se usa ``propagar_contexto`` o ``enviar_con_contexto``:
+
+    enviar_con_contexto(executor, generar_documento, solicitud.pk)
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+CONTEXTO_VACIO = (None, None, None, None)
+
+_contexto = ContextVar('audit_request_context', default=CONTEXTO_VACIO)
 
 
 def set_request_context(user=None, ip=None, request_id=None, source=None):
-    _local.user = user
-    _local.ip = ip
-    _local.request_id = request_id
-    _local.source = source
+    """Fija el contexto y devuelve el token para ``reset_request_context``."""
+    return _contexto.set((user, ip, request_id, source))
+
+
+def reset_request_context(token):
+    _contexto.reset(token)
 
 
 def get_request_context():
-    return (
-        getattr(_local, 'user', None),
-        getattr(_local, 'ip', None),
-        getattr(_local, 'request_id', None),
-        getattr(_local, 'source', None),
-    )
\ No newline at end of file
+    """(user, ip, request_id, source) del request en curso."""
+    return _contexto.get()
+
+
+@contextmanager
+def request_context(user=None, ip=None, request_id=None, source=None):
+    """Contexto temporal, p. ej. para atribuir lo que hace un comando de gestión."""
+    token = set_request_context(user=user, ip=ip, request_id=request_id, source=source)
+    try:
+        yield
+    finally:
+        reset_request_context(token)
+
+
+def propagar_contexto(fn):
+    """
+    Envuelve ``fn`` para que, al ejecutarse en otro hilo, vea el contexto
+    vigente al momento de envolverla. Solo se lleva la atribución: el lote
+    de bitácora del request no se comparte con el hilo.
+    """
+    contexto = get_request_context()
+
+    @functools.wraps(fn)
+    def envoltura(*args, **kwargs):
+        token = _contexto.set(contexto)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _contexto.reset(token)
+    return envoltura
+
+
+def enviar_con_contexto(executor, fn, *args, **kwargs):
+    """``executor.submit`` conservando el contexto de auditoría actual."""
+    return executor.submit(propagar_contexto(fn), *args, **kwargs)
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+from audit.archivo import archivar, directorio_archivo, fecha_corte, pendientes_de_archivar, retencion_meses
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve las entradas de auditoría de meses cerrados más antiguas que la retención '
+        'a archivos JSONL comprimidos por mes (consultables con audit.archivo.historial_objeto)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            help='Meses completos que se conservan en la tabla (por defecto: AUDIT_RETENCION_MESES)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Entradas leídas por lote (por defecto: 5000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo muestra cuántas entradas se archivarían por mes',
+        )
+
+    def handle(self, *args, **options):
+        meses = options['meses'] if options['meses'] is not None else retencion_meses()
+        if meses < 0 or options['lote'] < 1:
+            raise CommandError('--meses no puede ser negativo y --lote debe ser mayor que cero')
+        corte = fecha_corte(meses)
+        self.stdout.write(f"Archivando entradas anteriores a {corte:%Y-%m-%d} en {directorio_archivo()}")
+
+        if options['dry_run']:
+            por_mes = (
+                pendientes_de_archivar(corte)
+                .annotate(mes=TruncMonth('created_at')).values('mes')
+                .annotate(total=Count('id')).order_by('mes')
+            )
+            total = 0
+            for fila in por_mes:
+                total += fila['total']
+                self.stdout.write(f"  {fila['mes']:%Y-%m}: {fila['total']} entradas")
+            self.stdout.write(self.style.WARNING(f"Simulación: se archivarían {total} entradas"))
+            return
+
+        archivadas = archivar(corte, tamano_lote=options['lote'])
+        for mes, total in sorted(archivadas.items()):
+            self.stdout.write(f"  {mes:%Y-%m}: {total} entradas")
+        self.stdout.write(self.style.SUCCESS(f"Entradas archivadas: {sum(archivadas.values())}"))
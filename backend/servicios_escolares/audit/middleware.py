@@ -1,15 +1,42 @@
 import uuid
-from .context import set_request_context
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .buffer import auditoria_en_lote, auditoria_en_lote_async
+from .context import reset_request_context, set_request_context
 
 
 class AuditRequestMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
-    def __call__(self, request):
+    def _fijar_contexto(self, request):
         rid = str(uuid.uuid4())[:8]
         user = getattr(request, 'user', None)
         ip = request.META.get('REMOTE_ADDR')
         source = 'admin' if request.path.startswith('/admin') else 'publico'
-        set_request_context(user=user, ip=ip, request_id=rid, source=source)
-        return self.get_response(request)
\ No newline at end of file
+        return set_request_context(user=user, ip=ip, request_id=rid, source=source)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._fijar_contexto(request)
+        try:
+            # La bitácora del request se escribe junta al terminar la respuesta
+            with auditoria_en_lote():
+                return self.get_response(request)
+        finally:
+            reset_request_context(token)
+
+    async def __acall__(self, request):
+        token = self._fijar_contexto(request)
+        try:
+            async with auditoria_en_lote_async():
+                return await self.get_response(request)
+        finally:
+            reset_request_context(token)
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_created_at_hora_del_cambio'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentoAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('archivo', models.CharField(max_length=255)),
+                ('offset', models.BigIntegerField()),
+                ('longitud', models.BigIntegerField()),
+                ('filas', models.PositiveIntegerField()),
+                ('desde', models.DateTimeField()),
+                ('hasta', models.DateTimeField()),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['mes', 'offset'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IndiceAuditoriaArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(max_length=64)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('segmento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='objetos', to='audit.segmentoauditoria')),
+            ],
+            options={
+                'unique_together': {('content_type', 'object_id', 'segmento')},
+            },
+        ),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
 from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
 
 
 class AuditLog(models.Model):
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Hora del cambio, no de la escritura en lote (ver audit.buffer)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     action = models.CharField(max_length=12)  # create|update|delete
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.CharField(max_length=64)
@@ -21,9 +23,44 @@ class AuditLog(models.Model):
         indexes = [
             models.Index(fields=['content_type', 'object_id', 'created_at']),
             models.Index(fields=['app_label', 'model_name']),
-            models.Index(fields=['actor_id']),
+            # Búsquedas de audit.views: filtro + orden (created_at, id) recorriendo el índice
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['content_type', 'created_at']),
+            models.Index(fields=['actor_id', 'created_at']),
+            models.Index(fields=['request_id']),
         ]
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"[{self.created_at}] {self.app_label}.{self.model_name}({self.object_id}) {self.action}"
\ No newline at end of file
+        return f"[{self.created_at}] {self.app_label}.{self.model_name}({self.object_id}) {self.action}"
+
+class SegmentoAuditoria(models.Model):
+    """
+    Bloque de ``AuditLog`` archivado: un miembro gzip de JSONL anexado al
+    archivo del mes (ver ``audit.archivo``). ``offset`` y ``longitud``
+    permiten leerlo sin descomprimir el resto del archivo.
+    """
+    mes = models.DateField()
+    archivo = models.CharField(max_length=255)  # relativo a AUDIT_ARCHIVO_DIR
+    offset = models.BigIntegerField()
+    longitud = models.BigIntegerField()
+    filas = models.PositiveIntegerField()
+    desde = models.DateTimeField()
+    hasta = models.DateTimeField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['mes', 'offset']
+
+    def __str__(self):
+        return f"{self.archivo}@{self.offset} ({self.filas} entradas)"
+
+
+class IndiceAuditoriaArchivada(models.Model):
+    """Qué objetos tienen historial en cada segmento archivado."""
+    segmento = models.ForeignKey(SegmentoAuditoria, on_delete=models.CASCADE, related_name='objetos')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = [('content_type', 'object_id', 'segmento')]
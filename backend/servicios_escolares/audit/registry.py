@@ -0,0 +1,97 @@
+"""
+Registro de modelos auditados.
+
+Solo se audita lo registrado; para cualquier otro modelo (sesiones,
+content types, staging del importador...) los receptores de señales salen
+de inmediato. El registro se declara en ``settings.AUDIT_MODELS``:
+
+    AUDIT_MODELS = {
+        'datos_academicos.Alumno': {},
+        'auth.User': {'excluir': ['password', 'last_login']},
+        'procedimientos.Boleta': {'modo': 'accion'},
+        'datos_academicos.Calificacion': {'campos': ['calificacion'], 'muestreo': 0.5},
+    }
+
+Opciones por modelo:
+- ``campos``: lista de campos rastreados (por defecto, todos los editables).
+- ``excluir``: campos que nunca se rastrean.
+- ``modo``: ``'diff'`` guarda los cambios campo por campo; ``'accion'`` solo
+  la acción (alta, cambio, baja), sin snapshot ni diff.
+- ``muestreo``: fracción (0-1) de las modificaciones que se registran; las
+  altas y bajas se registran siempre.
+
+También se puede registrar desde código con ``auditar_modelo``.
+"""
+import random
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+MODOS = ('diff', 'accion')
+
+# Nunca se guardan en la bitácora, aunque el modelo no los excluya
+EXCLUDE_FIELDS = {'password', 'last_login'}
+
+_politicas = {}
+
+
+class PoliticaAuditoria:
+    """Qué se audita de un modelo."""
+
+    def __init__(self, model, campos=None, excluir=(), modo='diff', muestreo=1.0):
+        if modo not in MODOS:
+            raise ImproperlyConfigured(f"Modo de auditoría no válido para {model._meta.label}: {modo}")
+        if not 0 <= muestreo <= 1:
+            raise ImproperlyConfigured(f"Muestreo de auditoría fuera de rango para {model._meta.label}: {muestreo}")
+        editables = [f.name for f in model._meta.concrete_fields if f.editable]
+        for nombre in list(campos or ()) + list(excluir):
+            if nombre not in editables:
+                raise ImproperlyConfigured(f"{model._meta.label} no tiene el campo auditable '{nombre}'")
+        self.model = model
+        self.modo = modo
+        self.muestreo = muestreo
+        self.campos = frozenset(
+            nombre for nombre in (campos or editables)
+            if nombre not in excluir and nombre not in EXCLUDE_FIELDS
+        )
+
+    @property
+    def guarda_diff(self):
+        return self.modo == 'diff'
+
+    def registrar_cambio(self):
+        """Decide por muestreo si se registra una modificación."""
+        return self.muestreo >= 1 or random.random() < self.muestreo
+
+    def rastrea_alguno(self, update_fields):
+        """False si un save(update_fields=...) no toca ningún campo rastreado."""
+        if update_fields is None or not self.guarda_diff:
+            return True
+        return not self.campos.isdisjoint(update_fields)
+
+
+def auditar_modelo(modelo, **opciones):
+    """Registra ``modelo`` (clase o etiqueta 'app.Modelo') con las opciones de ``PoliticaAuditoria``."""
+    if isinstance(modelo, str):
+        try:
+            modelo = apps.get_model(modelo)
+        except (LookupError, ValueError) as e:
+            raise ImproperlyConfigured(f"AUDIT_MODELS: modelo desconocido '{modelo}'") from e
+    politica = PoliticaAuditoria(modelo, **opciones)
+    _politicas[modelo] = politica
+    if politica.guarda_diff:
+        from .signals import instalar_refresco_de_snapshot
+        instalar_refresco_de_snapshot(modelo)
+    return politica
+
+
+def politica_de(model):
+    """Política del modelo, o None si no se audita (incluye modelos históricos de migraciones)."""
+    return _politicas.get(model)
+
+
+def cargar_desde_settings():
+    _politicas.clear()
+    for etiqueta, opciones in getattr(settings, 'AUDIT_MODELS', {}).items():
+        auditar_modelo(etiqueta, **(opciones or {}))
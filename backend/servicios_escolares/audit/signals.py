@@ -1,14 +1,19 @@
-from django.db.models.signals import pre_save, post_save, post_delete
+from functools import wraps
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.forms.models import model_to_dict
 from django.contrib.contenttypes.models import ContentType
 
+from .buffer import registrar
 from .models import AuditLog
 from .context import get_request_context
+from .registry import EXCLUDE_FIELDS, politica_de  # noqa: F401
 from datetime import datetime, date
 from decimal import Decimal
 
-EXCLUDE_FIELDS = {'password', 'last_login'}
+# Atributo de la instancia con los valores tal como se cargaron o guardaron
+SNAPSHOT_ATTR = '_audit_original'
 
 
 def _json_safe(v):
@@ -27,6 +32,9 @@ def diff_dict(old, new):
     for k in new.keys():
         if k in EXCLUDE_FIELDS:
             continue
+        # Un campo diferido al cargar no tiene valor original con qué comparar
+        if k not in old:
+            continue
         if old.get(k) != new.get(k):
             changes[k] = {
                 'old': _json_safe(old.get(k)),
@@ -35,51 +43,33 @@ def diff_dict(old, new):
     return changes
 
 
-def safe_model_dict(instance):
-    d = model_to_dict(instance)
-    # Normaliza FKs a ID y añade repr legible
-    for f in instance._meta.get_fields():
-        if getattr(f, 'many_to_one', False) and hasattr(instance, f.name):
-            # Usa el valor del FK id (attname) cuando exista
-            attname = getattr(f, 'attname', None)
-            if attname and hasattr(instance, attname):
-                d[f.name] = getattr(instance, attname)
-    return d
-
+def safe_model_dict(instance, campos=None):
+    """
+    Valores de los campos concretos editables (o solo de ``campos``), con
+    las FKs como su id. Solo lee lo que ya está en la instancia: los campos
+    diferidos se omiten en lugar de provocar una consulta.
+    """
+    valores = instance.__dict__
+    return {
+        f.name: valores[f.attname]
+        for f in instance._meta.concrete_fields
+        if f.editable and f.attname in valores and (campos is None or f.name in campos)
+    }
 
-def set_original(instance):
-    try:
-        original = instance.__class__.objects.get(pk=instance.pk)
-        instance.__original_dict = safe_model_dict(original)
-    except instance.__class__.DoesNotExist:
-        instance.__original_dict = {}
 
-
-@receiver(pre_save)
-def capture_original(sender, instance, **kwargs):
-    if not hasattr(sender, '_meta') or sender._meta.abstract:
-        return
-    # Evita registrar cambios del propio AuditLog
-    if sender is AuditLog:
-        return
-    set_original(instance)
+def set_original(instance, campos=None):
+    """Lee de la BD el estado original; solo cuando la instancia no trae snapshot."""
+    original = instance.__class__._base_manager.filter(pk=instance.pk).first()
+    setattr(instance, SNAPSHOT_ATTR, safe_model_dict(original, campos) if original is not None else {})
 
 
-@receiver(post_save)
-def audit_save(sender, instance, created, **kwargs):
-    if not hasattr(sender, '_meta') or sender._meta.abstract:
-        return
-    if sender is AuditLog:
-        return
-    ct = ContentType.objects.get_for_model(sender)
-    old = getattr(instance, '__original_dict', {}) or {}
-    new = safe_model_dict(instance)
-    changes = {} if created else diff_dict(old, new)
+def build_entry(ct, action, object_id, changes=None, extra=None):
+    """AuditLog sin guardar con el actor del contexto actual."""
     user, ip, request_id, source = get_request_context()
-    AuditLog.objects.create(
-        action='create' if created else 'update',
+    return AuditLog(
+        action=action,
         content_type=ct,
-        object_id=str(instance.pk),
+        object_id=str(object_id),
         app_label=ct.app_label,
         model_name=ct.model,
         changes=changes or None,
@@ -88,27 +78,112 @@ def audit_save(sender, instance, created, **kwargs):
         ip=ip,
         request_id=request_id,
         source=source,
+        extra=extra,
     )
 
 
-@receiver(post_delete)
-def audit_delete(sender, instance, **kwargs):
-    if not hasattr(sender, '_meta') or sender._meta.abstract:
+@receiver(post_init)
+def snapshot_original(sender, instance, **kwargs):
+    # Se toma para todas las instancias; solo cuenta si vino de la BD (ver capture_original)
+    politica = politica_de(sender)
+    if politica is None or not politica.guarda_diff:
+        return
+    setattr(instance, SNAPSHOT_ATTR, safe_model_dict(instance, politica.campos))
+
+
+def refrescar_snapshot(instance, fields=None):
+    """
+    Vuelve a tomar el snapshot después de ``refresh_from_db``: los valores
+    recargados son los de la BD, no los de la carga original. Con ``fields``
+    solo se reemplazan esos campos.
+    """
+    politica = politica_de(type(instance))
+    if politica is None or not politica.guarda_diff:
+        return
+    actuales = safe_model_dict(instance, politica.campos)
+    if fields is not None:
+        recargados = set()
+        for campo in fields:
+            try:
+                recargados.add(instance._meta.get_field(campo).name)
+            except FieldDoesNotExist:
+                continue
+        actuales = {k: v for k, v in actuales.items() if k in recargados}
+        actuales = {**(getattr(instance, SNAPSHOT_ATTR, None) or {}), **actuales}
+    setattr(instance, SNAPSHOT_ATTR, actuales)
+
+
+def instalar_refresco_de_snapshot(modelo):
+    """
+    ``refresh_from_db`` copia los valores a la instancia sin enviar señales
+    (el ``post_init`` es de una instancia temporal), así que cada modelo
+    auditado recibe su propio ``refresh_from_db`` que actualiza el snapshot.
+    Se instala en la clase registrada, no en ``Model``.
+    """
+    original = modelo.refresh_from_db
+    if getattr(original, 'refresca_snapshot', False):
+        return
+
+    @wraps(original)
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        original(self, using=using, fields=fields, **kwargs)
+        refrescar_snapshot(self, fields)
+
+    refresh_from_db.refresca_snapshot = True
+    modelo.refresh_from_db = refresh_from_db
+
+
+@receiver(pre_save)
+def capture_original(sender, instance, update_fields=None, **kwargs):
+    politica = politica_de(sender)
+    if politica is None or not politica.guarda_diff:
+        return
+    if not instance._state.adding:
+        # Cargada con from_db() o ya guardada: el snapshot es el estado en la BD
         return
-    if sender is AuditLog:
+    if instance.pk is None:
+        # Alta: no hay nada que leer
+        setattr(instance, SNAPSHOT_ATTR, {})
         return
+    if not politica.rastrea_alguno(update_fields):
+        return
+    # Construida a mano con pk (p. ej. Modelo(pk=1, ...).save()): puede ser un UPDATE
+    set_original(instance, politica.campos)
+
+
+@receiver(post_save)
+def audit_save(sender, instance, created, using='default', update_fields=None, **kwargs):
+    politica = politica_de(sender)
+    if politica is None:
+        return
+
+    if politica.guarda_diff:
+        old = getattr(instance, SNAPSHOT_ATTR, None) or {}
+        new = safe_model_dict(instance, politica.campos)
+        if update_fields is not None:
+            # Solo se escribieron esos campos; los demás siguen como en la BD
+            escritos = {instance._meta.get_field(campo).name for campo in update_fields}
+            new = {k: v for k, v in new.items() if k in escritos}
+        # El siguiente save de esta instancia compara contra lo que se acaba de
+        # guardar, aunque este cambio no se registre (muestreo)
+        setattr(instance, SNAPSHOT_ATTR, {**old, **new})
+
+    if not created and not (politica.rastrea_alguno(update_fields) and politica.registrar_cambio()):
+        return
+
+    changes = None
+    if politica.guarda_diff and not created:
+        changes = diff_dict(old, new)
+        if not changes:
+            # Nada rastreado cambió (p. ej. solo last_login al iniciar sesión)
+            return
     ct = ContentType.objects.get_for_model(sender)
-    user, ip, request_id, source = get_request_context()
-    AuditLog.objects.create(
-        action='delete',
-        content_type=ct,
-        object_id=str(instance.pk),
-        app_label=ct.app_label,
-        model_name=ct.model,
-        changes=None,
-        actor_id=getattr(user, 'id', None),
-        actor_username=getattr(user, 'username', None),
-        ip=ip,
-        request_id=request_id,
-        source=source,
-    )
\ No newline at end of file
+    registrar(build_entry(ct, 'create' if created else 'update', instance.pk, changes), using)
+
+
+@receiver(post_delete)
+def audit_delete(sender, instance, using='default', **kwargs):
+    if politica_de(sender) is None:
+        return
+    ct = ContentType.objects.get_for_model(sender)
+    registrar(build_entry(ct, 'delete', instance.pk), using)
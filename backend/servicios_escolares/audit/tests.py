@@ -0,0 +1,371 @@
+import gzip
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import DatabaseError, connection, models, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from datos_academicos.models import Materia
+from . import buffer
+from .archivo import archivar, historial_objeto, ruta_mes
+from .buffer import auditoria_en_lote
+from .bulk import audited_bulk_create, audited_bulk_update, audited_update
+from .context import CONTEXTO_VACIO, enviar_con_contexto, get_request_context, request_context
+from .middleware import AuditRequestMiddleware
+from .models import AuditLog, SegmentoAuditoria
+from .registry import auditar_modelo, cargar_desde_settings
+from .signals import build_entry
+
+
+class CapturaOriginalTestCase(TestCase):
+    def setUp(self):
+        # La caché de ContentType se llena antes de medir consultas
+        ContentType.objects.get_for_model(Materia)
+
+    def test_alta_y_cambio_sin_select_previo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):  # solo el INSERT; la bitácora espera al commit
+                materia = Materia.objects.create(clave='MAT001', nombre='Cálculo', creditos=5)
+
+            cargada = Materia.objects.get(pk=materia.pk)
+            cargada.nombre = 'Cálculo diferencial'
+            with self.assertNumQueries(1):  # solo el UPDATE
+                cargada.save()
+            cargada.creditos = 4
+            cargada.save()
+
+        cambios = list(
+            AuditLog.objects.filter(model_name='materia', action='update')
+            .order_by('created_at').values_list('changes', flat=True)
+        )
+        self.assertEqual(cambios, [
+            {'nombre': {'old': 'Cálculo', 'new': 'Cálculo diferencial'}},
+            {'creditos': {'old': 5, 'new': 4}},
+        ])
+
+    def test_instancia_construida_con_pk_lee_el_original(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            materia = Materia.objects.create(clave='MAT001', nombre='Cálculo', creditos=5)
+            copia = Materia(pk=materia.pk, clave='MAT001', nombre='Cálculo', creditos=6)
+            copia.save()
+        log = AuditLog.objects.filter(model_name='materia', action='update').get()
+        self.assertEqual(log.changes, {'creditos': {'old': 5, 'new': 6}})
+
+
+    def test_refresh_from_db_renueva_el_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            materia = Materia.objects.create(clave='MAT001', nombre='Cálculo', creditos=5)
+            Materia.objects.filter(pk=materia.pk).update(creditos=6)
+            materia.refresh_from_db()
+            materia.nombre = 'Cálculo diferencial'
+            materia.save()
+            # Con fields solo se renuevan los campos recargados
+            Materia.objects.filter(pk=materia.pk).update(creditos=7)
+            materia.refresh_from_db(fields=['creditos'])
+            materia.creditos = 8
+            materia.save()
+        cambios = list(
+            AuditLog.objects.filter(model_name='materia', action='update')
+            .order_by('created_at').values_list('changes', flat=True)
+        )
+        self.assertEqual(cambios, [
+            {'nombre': {'old': 'Cálculo', 'new': 'Cálculo diferencial'}},
+            {'creditos': {'old': 7, 'new': 8}},
+        ])
+        # Solo los modelos auditados llevan el refresh_from_db con snapshot
+        self.assertTrue(getattr(Materia.refresh_from_db, 'refresca_snapshot', False))
+        self.assertFalse(getattr(models.Model.refresh_from_db, 'refresca_snapshot', False))
+        self.assertFalse(getattr(ContentType.refresh_from_db, 'refresca_snapshot', False))
+
+
+class BitacoraEnLoteTestCase(TestCase):
+    def setUp(self):
+        ContentType.objects.get_for_model(Materia)
+
+    def test_una_insercion_por_transaccion_y_descarta_savepoints_revertidos(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for i in range(3):
+                Materia.objects.create(clave=f'M{i}', nombre=f'Materia {i}', creditos=4)
+            try:
+                with transaction.atomic():
+                    Materia.objects.create(clave='REV', nombre='Revertida', creditos=4)
+                    raise ValueError
+            except ValueError:
+                pass
+            self.assertFalse(AuditLog.objects.exists())
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list('object_id', flat=True)),
+            sorted(str(pk) for pk in Materia.objects.values_list('pk', flat=True))
+        )
+
+
+    def test_pendientes_de_bloques_revertidos_no_se_acumulan(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                try:
+                    with transaction.atomic():
+                        Materia.objects.create(clave=f'REV{i}', nombre='Revertida', creditos=4)
+                        raise ValueError
+                except ValueError:
+                    pass
+            Materia.objects.create(clave='OK', nombre='Confirmada', creditos=4)
+            self.assertEqual(len(buffer._transacciones()), 1)
+        self.assertEqual(buffer._transacciones(), {})
+
+    def test_si_falla_el_lote_se_guardan_una_por_una(self):
+        ct = ContentType.objects.get_for_model(Materia)
+        entradas = [build_entry(ct, 'create', pk) for pk in (1, 2)]
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=DatabaseError('lote')):
+            with self.assertLogs('audit.buffer', 'ERROR'):
+                buffer.guardar(entradas)
+        self.assertEqual(sorted(AuditLog.objects.values_list('object_id', flat=True)), ['1', '2'])
+
+
+class OperacionesMasivasTestCase(TestCase):
+    def setUp(self):
+        ContentType.objects.get_for_model(Materia)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.materias = audited_bulk_create(Materia, [
+                Materia(clave=f'M{i}', nombre=f'Materia {i}', creditos=4 + i % 2) for i in range(3)
+            ])
+
+    def test_bulk_create_registra_cada_objeto(self):
+        creados = AuditLog.objects.filter(action='create', model_name='materia')
+        self.assertEqual(
+            sorted(creados.values_list('object_id', flat=True)),
+            sorted(str(m.pk) for m in self.materias)
+        )
+        self.assertEqual(creados.first().extra, {'bulk': 'bulk_create'})
+
+    def test_update_con_una_lectura_previa_y_solo_los_que_cambian(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            # SAVEPOINT, SELECT previo, UPDATE, RELEASE
+            with self.assertNumQueries(4):
+                actualizados = audited_update(Materia.objects.all(), creditos=5)
+        self.assertEqual(actualizados, 3)
+
+        logs = AuditLog.objects.filter(action='update', model_name='materia')
+        self.assertEqual(logs.count(), 2)
+        self.assertEqual(
+            {log.changes['creditos']['old'] for log in logs}, {4}
+        )
+
+    def test_bulk_update_registra_el_delta(self):
+        materias = list(Materia.objects.order_by('clave'))
+        materias[0].nombre = 'Cálculo'
+        with self.captureOnCommitCallbacks(execute=True):
+            audited_bulk_update(Materia, materias, ['nombre'])
+        log = AuditLog.objects.get(action='update', model_name='materia')
+        self.assertEqual(log.object_id, str(materias[0].pk))
+        self.assertEqual(log.changes, {'nombre': {'old': 'Materia 0', 'new': 'Cálculo'}})
+
+
+class RegistroAuditoriaTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(cargar_desde_settings)
+
+    def test_modelos_no_registrados_y_campos_excluidos_no_generan_bitacora(self):
+        from django.contrib.auth.models import User
+        from django.contrib.sessions.backends.db import SessionStore
+        from django.utils import timezone
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario = User.objects.create_user('auditado', password='x')
+            sesion = SessionStore()
+            sesion['dato'] = 1
+            sesion.create()
+            usuario.last_login = timezone.now()
+            usuario.save(update_fields=['last_login'])
+        self.assertEqual(list(AuditLog.objects.values_list('model_name', 'action')), [('user', 'create')])
+
+    def test_modo_accion_y_muestreo(self):
+        auditar_modelo('datos_academicos.Materia', modo='accion', muestreo=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            materia = Materia.objects.create(clave='MAT001', nombre='Cálculo', creditos=5)
+            materia.creditos = 4
+            materia.save()  # con muestreo 0 no se registra
+        self.assertEqual(list(AuditLog.objects.values_list('action', 'changes')), [('create', None)])
+
+    def test_cambio_no_muestreado_no_entra_al_siguiente_diff(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            materia = Materia.objects.create(clave='MAT001', nombre='Cálculo', creditos=5)
+            auditar_modelo('datos_academicos.Materia', muestreo=0)
+            materia.creditos = 4
+            materia.save()  # no se registra
+            auditar_modelo('datos_academicos.Materia')
+            materia.nombre = 'Cálculo diferencial'
+            materia.save()
+        log = AuditLog.objects.filter(model_name='materia', action='update').get()
+        self.assertEqual(log.changes, {'nombre': {'old': 'Cálculo', 'new': 'Cálculo diferencial'}})
+
+
+class AuditoriaEnLoteTestCase(TransactionTestCase):
+    def test_autocommit_escribe_al_salir_del_bloque(self):
+        ContentType.objects.get_for_model(Materia)
+        with CaptureQueriesContext(connection) as consultas:
+            with auditoria_en_lote():
+                for i in range(3):
+                    Materia.objects.create(clave=f'M{i}', nombre=f'Materia {i}', creditos=4)
+        inserciones = [q for q in consultas.captured_queries if 'INSERT INTO "audit_auditlog"' in q['sql']]
+        self.assertEqual(len(inserciones), 1)
+        self.assertEqual(AuditLog.objects.filter(action='create', model_name='materia').count(), 3)
+
+
+class ContextoRequestTestCase(TestCase):
+    def test_el_middleware_restablece_el_contexto_al_terminar(self):
+        vistos = []
+
+        def vista(request):
+            vistos.append(get_request_context())
+            return HttpResponse()
+
+        request = RequestFactory().get('/admision/', REMOTE_ADDR='10.0.0.1')
+        AuditRequestMiddleware(vista)(request)
+        self.assertEqual(vistos[0][1], '10.0.0.1')
+        self.assertIsNotNone(vistos[0][2])
+        self.assertEqual(get_request_context(), CONTEXTO_VACIO)
+
+    def test_middleware_async(self):
+        vistos = []
+
+        async def vista(request):
+            vistos.append(get_request_context())
+            return HttpResponse()
+
+        request = RequestFactory().get('/admin/', REMOTE_ADDR='10.0.0.2')
+        async_to_sync(AuditRequestMiddleware(vista))(request)
+        self.assertEqual(vistos[0][3], 'admin')
+        self.assertEqual(get_request_context(), CONTEXTO_VACIO)
+
+    def test_propaga_el_contexto_a_hilos_del_executor(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with request_context(ip='10.0.0.3', request_id='abc123'):
+                propagado = enviar_con_contexto(executor, get_request_context).result()
+                sin_propagar = executor.submit(get_request_context).result()
+            despues = executor.submit(get_request_context).result()
+        self.assertEqual(propagado[1:3], ('10.0.0.3', 'abc123'))
+        self.assertEqual(sin_propagar, CONTEXTO_VACIO)
+        self.assertEqual(despues, CONTEXTO_VACIO)
+
+
+class ArchivoAuditoriaTestCase(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        ajustes = override_settings(AUDIT_ARCHIVO_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.ct = ContentType.objects.get_for_model(Materia)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.materia = Materia.objects.create(clave='ARC1', nombre='Archivada', creditos=4)
+            self.otra = Materia.objects.create(clave='ARC2', nombre='Otra', creditos=4)
+
+    def _fechar(self, *fecha):
+        AuditLog.objects.update(created_at=timezone.make_aware(datetime(*fecha)))
+
+    def test_archiva_meses_viejos_y_conserva_el_historial(self):
+        self._fechar(2020, 3, 15)
+        call_command('archivar_auditoria', meses=1, stdout=StringIO())
+        self.assertFalse(AuditLog.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.materia.creditos = 5
+            self.materia.save()
+        AuditLog.objects.filter(action='update').update(created_at=timezone.make_aware(datetime(2020, 3, 20)))
+        call_command('archivar_auditoria', meses=1, stdout=StringIO())
+
+        segmentos = list(SegmentoAuditoria.objects.all())
+        self.assertEqual(len(segmentos), 2)
+        self.assertEqual({s.archivo for s in segmentos}, {ruta_mes(segmentos[0].mes)})
+        self.assertGreater(segmentos[1].offset, 0)
+        # El archivo del mes se lee completo como un solo gzip
+        with gzip.open(os.path.join(self.directorio, segmentos[0].archivo), 'rt', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+        historial = historial_objeto(self.ct, self.materia.pk)
+        self.assertEqual([e.action for e in historial], ['update', 'create'])
+        self.assertEqual(historial[0].changes, {'creditos': {'old': 4, 'new': 5}})
+
+    def test_respeta_la_retencion_y_el_dry_run(self):
+        call_command('archivar_auditoria', meses=1, stdout=StringIO())
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self._fechar(2020, 3, 15)
+        call_command('archivar_auditoria', meses=1, dry_run=True, stdout=StringIO())
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self.assertFalse(SegmentoAuditoria.objects.exists())
+
+
+class ConsultaAuditoriaTestCase(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        ajustes = override_settings(AUDIT_ARCHIVO_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create_user('auditor', password='x', is_staff=True)
+            self.materia = Materia.objects.create(clave='HIS1', nombre='Historia', creditos=1)
+            for creditos in range(2, 6):
+                self.materia.creditos = creditos
+                self.materia.save()
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.url = reverse('audit:api_historial_objeto', args=['datos_academicos', 'materia', self.materia.pk])
+
+    def _recorrer(self, url, **params):
+        paginas = []
+        while True:
+            data = self.client.get(url, params).json()
+            paginas.append(data['results'])
+            if not data['siguiente']:
+                return paginas
+            params['cursor'] = data['siguiente']
+
+    def test_linea_de_tiempo_por_cursor(self):
+        paginas = self._recorrer(self.url, page_size=2)
+        self.assertEqual([len(p) for p in paginas], [2, 2, 1])
+        acciones = [e['action'] for p in paginas for e in p]
+        self.assertEqual(acciones, ['update'] * 4 + ['create'])
+        self.assertEqual(paginas[0][0]['changes'], {'creditos': {'old': 4, 'new': 5}})
+
+    def test_continua_con_la_historia_archivada(self):
+        viejas = AuditLog.objects.filter(model_name='materia').exclude(changes__creditos__new__gte=4)
+        viejas.update(created_at=timezone.make_aware(datetime(2020, 1, 10)))
+        archivar(timezone.make_aware(datetime(2021, 1, 1)))
+        self.assertEqual(AuditLog.objects.filter(model_name='materia').count(), 2)
+
+        paginas = self._recorrer(self.url, page_size=2)
+        entradas = [e for p in paginas for e in p]
+        self.assertEqual([e['action'] for e in entradas], ['update'] * 4 + ['create'])
+        self.assertEqual(len({e['id'] for e in entradas}), 5)
+
+    def test_busqueda_con_filtros(self):
+        AuditLog.objects.filter(model_name='materia', action='create').update(request_id='req1')
+        data = self.client.get(reverse('audit:api_buscar'), {'request_id': 'req1'}).json()
+        self.assertEqual([e['action'] for e in data['results']], ['create'])
+        data = self.client.get(
+            reverse('audit:api_buscar'), {'modelo': 'datos_academicos.materia', 'action': 'update', 'page_size': 3},
+        ).json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertIsNotNone(data['siguiente'])
+        respuesta = self.client.get(reverse('audit:api_buscar'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_requiere_personal_de_servicios(self):
+        User.objects.create_user('alumno', password='x')
+        self.client.force_login(User.objects.get(username='alumno'), backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('audit:api_buscar')).status_code, 302)
@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'audit'
+
+urlpatterns = [
+    path('api/buscar/', views.api_buscar, name='api_buscar'),
+    path(
+        'api/historial/<str:app_label>/<str:model_name>/<str:object_id>/',
+        views.api_historial_objeto,
+        name='api_historial_objeto',
+    ),
+]
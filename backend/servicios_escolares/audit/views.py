@@ -0,0 +1,188 @@
+from datetime import datetime, time
+
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.contenttypes.models import ContentType
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import require_GET
+
+from servicios_escolares.paginacion import (
+    CursorInvalido, codificar_cursor, decodificar_cursor, paginar_por_cursor, tamano_pagina,
+)
+
+from .archivo import historial_archivado
+from .models import AuditLog, IndiceAuditoriaArchivada
+
+# Orden de la bitácora; lo cubren los índices (content_type, object_id, created_at) y (created_at, id)
+ORDEN = ['-created_at', '-id']
+
+# Primer valor del cursor cuando la línea de tiempo ya pasó de la tabla al archivo
+CURSOR_ARCHIVO = 'archivo'
+
+
+def _puede_consultar(user):
+    return user.is_authenticated and (
+        user.is_staff or user.is_superuser or
+        user.groups.filter(name__in=['ServiciosEscolares', 'Servicios Escolares']).exists()
+    )
+
+
+def _serializar(log):
+    return {
+        'id': log.id,
+        'created_at': log.created_at.isoformat(),
+        'action': log.action,
+        'modelo': f"{log.app_label}.{log.model_name}",
+        'object_id': log.object_id,
+        'changes': log.changes or {},
+        'actor_id': log.actor_id,
+        'actor_username': log.actor_username,
+        'ip': log.ip,
+        'request_id': log.request_id,
+        'source': log.source,
+        'extra': log.extra or {},
+    }
+
+
+def _cursor_invalido():
+    return JsonResponse({'error': 'Cursor no válido'}, status=400)
+
+
+def _pagina_archivo(ct, object_id, valores, tamano):
+    """Página de la historia archivada, con el mismo orden y cursor que la tabla."""
+    entradas = historial_archivado(ct, object_id)
+    if valores:
+        fecha = parse_datetime(str(valores[0])) if len(valores) == 2 else None
+        if fecha is None or not isinstance(valores[1], int):
+            raise CursorInvalido('Cursor no válido')
+        entradas = [e for e in entradas if (e.created_at, e.pk) < (fecha, valores[1])]
+    siguiente = None
+    if len(entradas) > tamano:
+        entradas = entradas[:tamano]
+        siguiente = codificar_cursor([CURSOR_ARCHIVO, entradas[-1].created_at, entradas[-1].pk])
+    return entradas, siguiente
+
+
+@require_GET
+@login_required
+@user_passes_test(_puede_consultar)
+def api_historial_objeto(request, app_label, model_name, object_id):
+    """
+    Línea de tiempo de un objeto, de lo más reciente a lo más antiguo.
+
+    Parámetros:
+    - cursor: valor de ``siguiente`` de la página anterior
+    - page_size: tamaño de página (por defecto 25, máximo 200)
+
+    Al terminar la tabla continúa con la historia archivada (``audit.archivo``).
+    """
+    try:
+        ct = ContentType.objects.get_by_natural_key(app_label, model_name.lower())
+    except ContentType.DoesNotExist:
+        raise Http404('Modelo no encontrado')
+    tamano = tamano_pagina(request.GET.get('page_size'))
+    cursor = request.GET.get('cursor')
+
+    try:
+        valores = decodificar_cursor(cursor) if cursor else None
+        if valores and valores[0] == CURSOR_ARCHIVO:
+            items, siguiente = _pagina_archivo(ct, object_id, valores[1:], tamano)
+        else:
+            queryset = AuditLog.objects.filter(content_type=ct, object_id=str(object_id))
+            items, siguiente = paginar_por_cursor(queryset, ORDEN, cursor, tamano)
+            archivado = siguiente is None and IndiceAuditoriaArchivada.objects.filter(
+                content_type=ct, object_id=str(object_id),
+            ).exists()
+            if archivado:
+                # La tabla se acabó: se sigue con el archivo después de la última entrada vista
+                ultimo = items[-1] if items else None
+                desde = [ultimo.created_at, ultimo.pk] if ultimo else valores
+                resto = tamano - len(items)
+                if resto:
+                    extra, siguiente = _pagina_archivo(ct, object_id, desde, resto)
+                    items = items + extra
+                else:
+                    siguiente = codificar_cursor([CURSOR_ARCHIVO, *desde])
+    except CursorInvalido:
+        return _cursor_invalido()
+
+    return JsonResponse({
+        'modelo': f"{ct.app_label}.{ct.model}",
+        'object_id': str(object_id),
+        'results': [_serializar(log) for log in items],
+        'siguiente': siguiente,
+    })
+
+
+def _limite_del_dia(valor, fin=False):
+    """Inicio (o fin) del día AAAA-MM-DD en hora local, o None si no es una fecha."""
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        return None
+    if fecha is None:
+        return None
+    return timezone.make_aware(datetime.combine(fecha, time.max if fin else time.min))
+
+
+@require_GET
+@login_required
+@user_passes_test(_puede_consultar)
+def api_buscar(request):
+    """
+    Búsqueda en la bitácora, de lo más reciente a lo más antiguo.
+
+    Parámetros (todos opcionales):
+    - actor: id o nombre de usuario
+    - modelo: 'app_label.model_name'
+    - action: create | update | delete
+    - desde / hasta: fechas AAAA-MM-DD (inclusivas)
+    - request_id: las entradas de un request
+    - cursor, page_size: como en la línea de tiempo
+
+    Solo busca en la tabla; la historia archivada se consulta por objeto.
+    """
+    queryset = AuditLog.objects.all()
+
+    actor = request.GET.get('actor', '').strip()
+    if actor:
+        queryset = queryset.filter(actor_id=int(actor)) if actor.isdigit() else queryset.filter(actor_username=actor)
+
+    modelo = request.GET.get('modelo', '').strip()
+    if modelo:
+        app_label, _, model_name = modelo.partition('.')
+        try:
+            ct = ContentType.objects.get_by_natural_key(app_label, model_name.lower())
+        except ContentType.DoesNotExist:
+            return JsonResponse({'error': f"Modelo desconocido: {modelo}"}, status=400)
+        queryset = queryset.filter(content_type=ct)
+
+    action = request.GET.get('action')
+    if action:
+        queryset = queryset.filter(action=action)
+
+    request_id = request.GET.get('request_id', '').strip()
+    if request_id:
+        queryset = queryset.filter(request_id=request_id)
+
+    for parametro, lookup, fin in (('desde', 'created_at__gte', False), ('hasta', 'created_at__lte', True)):
+        valor = request.GET.get(parametro)
+        if not valor:
+            continue
+        limite = _limite_del_dia(valor, fin=fin)
+        if limite is None:
+            return JsonResponse({'error': f"Fecha no válida en '{parametro}' (AAAA-MM-DD)"}, status=400)
+        queryset = queryset.filter(**{lookup: limite})
+
+    try:
+        items, siguiente = paginar_por_cursor(
+            queryset, ORDEN, request.GET.get('cursor'), tamano_pagina(request.GET.get('page_size')),
+        )
+    except CursorInvalido:
+        return _cursor_invalido()
+
+    return JsonResponse({
+        'results': [_serializar(log) for log in items],
+        'siguiente': siguiente,
+    })
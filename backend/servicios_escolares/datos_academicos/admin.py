@@ -22,6 +22,8 @@ class AlumnoAdmin(admin.ModelAdmin):
     search_fields = ('matricula', 'nombre', 'apellido_paterno', 'apellido_materno', 'email')
     list_filter = ('carrera', 'estatus', 'modalidad', 'division_estudio')
     ordering = ('matricula',)
+    # Se mantienen desde las calificaciones (agregados.py); editarlos aquí los desfasaría
+    readonly_fields = ('promedio', 'creditos_aprobados', 'creditos_totales')
 
 @admin.register(Docente)
 class DocenteAdmin(admin.ModelAdmin):
@@ -0,0 +1,201 @@
+"""
+Promedio y créditos aprobados del alumno, mantenidos de forma incremental.
+
+``Alumno`` guarda, además de ``promedio`` y ``creditos_aprobados``, la suma
+de calificaciones y el número de materias que cuentan para el promedio. Cada
+alta, cambio o baja de una ``Calificacion`` ajusta esos totales con la
+diferencia entre lo que aportaba antes y lo que aporta ahora (ver
+``signals.py``), sin volver a agregar todas las calificaciones del alumno.
+
+Las reglas son las de ``Alumno.calcular_promedio`` y
+``Alumno.calcular_creditos_aprobados``: solo cuentan materias de la carrera
+del alumno; el promedio, las que tienen ``cuenta_promedio``; los créditos,
+las calificaciones aprobatorias.
+
+Lo que no pasa por señales (``bulk_create``, ``QuerySet.update``, SQL
+directo) puede dejar los totales desfasados: ``recalcular_agregados``
+recalcula muchos alumnos a la vez con una consulta agrupada y
+``bulk_update`` por lotes (comandos ``recalcular_agregados_alumnos`` y
+``verificar_agregados_alumnos``).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+CALIFICACION_APROBATORIA = Decimal('6.0')
+
+SIN_APORTE = (Decimal('0'), 0, 0)
+
+CAMPOS_AGREGADOS = [
+    'suma_calificaciones', 'materias_promediadas', 'creditos_aprobados', 'promedio', 'creditos_totales',
+]
+
+
+def calcular_promedio(suma, materias):
+    if not materias:
+        return Decimal('0.00')
+    return (Decimal(suma) / materias).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def reglas_materia(alumno_id, materia_id):
+    """{'materia__cuenta_promedio', 'materia__creditos'} si la materia es de la carrera del alumno, o None."""
+    from .models import MateriaCarrera
+
+    return MateriaCarrera.objects.filter(
+        materia_id=materia_id, carrera__alumnos=alumno_id,
+    ).values('materia__cuenta_promedio', 'materia__creditos').first()
+
+
+def aporte(alumno_id, materia_id, calificacion, reglas=None):
+    """(suma, materias, créditos) con que una calificación entra a los agregados del alumno."""
+    if alumno_id is None or materia_id is None or calificacion is None:
+        return SIN_APORTE
+    materia = reglas if reglas is not None else reglas_materia(alumno_id, materia_id)
+    if not materia:
+        return SIN_APORTE
+    calificacion = Decimal(calificacion)
+    cuenta = materia['materia__cuenta_promedio']
+    return (
+        calificacion if cuenta else Decimal('0'),
+        1 if cuenta else 0,
+        materia['materia__creditos'] if calificacion >= CALIFICACION_APROBATORIA else 0,
+    )
+
+
+def aplicar_delta(alumno_id, suma, materias, creditos):
+    """Suma la diferencia a los totales del alumno y recalcula su promedio (bloquea solo su fila)."""
+    from .models import Alumno
+
+    if not (suma or materias or creditos):
+        return
+    with transaction.atomic():
+        actual = Alumno.objects.select_for_update(of=('self',)).filter(pk=alumno_id).values(
+            'suma_calificaciones', 'materias_promediadas', 'creditos_aprobados', 'carrera__creditos_totales',
+        ).first()
+        if actual is None:
+            return
+        nueva_suma = actual['suma_calificaciones'] + suma
+        nuevas_materias = max(actual['materias_promediadas'] + materias, 0)
+        campos = {
+            'suma_calificaciones': nueva_suma,
+            'materias_promediadas': nuevas_materias,
+            'creditos_aprobados': max(actual['creditos_aprobados'] + creditos, 0),
+            'promedio': calcular_promedio(nueva_suma, nuevas_materias),
+        }
+        if actual['carrera__creditos_totales']:
+            campos['creditos_totales'] = actual['carrera__creditos_totales']
+        # Valores derivados: se escriben sin save() para no auditar cada ajuste
+        Alumno.objects.filter(pk=alumno_id).update(**campos)
+
+
+def registrar_cambio(anterior, nuevo):
+    """
+    Ajusta los agregados por el cambio de una calificación. ``anterior`` y
+    ``nuevo`` son (alumno_id, materia_id, calificacion) o None (alta/baja).
+    """
+    if anterior and nuevo and anterior[:2] == nuevo[:2]:
+        # Solo cambió la calificación: las reglas de la materia se leen una vez
+        reglas = reglas_materia(*nuevo[:2]) or {}
+        antes, despues = aporte(*anterior, reglas=reglas), aporte(*nuevo, reglas=reglas)
+    else:
+        antes = aporte(*anterior) if anterior else SIN_APORTE
+        despues = aporte(*nuevo) if nuevo else SIN_APORTE
+    if anterior and nuevo and anterior[0] == nuevo[0]:
+        aplicar_delta(nuevo[0], *(d - a for d, a in zip(despues, antes)))
+        return
+    if anterior:
+        aplicar_delta(anterior[0], *(-a for a in antes))
+    if nuevo:
+        aplicar_delta(nuevo[0], *despues)
+
+
+def agregados_de(alumno):
+    """Totales calculados desde cero para un alumno: {'suma', 'materias', 'creditos'}."""
+    calculados = alumno.calificaciones.filter(
+        materia__materiacarrera__carrera=alumno.carrera_id,
+    ).aggregate(
+        suma=Sum('calificacion', filter=Q(materia__cuenta_promedio=True)),
+        materias=Count('id', filter=Q(materia__cuenta_promedio=True)),
+        creditos=Sum('materia__creditos', filter=Q(calificacion__gte=CALIFICACION_APROBATORIA)),
+    )
+    return {
+        'suma': calculados['suma'] or Decimal('0'),
+        'materias': calculados['materias'] or 0,
+        'creditos': calculados['creditos'] or 0,
+    }
+
+
+def asignar_agregados(alumno):
+    """Recalcula desde cero los agregados de un alumno y los asigna (sin guardar)."""
+    calculados = agregados_de(alumno)
+    alumno.suma_calificaciones = calculados['suma']
+    alumno.materias_promediadas = calculados['materias']
+    alumno.creditos_aprobados = calculados['creditos']
+    alumno.promedio = calcular_promedio(calculados['suma'], calculados['materias'])
+
+
+def totales_por_alumno(alumnos):
+    """
+    Totales calculados desde cero para todos los ``alumnos`` (queryset) en
+    una sola consulta agrupada: {alumno_id: {'suma', 'materias', 'creditos'}}.
+    Los alumnos sin calificaciones de su carrera no aparecen.
+    """
+    from .models import Calificacion
+
+    filas = Calificacion.objects.filter(
+        alumno__in=alumnos.values('pk'),
+        materia__materiacarrera__carrera=F('alumno__carrera'),
+    ).order_by().values('alumno_id').annotate(
+        suma=Sum('calificacion', filter=Q(materia__cuenta_promedio=True)),
+        materias=Count('id', filter=Q(materia__cuenta_promedio=True)),
+        creditos=Sum('materia__creditos', filter=Q(calificacion__gte=CALIFICACION_APROBATORIA)),
+    )
+    return {
+        fila['alumno_id']: {
+            'suma': fila['suma'] or Decimal('0'),
+            'materias': fila['materias'] or 0,
+            'creditos': fila['creditos'] or 0,
+        }
+        for fila in filas
+    }
+
+
+def recalcular_agregados(alumnos, aplicar=True, tamano_lote=500):
+    """
+    Recalcula los agregados de ``alumnos`` (queryset) y, con ``aplicar``,
+    guarda los que cambiaron con ``bulk_update`` en lotes de ``tamano_lote``.
+    Devuelve [(fila, {campo: (guardado, calculado)})] de los alumnos que
+    cambiaron, donde ``fila`` trae ``pk`` y ``matricula``.
+    """
+    from .models import Alumno
+
+    totales = totales_por_alumno(alumnos)
+    vacio = {'suma': Decimal('0'), 'materias': 0, 'creditos': 0}
+    cambios = []
+    pendientes = []
+    filas = alumnos.order_by('pk').values('pk', 'matricula', 'carrera__creditos_totales', *CAMPOS_AGREGADOS)
+    for fila in filas.iterator(chunk_size=2000):
+        calculado = totales.get(fila['pk'], vacio)
+        esperado = {
+            'suma_calificaciones': calculado['suma'],
+            'materias_promediadas': calculado['materias'],
+            'creditos_aprobados': calculado['creditos'],
+            'promedio': calcular_promedio(calculado['suma'], calculado['materias']),
+            # Como en actualizar_datos_academicos: solo si la carrera ya tiene total
+            'creditos_totales': fila['carrera__creditos_totales'] or fila['creditos_totales'],
+        }
+        diferencias = {
+            campo: (fila[campo], valor) for campo, valor in esperado.items() if fila[campo] != valor
+        }
+        if not diferencias:
+            continue
+        cambios.append((fila, diferencias))
+        if aplicar:
+            pendientes.append(Alumno(pk=fila['pk'], **esperado))
+            if len(pendientes) >= tamano_lote:
+                Alumno.objects.bulk_update(pendientes, CAMPOS_AGREGADOS)
+                pendientes = []
+    if pendientes:
+        Alumno.objects.bulk_update(pendientes, CAMPOS_AGREGADOS)
+    return cambios
@@ -8,3 +8,5 @@ class DatosAcademicosConfig(AppConfig):
     
     def ready(self):
         import datos_academicos.signals
+        # Receptores que invalidan la caché de tableros al guardar cualquier modelo
+        import servicios_escolares.cache_etiquetas
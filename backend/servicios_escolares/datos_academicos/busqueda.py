@@ -0,0 +1,165 @@
+"""
+Búsqueda de alumnos sin acentos ni mayúsculas.
+
+Cada alumno tiene una fila en ``AlumnoBusqueda`` con su texto de búsqueda
+normalizado (matrícula, nombre, apellidos y carrera en minúsculas, sin
+acentos ni signos) y una fila en ``TokenBusquedaAlumno`` por palabra y por
+sufijo de la matrícula. Se
+mantienen al guardar el alumno o renombrar su carrera (``signals.py``); lo
+que se escribe sin señales (importación con ``bulk_create``) llama a
+``indexar_alumnos`` y ``manage.py reindexar_busqueda_alumnos`` rehace todo.
+
+``buscar_alumnos("gomez ana")`` devuelve los alumnos que tienen todas las
+palabras buscadas, ordenados por relevancia:
+
+- PostgreSQL: ``texto LIKE '%palabra%'`` sobre un índice GIN de trigramas
+  (``pg_trgm``, migración 0049) y orden por ``word_similarity``.
+- Otros motores: cada palabra es prefijo de alguna palabra del alumno,
+  resuelto como rango sobre el índice de ``TokenBusquedaAlumno.token``. Los
+  sufijos de la matrícula hacen que también se encuentre por en medio
+  (``'0031'`` encuentra ``20240031``) sin un ``LIKE '%...%'``. El orden es
+  cuántas palabras coinciden completas.
+"""
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Count, F, FloatField, Func, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+# Filas por bulk_create al reindexar
+TAMANO_LOTE = 1000
+
+# max_length de TokenBusquedaAlumno.token
+LONGITUD_TOKEN = 100
+
+# Largo mínimo de los sufijos de la matrícula que se indexan como token
+MINIMO_SUFIJO = 3
+
+
+def normalizar(texto):
+    """'Gómez-Peña, JOSÉ' -> 'gomez pena jose'"""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return _NO_ALFANUMERICO.sub(' ', texto).strip()
+
+
+def palabras(texto):
+    """Palabras normalizadas sin repetir, en orden de aparición."""
+    return list(dict.fromkeys(normalizar(texto).split()))
+
+
+def texto_de(matricula, nombre, apellido_paterno, apellido_materno, carrera):
+    return normalizar(' '.join(filter(None, [matricula, nombre, apellido_paterno, apellido_materno, carrera])))
+
+
+def tokens_de(texto, matricula):
+    """Palabras de ``texto`` más los sufijos de la matrícula ('20240031' -> '0240031', ..., '031')."""
+    tokens = dict.fromkeys(texto.split())
+    for parte in normalizar(matricula).split():
+        for i in range(1, len(parte) - MINIMO_SUFIJO + 1):
+            tokens.setdefault(parte[i:])
+    return list(dict.fromkeys(token[:LONGITUD_TOKEN] for token in tokens))
+
+
+def _usa_trigramas():
+    return connection.vendor == 'postgresql'
+
+
+def _escribir(textos):
+    """Reemplaza el índice de los alumnos de ``textos`` ({alumno_id: (texto, matricula)})."""
+    from .models import AlumnoBusqueda, TokenBusquedaAlumno
+
+    ids = list(textos)
+    with transaction.atomic():
+        for i in range(0, len(ids), TAMANO_LOTE):
+            lote = ids[i:i + TAMANO_LOTE]
+            AlumnoBusqueda.objects.filter(alumno_id__in=lote).delete()
+            TokenBusquedaAlumno.objects.filter(alumno_id__in=lote).delete()
+            AlumnoBusqueda.objects.bulk_create([
+                AlumnoBusqueda(alumno_id=alumno_id, texto=textos[alumno_id][0]) for alumno_id in lote
+            ])
+            TokenBusquedaAlumno.objects.bulk_create([
+                TokenBusquedaAlumno(alumno_id=alumno_id, token=token)
+                for alumno_id in lote
+                for token in tokens_de(*textos[alumno_id])
+            ], batch_size=TAMANO_LOTE)
+
+
+def indexar_alumno(alumno):
+    """Actualiza el índice de un alumno si cambió su texto de búsqueda."""
+    from .models import Alumno, AlumnoBusqueda, Carrera
+
+    carrera = None
+    if Alumno._meta.get_field('carrera').is_cached(alumno):
+        carrera = alumno.carrera.nombre if alumno.carrera else None
+    elif alumno.carrera_id:
+        carrera = Carrera.objects.filter(pk=alumno.carrera_id).values_list('nombre', flat=True).first()
+    texto = texto_de(alumno.matricula, alumno.nombre, alumno.apellido_paterno, alumno.apellido_materno, carrera)
+    actual = AlumnoBusqueda.objects.filter(alumno_id=alumno.pk).values_list('texto', flat=True).first()
+    if actual != texto:
+        _escribir({alumno.pk: (texto, alumno.matricula)})
+
+
+def indexar_alumnos(alumnos):
+    """Rehace el índice de ``alumnos`` (queryset) por lotes. Devuelve cuántos se indexaron."""
+    filas = alumnos.order_by('pk').values_list(
+        'pk', 'matricula', 'nombre', 'apellido_paterno', 'apellido_materno', 'carrera__nombre',
+    )
+    total = 0
+    textos = {}
+    for pk, *campos in filas.iterator(chunk_size=TAMANO_LOTE):
+        textos[pk] = (texto_de(*campos), campos[0])
+        if len(textos) >= TAMANO_LOTE:
+            _escribir(textos)
+            total += len(textos)
+            textos = {}
+    if textos:
+        _escribir(textos)
+        total += len(textos)
+    return total
+
+
+def buscar_alumnos(consulta, queryset=None):
+    """
+    Alumnos de ``queryset`` que tienen todas las palabras de ``consulta``,
+    anotados con ``relevancia`` y ordenados de más a menos relevante (y por
+    matrícula). Sin palabras buscables devuelve ``queryset`` sin filtrar,
+    ordenado por matrícula.
+    """
+    from .models import Alumno, TokenBusquedaAlumno
+
+    if queryset is None:
+        queryset = Alumno.objects.all()
+    buscadas = [palabra[:LONGITUD_TOKEN] for palabra in palabras(consulta)]
+    if not buscadas:
+        return queryset.order_by('matricula')
+
+    if _usa_trigramas():
+        for palabra in buscadas:
+            queryset = queryset.filter(busqueda__texto__contains=palabra)
+        relevancia = Func(
+            Value(' '.join(buscadas)), F('busqueda__texto'),
+            function='WORD_SIMILARITY', output_field=FloatField(),
+        )
+    else:
+        por_palabras = Q()
+        for palabra in buscadas:
+            # Rango en lugar de LIKE 'palabra%' para que SQLite use el índice
+            por_palabras &= Q(pk__in=TokenBusquedaAlumno.objects.filter(
+                token__gte=palabra, token__lt=palabra + '\uffff',
+            ).values('alumno_id'))
+        queryset = queryset.filter(por_palabras)
+        relevancia = Coalesce(
+            Subquery(
+                TokenBusquedaAlumno.objects.filter(alumno=OuterRef('pk'), token__in=buscadas)
+                .order_by().values('alumno').annotate(total=Count('pk')).values('total'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+    return queryset.annotate(relevancia=relevancia).order_by('-relevancia', 'matricula')
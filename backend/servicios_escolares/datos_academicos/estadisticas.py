@@ -0,0 +1,253 @@
+"""
+Estadísticas de los tableros de gestión (alumnos, calificaciones, materias).
+
+Cada tablero junta sus totales en una sola consulta con agregados
+condicionales (``Count('id', filter=Q(...))``) en lugar de un ``count()``
+por cifra, y los histogramas se agrupan por ``WidthBucket``: una pasada
+sobre la tabla sin importar cuántas barras tenga la gráfica. Los cortes por
+carrera, materia o periodo son consultas agrupadas que devuelven pocas filas
+y se reparten en Python.
+"""
+from datetime import date
+
+from django.db.models import Avg, Count, F, Func, IntegerField, Q, Sum, Value
+
+from servicios_escolares.cache_etiquetas import registrar_etiquetas
+
+# Escala 0-100 de los tableros
+CALIFICACION_APROBATORIA = 60
+
+# Rangos del histograma de calificaciones: WidthBucket(calificacion, 60, 90, 3)
+# da 0 debajo de 60, 1..3 para 60-69, 70-79 y 80-89, y 4 desde 90
+RANGOS_CALIFICACIONES = [
+    '0-59 (Reprobado)', '60-69 (Suficiente)', '70-79 (Bien)', '80-89 (Notable)', '90-100 (Excelente)',
+]
+
+
+class WidthBucket(Func):
+    """
+    ``width_bucket(expresion, minimo, maximo, cubetas)`` de PostgreSQL:
+    número de cubeta (1..cubetas) de igual ancho entre ``minimo`` y
+    ``maximo``, 0 por debajo y cubetas + 1 desde ``maximo``. En los demás
+    motores se traduce al ``CASE`` equivalente con ``FLOOR`` (SQLite lo
+    tiene registrado por Django).
+    """
+    function = 'WIDTH_BUCKET'
+    arity = 4
+    output_field = IntegerField()
+
+    def __init__(self, expresion, minimo, maximo, cubetas, **extra):
+        super().__init__(expresion, Value(minimo), Value(maximo), Value(cubetas), **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        expresion, minimo, maximo, cubetas = self.get_source_expressions()
+        sql, params = compiler.compile(expresion)
+        # En la rama ELSE el valor es >= minimo, así que la división entera también redondea hacia abajo
+        return (
+            f"CASE WHEN {sql} < %s THEN 0 WHEN {sql} >= %s THEN %s "
+            f"ELSE CAST(FLOOR(({sql} - %s) * %s / %s) AS INTEGER) + 1 END",
+            (
+                *params, minimo.value, *params, maximo.value, cubetas.value + 1,
+                *params, minimo.value, cubetas.value, maximo.value - minimo.value,
+            ),
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, **extra_context)
+
+
+def histograma(queryset, campo, minimo, maximo, cubetas):
+    """Conteos por cubeta de ``campo`` (lista de cubetas + 2: debajo de ``minimo``, cubetas, desde ``maximo``)."""
+    conteos = [0] * (cubetas + 2)
+    filas = queryset.exclude(**{f"{campo}__isnull": True}).order_by().values(
+        cubeta=WidthBucket(F(campo), minimo, maximo, cubetas),
+    ).annotate(cantidad=Count('pk'))
+    for fila in filas:
+        conteos[fila['cubeta']] = fila['cantidad']
+    return conteos
+
+
+def _porcentaje(parte, total):
+    return (parte / total * 100) if total > 0 else 0
+
+
+def estadisticas_calificaciones(queryset=None):
+    """Cifras del tablero de calificaciones en seis consultas."""
+    from .models import Calificacion
+
+    if queryset is None:
+        queryset = Calificacion.objects.all()
+    queryset = queryset.order_by()
+    aprobada = Q(calificacion__gte=CALIFICACION_APROBATORIA)
+
+    resumen = queryset.aggregate(
+        total=Count('id'),
+        aprobadas=Count('id', filter=aprobada),
+        reprobadas=Count('id', filter=Q(calificacion__lt=CALIFICACION_APROBATORIA)),
+        promedio=Avg('calificacion'),
+        del_mes=Count('id', filter=Q(fecha_registro__gte=date.today().replace(day=1))),
+        creditos=Sum('creditos'),
+    )
+
+    acreditaciones = list(queryset.values('acreditacion').annotate(total=Count('id')).order_by('-total'))
+    por_acreditacion = {item['acreditacion']: item['total'] for item in acreditaciones}
+
+    por_carrera = list(
+        queryset.values('alumno__carrera__nombre').annotate(cantidad=Count('id')).order_by('-cantidad')
+    )
+
+    por_materia = list(
+        queryset.values('materia__nombre', 'materia__clave').annotate(
+            num_calificaciones=Count('id'),
+            promedio=Avg('calificacion'),
+            aprobadas=Count('id', filter=aprobada),
+            total_evaluaciones=Count('id'),
+        ).order_by('-num_calificaciones', 'materia__clave')
+    )
+    for materia in por_materia:
+        materia['porcentaje_aprobacion'] = _porcentaje(materia['aprobadas'], materia['total_evaluaciones'])
+
+    por_periodo = list(
+        queryset.values('periodo_escolar__ciclo', 'periodo_escolar__año').annotate(
+            cantidad=Count('id'), promedio=Avg('calificacion'),
+        ).order_by('periodo_escolar__año', 'periodo_escolar__ciclo')
+    )
+
+    total = resumen['total']
+    return {
+        'total': total,
+        'aprobadas': resumen['aprobadas'],
+        'reprobadas': resumen['reprobadas'],
+        'promedio': resumen['promedio'] or 0,
+        'porcentaje_aprobacion': _porcentaje(resumen['aprobadas'], total),
+        'porcentaje_reprobacion': _porcentaje(resumen['reprobadas'], total),
+        'del_mes': resumen['del_mes'],
+        'creditos': resumen['creditos'] or 0,
+        'acreditaciones': acreditaciones,
+        'por_acreditacion': por_acreditacion,
+        'por_carrera': por_carrera,
+        'rangos': list(zip(RANGOS_CALIFICACIONES, histograma(queryset, 'calificacion', 60, 90, 3))),
+        'materias_populares': por_materia[:10],
+        'materias_bajo_rendimiento': [
+            m for m in por_materia if m['promedio'] is not None and m['promedio'] < CALIFICACION_APROBATORIA
+        ],
+        'materias_excelencia': [m for m in por_materia if m['promedio'] is not None and m['promedio'] >= 90],
+        'por_periodo': por_periodo,
+    }
+
+
+def estadisticas_alumnos(queryset=None):
+    """Cifras del tablero de alumnos en tres consultas."""
+    from .models import Alumno
+
+    if queryset is None:
+        queryset = Alumno.objects.all()
+    queryset = queryset.order_by()
+
+    resumen = queryset.aggregate(
+        total=Count('id'),
+        inscritos=Count('id', filter=Q(estatus='Inscrito')),
+        nuevos_ingresos=Count('id', filter=Q(division_estudio='Nuevo Ingreso')),
+        reingresos=Count('id', filter=Q(division_estudio='Reingreso')),
+        promedio=Avg('promedio'),
+        creditos_aprobados=Sum('creditos_aprobados'),
+    )
+
+    por_carrera = queryset.values('carrera__nombre', 'carrera__clave').annotate(
+        num_alumnos=Count('id'),
+        promedio=Avg('promedio'),
+        inscritos=Count('id', filter=Q(estatus='Inscrito')),
+    ).order_by('-num_alumnos')
+
+    por_estatus = list(queryset.values('estatus').annotate(cantidad=Count('id')).order_by('-cantidad'))
+
+    carreras = []
+    for carrera in por_carrera[:5]:
+        carrera['porcentaje_inscritos'] = _porcentaje(carrera['inscritos'], carrera['num_alumnos'])
+        carreras.append(carrera)
+
+    return {
+        'total': resumen['total'],
+        'inscritos': resumen['inscritos'],
+        'nuevos_ingresos': resumen['nuevos_ingresos'],
+        'reingresos': resumen['reingresos'],
+        'promedio': resumen['promedio'] or 0,
+        'porcentaje_inscritos': _porcentaje(resumen['inscritos'], resumen['total']),
+        'creditos_aprobados': resumen['creditos_aprobados'] or 0,
+        'por_carrera': carreras,
+        'por_estatus': por_estatus,
+    }
+
+
+def estadisticas_materias():
+    """
+    Cifras del tablero de materias. Los conteos por tipo y los créditos salen
+    de una consulta agrupada por tipo; las materias por carrera, del índice
+    de planes (``plan_curricular``).
+    """
+    from .models import Materia, PlanEstudio
+    from .plan_curricular import indice_curricular
+
+    por_tipo = list(
+        Materia.objects.order_by().values('tipo').annotate(
+            cantidad=Count('id'), total_creditos=Sum('creditos'),
+        ).order_by('-total_creditos')
+    )
+    cantidades = {item['tipo']: item['cantidad'] for item in por_tipo}
+    total = sum(cantidades.values())
+    creditos = sum(item['total_creditos'] or 0 for item in por_tipo)
+
+    indice = indice_curricular()
+    por_carrera = sorted(
+        ((carrera.nombre, indice.totales(carrera_id)[0]) for carrera_id, carrera in indice.carreras.items()),
+        key=lambda item: -item[1],
+    )
+
+    return {
+        'total': total,
+        'por_tipo': por_tipo,
+        'obligatorias': cantidades.get('Obligatoria', 0),
+        'optativas': cantidades.get('Optativa', 0),
+        'especialidad': cantidades.get('Especialidad', 0),
+        'promedio_creditos': creditos / total if total else 0,
+        'por_carrera': por_carrera,
+        'total_planes': PlanEstudio.objects.count(),
+        'populares': Materia.objects.annotate(
+            num_calificaciones=Count('calificaciones'),
+        ).order_by('-num_calificaciones')[:5],
+    }
+
+
+# Modelos de los que dependen los KPIs del tablero general (ver cache_etiquetas)
+ETIQUETAS_TABLERO_GENERAL = registrar_etiquetas(
+    'datos_academicos.alumno', 'datos_academicos.carrera', 'procedimientos.tramite',
+)
+
+
+def kpis_tablero_general():
+    """KPIs y gráficas del tablero general (alumnos por carrera, trámites por tipo) en cuatro consultas."""
+    from procedimientos.models import Tramite
+    from .models import Alumno
+
+    alumnos = Alumno.objects.order_by().aggregate(
+        inscritos=Count('id', filter=Q(estatus='Inscrito')),
+        egresados=Count('id', filter=Q(estatus='Titulado')),
+    )
+    tramites = Tramite.objects.order_by().aggregate(
+        en_curso=Count('id', filter=Q(estado='En proceso')),
+        certificados=Count('id', filter=Q(tipo='certificado')),
+    )
+    por_carrera = list(
+        Alumno.objects.values('carrera__nombre').annotate(cantidad=Count('id')).order_by('-cantidad')
+    )
+    por_tipo = list(Tramite.objects.values('tipo').annotate(cantidad=Count('id')).order_by('-cantidad'))
+    return {
+        'alumnos_inscritos': alumnos['inscritos'],
+        'egresados': alumnos['egresados'],
+        'tramites_en_curso': tramites['en_curso'],
+        'certificados_emitidos': tramites['certificados'],
+        'carreras': [item['carrera__nombre'] for item in por_carrera],
+        'cantidades_carreras': [item['cantidad'] for item in por_carrera],
+        'tramites_tipos': [item['tipo'] for item in por_tipo],
+        'tramites_cantidades': [item['cantidad'] for item in por_tipo],
+    }
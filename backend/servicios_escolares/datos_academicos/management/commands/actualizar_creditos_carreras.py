@@ -1,4 +1,7 @@
 from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from audit.bulk import audited_bulk_update
 from datos_academicos.models import Carrera
 
 
@@ -21,24 +24,28 @@ class Command(BaseCommand):
         carrera_clave = options.get('carrera')
         dry_run = options.get('dry_run', False)
         
+        carreras = Carrera.objects.all()
         if carrera_clave:
-            try:
-                carreras = [Carrera.objects.get(clave=carrera_clave)]
-                self.stdout.write(f"Procesando carrera específica: {carrera_clave}")
-            except Carrera.DoesNotExist:
+            carreras = carreras.filter(clave=carrera_clave)
+            if not carreras.exists():
                 self.stdout.write(
                     self.style.ERROR(f"No se encontró la carrera con clave: {carrera_clave}")
                 )
                 return
+            self.stdout.write(f"Procesando carrera específica: {carrera_clave}")
         else:
-            carreras = Carrera.objects.all()
             self.stdout.write(f"Procesando todas las carreras ({carreras.count()} encontradas)")
 
         actualizadas = 0
         sin_cambios = 0
-        
+        por_guardar = []
+
+        # Los créditos de todas las carreras en una consulta (como Carrera.calcular_creditos_totales)
+        carreras = carreras.annotate(
+            creditos_calculados=Coalesce(Sum('materiacarrera__materia__creditos'), 0)
+        ).order_by('clave')
         for carrera in carreras:
-            creditos_calculados = carrera.calcular_creditos_totales()
+            creditos_calculados = carrera.creditos_calculados
             creditos_actuales = carrera.creditos_totales
             
             if creditos_calculados != creditos_actuales:
@@ -49,7 +56,7 @@ class Command(BaseCommand):
                     )
                 else:
                     carrera.creditos_totales = creditos_calculados
-                    carrera.save(update_fields=['creditos_totales'])
+                    por_guardar.append(carrera)
                     self.stdout.write(
                         self.style.SUCCESS(
                             f"✓ {carrera.clave} - {carrera.nombre}: "
@@ -65,6 +72,9 @@ class Command(BaseCommand):
                         f"{creditos_actuales} créditos (sin cambios)"
                     )
 
+        if por_guardar:
+            audited_bulk_update(Carrera, por_guardar, ['creditos_totales'], batch_size=500)
+
         # Resumen
         self.stdout.write("\n" + "="*50)
         if dry_run:
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from servicios_escolares.cache_etiquetas import invalidar_modelo
 from servicios_escolares.datos_academicos.models import Alumno, PeriodoEscolar
 
 
@@ -17,4 +18,6 @@ class Command(BaseCommand):
             return
 
         total_actualizados = Alumno.objects.exclude(estatus='No inscrito').update(estatus='No inscrito')
+        # QuerySet.update no envía señales
+        invalidar_modelo(Alumno)
         self.stdout.write(self.style.SUCCESS(f'Alumnos actualizados a "No inscrito": {total_actualizados}'))
\ No newline at end of file
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from datos_academicos.agregados import recalcular_agregados
+from datos_academicos.resumen import descartar_resumenes
+from datos_academicos.models import Alumno, Carrera
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula el promedio y los créditos aprobados de todos los alumnos con una sola '
+        'consulta agrupada y guarda los cambios con bulk_update por lotes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--carrera',
+            type=str,
+            help='Clave de la carrera específica a recalcular (opcional)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra qué cambios se harían sin aplicarlos',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Alumnos por bulk_update (por defecto: 500)',
+        )
+
+    def handle(self, *args, **options):
+        carrera_clave = options.get('carrera')
+        dry_run = options.get('dry_run', False)
+
+        alumnos = Alumno.objects.all()
+        if carrera_clave:
+            if not Carrera.objects.filter(clave=carrera_clave).exists():
+                self.stdout.write(self.style.ERROR(f"No se encontró la carrera con clave: {carrera_clave}"))
+                return
+            alumnos = alumnos.filter(carrera__clave=carrera_clave)
+            self.stdout.write(f"Procesando carrera específica: {carrera_clave}")
+
+        inicio = time.monotonic()
+        cambios = recalcular_agregados(alumnos, aplicar=not dry_run, tamano_lote=options['lote'])
+        if not dry_run:
+            # Los resúmenes del portal se rehacen al consultarlos
+            descartar_resumenes(alumnos)
+        duracion = time.monotonic() - inicio
+
+        if options.get('verbosity', 1) >= 2 or dry_run:
+            for fila, diferencias in cambios:
+                detalle = ', '.join(
+                    f"{campo}: {guardado} → {calculado}" for campo, (guardado, calculado) in diferencias.items()
+                )
+                prefijo = '[DRY RUN] ' if dry_run else ''
+                self.stdout.write(f"{prefijo}{fila['matricula']}: {detalle}")
+
+        self.stdout.write("\n" + "=" * 50)
+        if dry_run:
+            self.stdout.write(self.style.WARNING("MODO DRY RUN - No se aplicaron cambios"))
+        self.stdout.write(f"Alumnos con cambios: {len(cambios)}")
+        self.stdout.write(f"Tiempo: {duracion:.1f} s")
+        if cambios and not dry_run:
+            self.stdout.write(self.style.SUCCESS(f"\n✓ Se actualizaron {len(cambios)} alumnos"))
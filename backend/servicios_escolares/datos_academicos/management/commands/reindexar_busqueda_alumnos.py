@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from datos_academicos.busqueda import indexar_alumnos
+from datos_academicos.models import Alumno, Carrera
+
+
+class Command(BaseCommand):
+    help = 'Rehace el índice de búsqueda de alumnos (texto normalizado y palabras por prefijo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--carrera',
+            type=str,
+            help='Clave de la carrera específica a reindexar (opcional)',
+        )
+
+    def handle(self, *args, **options):
+        carrera_clave = options.get('carrera')
+
+        alumnos = Alumno.objects.all()
+        if carrera_clave:
+            if not Carrera.objects.filter(clave=carrera_clave).exists():
+                self.stdout.write(self.style.ERROR(f"No se encontró la carrera con clave: {carrera_clave}"))
+                return
+            alumnos = alumnos.filter(carrera__clave=carrera_clave)
+
+        inicio = time.monotonic()
+        total = indexar_alumnos(alumnos)
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(f"✓ Se indexaron {total} alumnos en {duracion:.1f} s"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from datos_academicos.agregados import recalcular_agregados
+from datos_academicos.models import Alumno
+
+
+class Command(BaseCommand):
+    help = 'Detecta (y con --reparar corrige) alumnos cuyo promedio o créditos aprobados no coinciden con sus calificaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--carrera',
+            type=str,
+            help='Clave de la carrera a revisar (opcional)',
+        )
+        parser.add_argument(
+            '--reparar',
+            action='store_true',
+            help='Guarda los valores recalculados de los alumnos desfasados',
+        )
+
+    def handle(self, *args, **options):
+        alumnos = Alumno.objects.order_by('pk')
+        if options.get('carrera'):
+            alumnos = alumnos.filter(carrera__clave=options['carrera'])
+
+        desfasados = recalcular_agregados(alumnos, aplicar=options['reparar'])
+        for fila, diferencias in desfasados:
+            detalle = ', '.join(f"{campo}: {guardado} → {calculado}" for campo, (guardado, calculado) in diferencias.items())
+            self.stdout.write(f"{fila['matricula']}: {detalle}")
+
+        if not desfasados:
+            self.stdout.write(self.style.SUCCESS("Todos los alumnos están al día"))
+        elif options['reparar']:
+            self.stdout.write(self.style.SUCCESS(f"Alumnos corregidos: {len(desfasados)}"))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"Alumnos desfasados: {len(desfasados)} (usa --reparar para corregirlos)"
+            ))
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:02
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+
+
+def calcular_totales(apps, schema_editor):
+    """
+    Llena suma_calificaciones y materias_promediadas (y recalcula promedio y
+    créditos aprobados con las mismas reglas) para los alumnos existentes, de
+    modo que los ajustes incrementales partan de valores correctos.
+    """
+    Alumno = apps.get_model('datos_academicos', 'Alumno')
+    Calificacion = apps.get_model('datos_academicos', 'Calificacion')
+
+    totales = {
+        fila['alumno_id']: fila
+        for fila in Calificacion.objects.filter(
+            materia__materiacarrera__carrera=F('alumno__carrera'),
+        ).values('alumno_id').annotate(
+            suma=Sum('calificacion', filter=Q(materia__cuenta_promedio=True)),
+            materias=Count('id', filter=Q(materia__cuenta_promedio=True)),
+            creditos=Sum('materia__creditos', filter=Q(calificacion__gte=Decimal('6.0'))),
+        )
+    }
+    alumnos = []
+    for alumno in Alumno.objects.filter(pk__in=list(totales)).only('pk'):
+        fila = totales[alumno.pk]
+        alumno.suma_calificaciones = fila['suma'] or Decimal('0')
+        alumno.materias_promediadas = fila['materias'] or 0
+        alumno.creditos_aprobados = fila['creditos'] or 0
+        alumno.promedio = (
+            (Decimal(alumno.suma_calificaciones) / alumno.materias_promediadas).quantize(
+                Decimal('0.01'), rounding=ROUND_HALF_UP,
+            )
+            if alumno.materias_promediadas else Decimal('0.00')
+        )
+        alumnos.append(alumno)
+    Alumno.objects.bulk_update(
+        alumnos, ['suma_calificaciones', 'materias_promediadas', 'creditos_aprobados', 'promedio'], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos_academicos', '0046_remove_reinscripcion_fecha_aprobacion_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alumno',
+            name='materias_promediadas',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='alumno',
+            name='suma_calificaciones',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=9),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos_academicos', '0047_agregados_incrementales_alumno'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlumnoResumenAcademico',
+            fields=[
+                ('alumno', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen_academico', serialize=False, to='datos_academicos.alumno')),
+                ('por_semestre', models.JSONField(default=list)),
+                ('total_calificaciones', models.IntegerField(default=0)),
+                ('materias_aprobadas', models.IntegerField(default=0)),
+                ('materias_reprobadas', models.IntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen académico del alumno',
+                'verbose_name_plural': 'Resúmenes académicos de alumnos',
+            },
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:12
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def texto_de(*partes):
+    # Copia de la normalización de busqueda.py en esta versión; la migración no
+    # debe depender del código actual de la app
+    texto = unicodedata.normalize('NFKD', ' '.join(filter(None, partes)))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^a-z0-9]+', ' ', texto).strip()
+
+
+def indice_trigramas(apps, schema_editor):
+    # GIN con gin_trgm_ops: acelera texto LIKE '%...%' (ver busqueda.py). Solo PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS datos_acad_busqueda_trgm_idx '
+        'ON datos_academicos_alumnobusqueda USING gin (texto gin_trgm_ops)'
+    )
+
+
+def quitar_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS datos_acad_busqueda_trgm_idx')
+
+
+def indexar_alumnos(apps, schema_editor):
+    Alumno = apps.get_model('datos_academicos', 'Alumno')
+    AlumnoBusqueda = apps.get_model('datos_academicos', 'AlumnoBusqueda')
+    TokenBusquedaAlumno = apps.get_model('datos_academicos', 'TokenBusquedaAlumno')
+
+    filas = Alumno.objects.order_by('pk').values_list(
+        'pk', 'matricula', 'nombre', 'apellido_paterno', 'apellido_materno', 'carrera__nombre',
+    )
+    textos = []
+    for pk, *campos in filas.iterator(chunk_size=1000):
+        textos.append((pk, texto_de(*campos)))
+        if len(textos) >= 1000:
+            guardar(AlumnoBusqueda, TokenBusquedaAlumno, textos)
+            textos = []
+    guardar(AlumnoBusqueda, TokenBusquedaAlumno, textos)
+
+
+def guardar(AlumnoBusqueda, TokenBusquedaAlumno, textos):
+    AlumnoBusqueda.objects.bulk_create([AlumnoBusqueda(alumno_id=pk, texto=texto) for pk, texto in textos])
+    TokenBusquedaAlumno.objects.bulk_create([
+        TokenBusquedaAlumno(alumno_id=pk, token=token[:100])
+        for pk, texto in textos
+        for token in dict.fromkeys(texto.split())
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos_academicos', '0048_resumen_academico_alumno'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlumnoBusqueda',
+            fields=[
+                ('alumno', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='busqueda', serialize=False, to='datos_academicos.alumno')),
+                ('texto', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Texto de búsqueda del alumno',
+                'verbose_name_plural': 'Textos de búsqueda de alumnos',
+            },
+        ),
+        migrations.CreateModel(
+            name='TokenBusquedaAlumno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('alumno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens_busqueda', to='datos_academicos.alumno')),
+            ],
+            options={
+                'verbose_name': 'Palabra de búsqueda del alumno',
+                'verbose_name_plural': 'Palabras de búsqueda de alumnos',
+                'indexes': [models.Index(fields=['token', 'alumno'], name='datos_acad_token_alumno_idx')],
+            },
+        ),
+        migrations.RunPython(indice_trigramas, quitar_indice_trigramas),
+        migrations.RunPython(indexar_alumnos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos_academicos', '0049_busqueda_alumnos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calificacion',
+            index=models.Index(fields=['fecha_registro', 'id'], name='datos_acad_calif_fecha_idx'),
+        ),
+    ]
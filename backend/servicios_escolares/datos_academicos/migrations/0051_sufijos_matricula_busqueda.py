@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:53
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+
+def sufijos(matricula):
+    # Copia de busqueda.tokens_de en esta versión (MINIMO_SUFIJO = 3)
+    texto = unicodedata.normalize('NFKD', matricula or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    for parte in re.sub(r'[^a-z0-9]+', ' ', texto).split():
+        for i in range(1, len(parte) - 2):
+            yield parte[i:][:100]
+
+
+def indexar_sufijos(apps, schema_editor):
+    Alumno = apps.get_model('datos_academicos', 'Alumno')
+    TokenBusquedaAlumno = apps.get_model('datos_academicos', 'TokenBusquedaAlumno')
+
+    filas = Alumno.objects.filter(busqueda__isnull=False).order_by('pk').values_list('pk', 'matricula', 'busqueda__texto')
+    nuevos = []
+    for pk, matricula, texto in filas.iterator(chunk_size=1000):
+        existentes = set(texto.split())
+        nuevos.extend(
+            TokenBusquedaAlumno(alumno_id=pk, token=token)
+            for token in dict.fromkeys(sufijos(matricula)) if token not in existentes
+        )
+        if len(nuevos) >= 1000:
+            TokenBusquedaAlumno.objects.bulk_create(nuevos)
+            nuevos = []
+    TokenBusquedaAlumno.objects.bulk_create(nuevos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos_academicos', '0050_indice_fecha_calificacion'),
+    ]
+
+    operations = [
+        migrations.RunPython(indexar_sufijos, migrations.RunPython.noop),
+    ]
@@ -79,7 +79,8 @@ class PeriodoEscolar(models.Model):
         self.full_clean()
         # Si se marca activo, desactivar otros activos
         if self.activo:
-            PeriodoEscolar.objects.filter(activo=True).exclude(pk=self.pk).update(activo=False)
+            from audit.bulk import audited_update
+            audited_update(PeriodoEscolar.objects.filter(activo=True).exclude(pk=self.pk), activo=False)
         super().save(*args, **kwargs)
 
 
@@ -119,22 +120,25 @@ class Materia(ChoicesNormalizationMixin, models.Model):
     #plan_estudio = models.ForeignKey('PlanEstudio', on_delete=models.CASCADE, related_name='materias', default=None, null=True)
     #tipo = models.ForeignKey('TipoMateria', on_delete=models.CASCADE, related_name='materias', default=None, null=True)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Reglas con las que la materia entra al promedio de los alumnos (ver signals.py)
+        if 'creditos' in instance.__dict__ and 'cuenta_promedio' in instance.__dict__:
+            instance._reglas_guardadas = (instance.creditos, instance.cuenta_promedio)
+        return instance
+
     def get_semestre_para_carrera(self, carrera):
         """Obtiene el semestre específico para una carrera"""
-        try:
-            materia_carrera = MateriaCarrera.objects.get(materia=self, carrera=carrera)
-            return materia_carrera.semestre
-        except MateriaCarrera.DoesNotExist:
-            return None
+        from .plan_curricular import indice_curricular
+        return indice_curricular().semestre(self.pk, carrera)
     
     def get_carreras_por_semestre(self):
         """Agrupa las carreras por semestre"""
+        from .plan_curricular import indice_curricular
         carreras_semestre = {}
-        for mc in MateriaCarrera.objects.filter(materia=self).select_related('carrera'):
-            semestre = mc.semestre or 'Sin semestre'
-            if semestre not in carreras_semestre:
-                carreras_semestre[semestre] = []
-            carreras_semestre[semestre].append(mc.carrera)
+        for carrera, semestre in indice_curricular().carreras_de(self.pk):
+            carreras_semestre.setdefault(semestre or 'Sin semestre', []).append(carrera)
         return carreras_semestre
 
     def __str__(self):
@@ -216,6 +220,14 @@ class Carrera(models.Model):
     objects = CarreraManager()
     plan_estudio = models.ForeignKey(PlanEstudio, on_delete=models.CASCADE, related_name='carreras', default=None, null=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # El nombre entra al texto de búsqueda de sus alumnos (ver busqueda.py)
+        if 'nombre' in instance.__dict__:
+            instance._nombre_guardado = instance.nombre
+        return instance
+
     def natural_key(self):
         return (self.clave,)
     
@@ -263,6 +275,9 @@ class Alumno(ChoicesNormalizationMixin, models.Model):
     fin_vacaciones = models.DateField(default=None, null=True, blank=True)
     promedio = models.DecimalField(max_digits=5, decimal_places=2, default=0.0)
     creditos_aprobados = models.IntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(400)])
+    # Totales con los que se mantiene el promedio de forma incremental (ver agregados.py)
+    suma_calificaciones = models.DecimalField(max_digits=9, decimal_places=2, default=0, editable=False)
+    materias_promediadas = models.IntegerField(default=0, editable=False)
     creditos_totales = models.IntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(400)])
     modalidad = models.CharField(max_length=20, choices=[('A', 'A (Presencial)'), ('B', 'B (Sabatino)')], default='A') # Cambiar a "Escolarizado"
     plan_estudio = models.ForeignKey(PlanEstudio, on_delete=models.CASCADE, related_name='alumnos', default=None, null=True)
@@ -304,6 +319,14 @@ class Alumno(ChoicesNormalizationMixin, models.Model):
     codigo_postal = models.CharField(max_length=5, blank=True, null=True)
     zona_procedencia = models.CharField(max_length=100, choices=[('Urbana', 'Urbana'), ('Rural', 'Rural')], null=True)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Carrera con la que se calcularon promedio y créditos (ver signals.py)
+        if 'carrera_id' in instance.__dict__:
+            instance._carrera_guardada = instance.carrera_id
+        return instance
+
     def calcular_promedio(self, periodo_escolar=None, incluir_todas=False):
         """
         Calcula el promedio del alumno basado en las materias que ha cursado.
@@ -347,15 +370,22 @@ class Alumno(ChoicesNormalizationMixin, models.Model):
     
     def actualizar_datos_academicos(self):
         """
-        Actualiza el promedio y créditos aprobados del alumno.
+        Recalcula desde cero el promedio y créditos aprobados del alumno.
         También actualiza los créditos totales basado en la carrera.
+
+        Las altas, cambios y bajas de calificaciones ya los ajustan de forma
+        incremental; esto es para cuando cambia la carrera del alumno o las
+        reglas de sus materias.
         """
-        self.promedio = self.calcular_promedio()
-        self.creditos_aprobados = self.calcular_creditos_aprobados()
+        from .agregados import asignar_agregados
+
+        asignar_agregados(self)
         # Actualizar créditos totales desde la carrera
         if self.carrera and self.carrera.creditos_totales > 0:
             self.creditos_totales = self.carrera.creditos_totales
-        self.save(update_fields=['promedio', 'creditos_aprobados', 'creditos_totales'])
+        self.save(update_fields=[
+            'promedio', 'creditos_aprobados', 'creditos_totales', 'suma_calificaciones', 'materias_promediadas',
+        ])
     
     def __str__(self):
         return f"{self.nombre} {self.apellido_paterno} ({self.matricula})"
@@ -392,6 +422,73 @@ class Calificacion(ChoicesNormalizationMixin, models.Model):
     class Meta:
         unique_together = ('alumno', 'materia', 'periodo_escolar')
         ordering = ['alumno', 'materia', 'periodo_escolar']
+        indexes = [
+            # Paginación por cursor de api_calificaciones_list
+            models.Index(fields=['fecha_registro', 'id'], name='datos_acad_calif_fecha_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valores_guardados = instance.valores_para_agregados()
+        return instance
+
+    def valores_para_agregados(self):
+        """(alumno_id, materia_id, calificacion) tal como están en la instancia, o None si alguno está diferido."""
+        try:
+            return tuple(self.__dict__[campo] for campo in ('alumno_id', 'materia_id', 'calificacion'))
+        except KeyError:
+            return None
 
     def __str__(self):
         return f"{self.alumno} - {self.materia} ({self.periodo_escolar}): {self.calificacion}"
+
+
+class AlumnoResumenAcademico(models.Model):
+    """
+    Resumen precalculado del avance del alumno para su portal (ver resumen.py).
+    Se rehace al registrar sus calificaciones; si no existe se crea al leerlo.
+    """
+    alumno = models.OneToOneField(Alumno, on_delete=models.CASCADE, primary_key=True, related_name='resumen_academico')
+    # [{'semestre', 'promedio', 'materias', 'aprobadas', 'creditos'}]; semestre 0 = fuera del plan de su carrera
+    por_semestre = models.JSONField(default=list)
+    total_calificaciones = models.IntegerField(default=0)
+    materias_aprobadas = models.IntegerField(default=0)
+    materias_reprobadas = models.IntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumen académico del alumno"
+        verbose_name_plural = "Resúmenes académicos de alumnos"
+
+    def __str__(self):
+        return f"Resumen de {self.alumno_id} ({self.fecha_actualizacion:%Y-%m-%d %H:%M})"
+
+
+class AlumnoBusqueda(models.Model):
+    """Texto de búsqueda normalizado del alumno (ver busqueda.py). En PostgreSQL lleva índice GIN de trigramas."""
+    alumno = models.OneToOneField(Alumno, on_delete=models.CASCADE, primary_key=True, related_name='busqueda')
+    texto = models.TextField(default='', blank=True)
+
+    class Meta:
+        verbose_name = "Texto de búsqueda del alumno"
+        verbose_name_plural = "Textos de búsqueda de alumnos"
+
+    def __str__(self):
+        return f"{self.alumno_id}: {self.texto}"
+
+
+class TokenBusquedaAlumno(models.Model):
+    """Una palabra normalizada del texto de búsqueda del alumno, para buscar por prefijo."""
+    alumno = models.ForeignKey(Alumno, on_delete=models.CASCADE, related_name='tokens_busqueda')
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        verbose_name = "Palabra de búsqueda del alumno"
+        verbose_name_plural = "Palabras de búsqueda de alumnos"
+        indexes = [
+            models.Index(fields=['token', 'alumno'], name='datos_acad_token_alumno_idx'),
+        ]
+
+    def __str__(self):
+        return self.token
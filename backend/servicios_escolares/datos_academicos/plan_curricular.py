@@ -0,0 +1,163 @@
+"""
+Índice en memoria de los planes de estudio.
+
+Las páginas académicas (kardex, planes de estudio, semestre de una materia
+en una carrera) consultan el plan de la carrera en cada visita, aunque el
+plan cambia pocas veces al año. ``indice_curricular()`` lo arma con una sola
+consulta y lo conserva en el proceso:
+
+    indice = indice_curricular()
+    for relacion in indice.plan(alumno.carrera_id):   # ordenado por semestre y clave
+        relacion.materia.clave, relacion.semestre
+
+El índice lleva una versión. Guardar o borrar una ``Materia``, ``Carrera`` o
+``MateriaCarrera`` llama a ``invalidar()`` (``signals.py``), que sube la
+versión local y la compartida en la caché de Django. Cada proceso compara su
+versión al pedir el índice y lo rehace si cambió. Con una caché por proceso
+(``LocMemCache``) los demás procesos no se enteran, y un proceso que rehaga
+el índice antes de que confirme la transacción que lo invalidó se queda con
+los datos anteriores: en ambos casos el índice caduca a los
+``PLAN_CURRICULAR_TTL`` segundos.
+
+Lo que escribe sin señales (``bulk_create``, ``QuerySet.update``) debe llamar
+a ``invalidar()`` por su cuenta.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAVE_VERSION = 'datos_academicos:plan_curricular:version'
+
+DatosMateria = namedtuple('DatosMateria', 'id clave nombre creditos tipo cuenta_promedio es_universal')
+DatosCarrera = namedtuple('DatosCarrera', 'id clave nombre')
+# Misma forma que MateriaCarrera (relacion.materia, relacion.semestre)
+MateriaPlan = namedtuple('MateriaPlan', 'materia semestre')
+
+_candado = threading.Lock()
+_indice = None
+_version_local = 0
+
+
+def ttl():
+    return getattr(settings, 'PLAN_CURRICULAR_TTL', 300)
+
+
+def _id(valor):
+    return getattr(valor, 'pk', valor)
+
+
+class IndiceCurricular:
+    """Planes de estudio de todas las carreras. No se modifica después de construirse."""
+
+    def __init__(self, version, filas):
+        self.version = version
+        self.construido = time.monotonic()
+        self.materias = {}
+        self.carreras = {}
+        planes = {}
+        self._semestres = {}
+        self._carreras_de = {}
+        for fila in filas:
+            materia = self.materias.get(fila['id'])
+            if materia is None:
+                materia = self.materias[fila['id']] = DatosMateria(
+                    fila['id'], fila['clave'], fila['nombre'], fila['creditos'],
+                    fila['tipo'], fila['cuenta_promedio'], fila['es_universal'],
+                )
+            carrera_id = fila['materiacarrera__carrera_id']
+            if carrera_id is None:
+                continue
+            if carrera_id not in self.carreras:
+                self.carreras[carrera_id] = DatosCarrera(
+                    carrera_id, fila['materiacarrera__carrera__clave'], fila['materiacarrera__carrera__nombre'],
+                )
+            semestre = fila['materiacarrera__semestre']
+            planes.setdefault(carrera_id, []).append(MateriaPlan(materia, semestre))
+            self._semestres[(materia.id, carrera_id)] = semestre
+            self._carreras_de.setdefault(materia.id, []).append((self.carreras[carrera_id], semestre))
+        self._planes = {
+            carrera_id: tuple(sorted(plan, key=lambda r: (r.semestre is None, r.semestre or 0, r.materia.clave)))
+            for carrera_id, plan in planes.items()
+        }
+        self._universales = tuple(sorted(
+            (m for m in self.materias.values() if m.es_universal), key=lambda m: m.clave,
+        ))
+
+    def plan(self, carrera):
+        """Materias de la carrera como ``MateriaPlan``, por semestre (sin semestre al final) y clave."""
+        return self._planes.get(_id(carrera), ())
+
+    def pertenece(self, materia, carrera):
+        return (_id(materia), _id(carrera)) in self._semestres
+
+    def semestre(self, materia, carrera):
+        """Semestre de la materia en la carrera; None si no está en su plan o no tiene semestre."""
+        return self._semestres.get((_id(materia), _id(carrera)))
+
+    def carreras_de(self, materia):
+        """[(DatosCarrera, semestre)] de las carreras que llevan la materia."""
+        return list(self._carreras_de.get(_id(materia), ()))
+
+    def universales(self):
+        return self._universales
+
+    def totales(self, carrera):
+        """(materias, créditos) del plan de la carrera."""
+        plan = self.plan(carrera)
+        return len(plan), sum(r.materia.creditos for r in plan)
+
+    def total_relaciones(self):
+        return len(self._semestres)
+
+
+def _version_compartida():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+        version = cache.get(CLAVE_VERSION, 1)
+    return version
+
+
+def _subir_version_compartida():
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, 2, timeout=None)
+
+
+def construir_indice(version=None):
+    """Arma el índice con una consulta (materias con sus carreras, LEFT JOIN)."""
+    from .models import Materia
+
+    filas = Materia.objects.order_by().values(
+        'id', 'clave', 'nombre', 'creditos', 'tipo', 'cuenta_promedio', 'es_universal',
+        'materiacarrera__carrera_id', 'materiacarrera__carrera__clave', 'materiacarrera__carrera__nombre',
+        'materiacarrera__semestre',
+    )
+    return IndiceCurricular(version, filas)
+
+
+def indice_curricular():
+    """Índice vigente del proceso; lo rehace si cambió la versión o caducó."""
+    global _indice
+    version = (_version_compartida(), _version_local)
+    indice = _indice
+    if indice is not None and indice.version == version and time.monotonic() - indice.construido < ttl():
+        return indice
+    with _candado:
+        indice = _indice
+        if indice is None or indice.version != version or time.monotonic() - indice.construido >= ttl():
+            indice = _indice = construir_indice(version)
+        return indice
+
+
+def invalidar():
+    """Descarta el índice de este proceso y avisa a los demás por la caché."""
+    global _indice, _version_local
+    with _candado:
+        _version_local += 1
+        _indice = None
+    _subir_version_compartida()
@@ -0,0 +1,102 @@
+"""
+Resumen académico del alumno para el portal (``AlumnoResumenAcademico``).
+
+El dashboard y la vista de calificaciones del alumno lo leen en lugar de
+agregar sus calificaciones en cada visita: promedio, materias y créditos por
+semestre del plan de su carrera, y totales de aprobadas y reprobadas. Se
+rehace con una sola consulta agrupada cuando cambia una calificación del
+alumno (``signals.py``); cuando cambian datos de los que depende para muchos
+alumnos (semestre o créditos de una materia, carrera del alumno) o se
+escribe en bloque, el resumen se descarta y se rehace al leerlo.
+"""
+from django.db.models import Avg, Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .agregados import CALIFICACION_APROBATORIA
+
+
+def semestre_en_carrera():
+    """Semestre de la materia en el plan de la carrera del alumno (0 si no está), para anotar calificaciones."""
+    from .models import MateriaCarrera
+
+    return Coalesce(
+        Subquery(
+            MateriaCarrera.objects.filter(
+                materia=OuterRef('materia'), carrera=OuterRef('alumno__carrera'),
+            ).values('semestre')[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def calcular_resumen(alumno_id):
+    """Campos del resumen calculados con una consulta agrupada por semestre."""
+    from .models import Calificacion
+
+    filas = Calificacion.objects.filter(alumno_id=alumno_id).annotate(
+        semestre_carrera=semestre_en_carrera(),
+    ).order_by().values('semestre_carrera').annotate(
+        promedio=Avg('calificacion'),
+        materias=Count('id'),
+        aprobadas=Count('id', filter=Q(calificacion__gte=CALIFICACION_APROBATORIA)),
+        creditos=Sum('materia__creditos', filter=Q(calificacion__gte=CALIFICACION_APROBATORIA)),
+    ).order_by('semestre_carrera')
+
+    por_semestre = [
+        {
+            'semestre': fila['semestre_carrera'],
+            'promedio': round(float(fila['promedio'] or 0), 2),
+            'materias': fila['materias'],
+            'aprobadas': fila['aprobadas'],
+            'creditos': fila['creditos'] or 0,
+        }
+        for fila in filas
+    ]
+    total = sum(s['materias'] for s in por_semestre)
+    aprobadas = sum(s['aprobadas'] for s in por_semestre)
+    return {
+        'por_semestre': por_semestre,
+        'total_calificaciones': total,
+        'materias_aprobadas': aprobadas,
+        'materias_reprobadas': total - aprobadas,
+    }
+
+
+def actualizar_resumen(alumno_id):
+    from .models import AlumnoResumenAcademico
+
+    resumen, _ = AlumnoResumenAcademico.objects.update_or_create(
+        alumno_id=alumno_id, defaults=calcular_resumen(alumno_id),
+    )
+    return resumen
+
+
+def refrescar_resumen(alumno_id):
+    """
+    Rehace el resumen si existe (no lo crea: puede llamarse mientras se borra
+    el alumno; los que faltan se crean al leerlos).
+    """
+    from .models import AlumnoResumenAcademico
+
+    AlumnoResumenAcademico.objects.filter(alumno_id=alumno_id).update(
+        fecha_actualizacion=timezone.now(), **calcular_resumen(alumno_id),
+    )
+
+
+def resumen_de(alumno):
+    """Resumen del alumno; lo crea si no existe (alumnos previos o resumen descartado)."""
+    from .models import AlumnoResumenAcademico
+
+    try:
+        return alumno.resumen_academico
+    except AlumnoResumenAcademico.DoesNotExist:
+        return actualizar_resumen(alumno.pk)
+
+
+def descartar_resumenes(alumnos):
+    """Borra los resúmenes de ``alumnos`` (queryset) para que se rehagan al leerlos."""
+    from .models import AlumnoResumenAcademico
+
+    AlumnoResumenAcademico.objects.filter(alumno__in=alumnos.values('pk')).delete()
@@ -1,23 +1,149 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from .models import Calificacion
+from . import plan_curricular
+from .agregados import recalcular_agregados, registrar_cambio
+from .busqueda import indexar_alumno, indexar_alumnos
+from .resumen import descartar_resumenes, refrescar_resumen
+from .models import Alumno, Carrera, Calificacion, Materia, MateriaCarrera
+
+
+@receiver(pre_save, sender=Calificacion)
+def recordar_calificacion_anterior(sender, instance, raw=False, **kwargs):
+    """
+    Valores con los que la calificación está guardada. Las instancias leídas
+    de la BD ya los traen (``Calificacion.from_db``); solo se consultan para
+    las construidas a mano con un pk existente.
+    """
+    if raw:
+        return
+    if not hasattr(instance, '_valores_guardados'):
+        anterior = None
+        if instance.pk is not None:
+            anterior = Calificacion.objects.filter(pk=instance.pk).values_list(
+                'alumno_id', 'materia_id', 'calificacion',
+            ).first()
+        instance._valores_guardados = anterior
 
 
 @receiver(post_save, sender=Calificacion)
-def actualizar_datos_alumno_post_save(sender, instance, created, **kwargs):
+def actualizar_datos_alumno_post_save(sender, instance, created, raw=False, **kwargs):
     """
     Signal que se ejecuta después de guardar una calificación.
-    Actualiza automáticamente el promedio y créditos aprobados del alumno.
+    Ajusta el promedio y créditos aprobados del alumno con la diferencia
+    entre lo que la calificación aportaba antes y lo que aporta ahora.
     """
-    if instance.alumno:
-        instance.alumno.actualizar_datos_academicos()
+    if raw:
+        return
+    anterior = None if created else getattr(instance, '_valores_guardados', None)
+    nuevo = instance.valores_para_agregados()
+    if anterior != nuevo:
+        registrar_cambio(anterior, nuevo)
+        _refrescar_resumenes(anterior, nuevo)
+    instance._valores_guardados = nuevo
 
 
 @receiver(post_delete, sender=Calificacion)
 def actualizar_datos_alumno_post_delete(sender, instance, **kwargs):
     """
     Signal que se ejecuta después de eliminar una calificación.
-    Actualiza automáticamente el promedio y créditos aprobados del alumno.
+    Resta su aporte al promedio y créditos aprobados del alumno.
     """
-    if instance.alumno:
-        instance.alumno.actualizar_datos_academicos()
\ No newline at end of file
+    anterior = getattr(instance, '_valores_guardados', None) or instance.valores_para_agregados()
+    registrar_cambio(anterior, None)
+    _refrescar_resumenes(anterior, None)
+
+
+def _refrescar_resumenes(anterior, nuevo):
+    alumnos = {valores[0] for valores in (anterior, nuevo) if valores and valores[0] is not None}
+    for alumno_id in alumnos:
+        refrescar_resumen(alumno_id)
+
+
+def _recalcular_alumnos(alumnos):
+    alumnos = Alumno.objects.filter(pk__in=alumnos.values('pk'))
+    recalcular_agregados(alumnos)
+    descartar_resumenes(alumnos)
+
+
+@receiver(pre_save, sender=Alumno)
+def detectar_cambio_de_carrera(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None or (update_fields is not None and 'carrera' not in update_fields):
+        return
+    if hasattr(instance, '_carrera_guardada'):
+        carrera_anterior = instance._carrera_guardada
+    else:
+        carrera_anterior = Alumno.objects.filter(pk=instance.pk).values_list('carrera_id', flat=True).first()
+    instance._carrera_cambiada = carrera_anterior is not None and carrera_anterior != instance.carrera_id
+
+
+@receiver(post_save, sender=Alumno)
+def recalcular_por_cambio_de_carrera(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._carrera_guardada = instance.carrera_id
+    # Con otra carrera cambian las materias que cuentan: se recalcula desde cero
+    if getattr(instance, '_carrera_cambiada', False):
+        instance._carrera_cambiada = False
+        instance.actualizar_datos_academicos()
+        descartar_resumenes(Alumno.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=Materia)
+def detectar_cambio_de_reglas(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if hasattr(instance, '_reglas_guardadas'):
+        anteriores = instance._reglas_guardadas
+    else:
+        anteriores = Materia.objects.filter(pk=instance.pk).values_list('creditos', 'cuenta_promedio').first()
+    instance._reglas_cambiadas = anteriores is not None and anteriores != (instance.creditos, instance.cuenta_promedio)
+
+
+@receiver(post_save, sender=Materia)
+def recalcular_por_cambio_de_reglas(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._reglas_guardadas = (instance.creditos, instance.cuenta_promedio)
+    if getattr(instance, '_reglas_cambiadas', False):
+        instance._reglas_cambiadas = False
+        _recalcular_alumnos(Alumno.objects.filter(calificaciones__materia=instance))
+
+
+@receiver(post_save, sender=MateriaCarrera)
+@receiver(post_delete, sender=MateriaCarrera)
+def recalcular_por_cambio_de_plan(sender, instance, raw=False, **kwargs):
+    # La materia entra o sale de la carrera: cambia para quién cuenta
+    if raw:
+        return
+    _recalcular_alumnos(Alumno.objects.filter(
+        carrera_id=instance.carrera_id, calificaciones__materia_id=instance.materia_id,
+    ))
+
+
+@receiver(post_save, sender=Materia)
+@receiver(post_delete, sender=Materia)
+@receiver(post_save, sender=Carrera)
+@receiver(post_delete, sender=Carrera)
+@receiver(post_save, sender=MateriaCarrera)
+@receiver(post_delete, sender=MateriaCarrera)
+def invalidar_plan_curricular(sender, **kwargs):
+    plan_curricular.invalidar()
+
+
+CAMPOS_BUSQUEDA = {'matricula', 'nombre', 'apellido_paterno', 'apellido_materno', 'carrera'}
+
+
+@receiver(post_save, sender=Alumno)
+def actualizar_busqueda_alumno(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not CAMPOS_BUSQUEDA & set(update_fields)):
+        return
+    indexar_alumno(instance)
+
+
+@receiver(post_save, sender=Carrera)
+def actualizar_busqueda_por_carrera(sender, instance, created, raw=False, **kwargs):
+    # El nombre de la carrera es parte del texto de búsqueda de sus alumnos
+    if raw or created or getattr(instance, '_nombre_guardado', None) == instance.nombre:
+        return
+    instance._nombre_guardado = instance.nombre
+    indexar_alumnos(Alumno.objects.filter(carrera=instance))
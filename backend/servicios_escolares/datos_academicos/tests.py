@@ -270,6 +270,96 @@ class AlumnoDataUpdateTestCase(TestCase):
         self.assertEqual(self.alumno.creditos_aprobados, 8)
 
 
+    def test_ajuste_incremental_sin_reagregar(self):
+        """Guardar una calificación cuesta lo mismo sin importar cuántas tenga el alumno"""
+        for i in range(20):
+            materia = Materia.objects.create(clave=f'EXT{i:03d}', nombre=f'Extra {i}', creditos=4)
+            MateriaCarrera.objects.create(materia=materia, carrera=self.carrera, semestre=2)
+            Calificacion.objects.create(
+                alumno=self.alumno, materia=materia, periodo_escolar=self.periodo, calificacion=80, creditos=4
+            )
+        calificacion = Calificacion.objects.filter(alumno=self.alumno).first()
+        calificacion.calificacion = 100
+        # UPDATE de la calificación, reglas de la materia, lectura bloqueada y UPDATE del alumno
+        # (+ savepoint), y la consulta agrupada y el UPDATE del resumen del portal
+        with self.assertNumQueries(8):
+            calificacion.save()
+
+        self.alumno.refresh_from_db()
+        self.assertEqual(self.alumno.promedio, Decimal('81.00'))
+        self.assertEqual(self.alumno.creditos_aprobados, 80)
+
+    def test_cambio_de_alumno_y_reglas_de_materia(self):
+        """Mover una calificación a otro alumno o cambiar la materia ajusta a ambos"""
+        otro = Alumno.objects.create(matricula='20240002', nombre='Ana', carrera=self.carrera, semestre=1)
+        calificacion = Calificacion.objects.create(
+            alumno=self.alumno, materia=self.materia1, periodo_escolar=self.periodo, calificacion=90, creditos=8
+        )
+        Calificacion.objects.create(
+            alumno=self.alumno, materia=self.materia2, periodo_escolar=self.periodo, calificacion=70, creditos=6
+        )
+        calificacion.alumno = otro
+        calificacion.save()
+        self.alumno.refresh_from_db()
+        otro.refresh_from_db()
+        self.assertEqual((self.alumno.promedio, self.alumno.creditos_aprobados), (Decimal('70.00'), 6))
+        self.assertEqual((otro.promedio, otro.creditos_aprobados), (Decimal('90.00'), 8))
+
+        self.materia2.cuenta_promedio = False
+        self.materia2.save()
+        self.alumno.refresh_from_db()
+        self.assertEqual((self.alumno.promedio, self.alumno.materias_promediadas), (Decimal('0.00'), 0))
+
+    def test_admin_no_permite_editar_agregados(self):
+        """El admin muestra promedio y créditos como solo lectura"""
+        from django.contrib import admin
+        from django.contrib.auth.models import User
+        from django.test import RequestFactory
+        from .agregados import CAMPOS_AGREGADOS
+
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        formulario = admin.site._registry[Alumno].get_form(request, self.alumno)
+        for campo in CAMPOS_AGREGADOS:
+            self.assertNotIn(campo, formulario.base_fields)
+
+    def test_verificador_detecta_y_repara_desfases(self):
+        """Los cambios que no pasan por señales se detectan y corrigen"""
+        from .agregados import recalcular_agregados
+
+        Calificacion.objects.create(
+            alumno=self.alumno, materia=self.materia1, periodo_escolar=self.periodo, calificacion=80, creditos=8
+        )
+        Calificacion.objects.filter(alumno=self.alumno).update(calificacion=60)
+        self.assertEqual(len(recalcular_agregados(Alumno.objects.all(), aplicar=False)), 1)
+        desfasados = recalcular_agregados(Alumno.objects.all())
+        self.assertEqual(desfasados[0][1]['promedio'], (Decimal('80.00'), Decimal('60.00')))
+        self.assertEqual(recalcular_agregados(Alumno.objects.all()), [])
+
+    def test_recalculo_masivo_por_carrera(self):
+        """El comando recalcula con una consulta agrupada y respeta --carrera y --dry-run"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        otra_carrera = Carrera.objects.create(clave='IND', nombre='Ingeniería Industrial', creditos_totales=280)
+        otro = Alumno.objects.create(matricula='20240003', nombre='Luis', carrera=otra_carrera, semestre=1)
+        Calificacion.objects.create(
+            alumno=self.alumno, materia=self.materia1, periodo_escolar=self.periodo, calificacion=80, creditos=8
+        )
+        Alumno.objects.update(promedio=50, creditos_aprobados=99)
+
+        call_command('recalcular_agregados_alumnos', carrera='ISC', dry_run=True, stdout=StringIO())
+        self.alumno.refresh_from_db()
+        self.assertEqual(self.alumno.creditos_aprobados, 99)
+
+        salida = StringIO()
+        call_command('recalcular_agregados_alumnos', carrera='ISC', stdout=salida)
+        self.assertIn('Alumnos con cambios: 1', salida.getvalue())
+        self.alumno.refresh_from_db()
+        otro.refresh_from_db()
+        self.assertEqual((self.alumno.promedio, self.alumno.creditos_aprobados), (Decimal('80.00'), 8))
+        self.assertEqual(otro.creditos_aprobados, 99)
+
 class CarreraCreditosTotalesTestCase(TestCase):
     def setUp(self):
         """Configuración inicial para las pruebas de créditos totales de carrera"""
@@ -349,3 +439,427 @@ class CarreraCreditosTotalesTestCase(TestCase):
         # Verificar que los créditos aumentaron
         creditos_nuevos = self.carrera.calcular_creditos_totales()
         self.assertEqual(creditos_nuevos, creditos_iniciales + 5)
+
+
+class ResumenAcademicoPortalTestCase(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import Group, User
+
+        self.carrera = Carrera.objects.create(clave='ISC', nombre='Sistemas', creditos_totales=300)
+        self.alumno = Alumno.objects.create(matricula='20240010', nombre='Eva', carrera=self.carrera, semestre=2)
+        self.periodo = PeriodoEscolar.objects.create(
+            ciclo='Enero-Junio', año=2024,
+            fecha_inicio=date.today() - timedelta(days=30), fecha_fin=date.today() + timedelta(days=30),
+        )
+        usuario = User.objects.create_user('20240010', password='x')
+        usuario.groups.add(Group.objects.create(name='Alumno'))
+        self.client.force_login(usuario, backend='django.contrib.auth.backends.ModelBackend')
+
+    def _calificar(self, cantidad, semestre, calificacion, inicio=0):
+        for i in range(inicio, inicio + cantidad):
+            materia = Materia.objects.create(clave=f'S{semestre}M{i:02d}', nombre=f'Materia {semestre}-{i}', creditos=5)
+            MateriaCarrera.objects.create(materia=materia, carrera=self.carrera, semestre=semestre)
+            Calificacion.objects.create(
+                alumno=self.alumno, materia=materia, periodo_escolar=self.periodo, calificacion=calificacion, creditos=5
+            )
+
+    def _consultas(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta, len(consultas)
+
+    def test_vistas_con_consultas_constantes(self):
+        from django.urls import reverse
+
+        dashboard = reverse('datos_academicos:alumno_dashboard')
+        calificaciones = reverse('datos_academicos:alumno_calificaciones')
+        self._calificar(2, 1, 90)
+        self.client.get(dashboard)  # crea el resumen
+        _, pocas_dashboard = self._consultas(dashboard)
+        _, pocas_calificaciones = self._consultas(calificaciones)
+
+        self._calificar(10, 2, 5, inicio=2)
+        respuesta, muchas_dashboard = self._consultas(dashboard)
+        self.assertEqual(muchas_dashboard, pocas_dashboard)
+        self.assertEqual(
+            respuesta.context['calificaciones_por_semestre'],
+            [{'semestre': 1, 'promedio': 90.0}, {'semestre': 2, 'promedio': 5.0}],
+        )
+        self.assertEqual(respuesta.context['total_calificaciones'], 12)
+
+        respuesta, muchas_calificaciones = self._consultas(calificaciones)
+        self.assertEqual(muchas_calificaciones, pocas_calificaciones)
+        self.assertEqual([len(c) for c in respuesta.context['calificaciones_por_semestre'].values()], [2, 10])
+        self.assertEqual((respuesta.context['materias_aprobadas'], respuesta.context['materias_reprobadas']), (2, 10))
+
+
+class IndiceCurricularTestCase(TestCase):
+    def setUp(self):
+        self.carrera = Carrera.objects.create(clave='ISC', nombre='Sistemas')
+        self.otra = Carrera.objects.create(clave='IND', nombre='Industrial')
+        self.calculo = Materia.objects.create(clave='MAT2', nombre='Cálculo', creditos=5)
+        self.algebra = Materia.objects.create(clave='MAT1', nombre='Álgebra', creditos=4, cuenta_promedio=False)
+        self.servicio = Materia.objects.create(clave='SS', nombre='Servicio', creditos=10, es_universal=True)
+        MateriaCarrera.objects.create(materia=self.calculo, carrera=self.carrera, semestre=2)
+        MateriaCarrera.objects.create(materia=self.algebra, carrera=self.carrera, semestre=1)
+        MateriaCarrera.objects.create(materia=self.calculo, carrera=self.otra, semestre=3)
+
+    def test_indice_con_una_consulta(self):
+        from .plan_curricular import indice_curricular
+
+        with self.assertNumQueries(1):
+            indice = indice_curricular()
+        with self.assertNumQueries(0):
+            self.assertIs(indice_curricular(), indice)
+            plan = indice.plan(self.carrera)
+            self.assertEqual([(r.materia.clave, r.semestre) for r in plan], [('MAT1', 1), ('MAT2', 2)])
+            self.assertFalse(plan[0].materia.cuenta_promedio)
+            self.assertEqual(indice.totales(self.carrera.pk), (2, 9))
+            self.assertEqual(self.calculo.get_semestre_para_carrera(self.otra), 3)
+            self.assertIsNone(self.servicio.get_semestre_para_carrera(self.carrera))
+            self.assertEqual(
+                {s: [c.clave for c in carreras] for s, carreras in self.calculo.get_carreras_por_semestre().items()},
+                {2: ['ISC'], 3: ['IND']},
+            )
+            self.assertEqual([m.clave for m in indice.universales()], ['SS'])
+
+    def test_senales_invalidan_el_indice(self):
+        from .plan_curricular import indice_curricular
+
+        version = indice_curricular().version
+        relacion = MateriaCarrera.objects.get(materia=self.calculo, carrera=self.otra)
+        relacion.semestre = 4
+        relacion.save()
+        self.assertNotEqual(indice_curricular().version, version)
+        self.assertEqual(self.calculo.get_semestre_para_carrera(self.otra), 4)
+
+        self.algebra.nombre = 'Álgebra Lineal'
+        self.algebra.save()
+        self.assertEqual(indice_curricular().plan(self.carrera)[0].materia.nombre, 'Álgebra Lineal')
+
+        relacion.delete()
+        self.assertFalse(indice_curricular().pertenece(self.calculo, self.otra))
+        MateriaCarrera.objects.create(materia=self.algebra, carrera=self.otra, semestre=1)
+        self.otra.nombre = 'Ingeniería Industrial'
+        self.otra.save()
+        self.assertEqual(indice_curricular().carreras[self.otra.pk].nombre, 'Ingeniería Industrial')
+
+
+class EstadisticasGestionTestCase(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.carrera = Carrera.objects.create(clave='ISC', nombre='Sistemas')
+        self.periodo = PeriodoEscolar.objects.create(
+            ciclo='Enero-Junio', año=2024,
+            fecha_inicio=date.today() - timedelta(days=30), fecha_fin=date.today() + timedelta(days=30),
+        )
+        self.alumno = Alumno.objects.create(matricula='20240020', nombre='Luis', carrera=self.carrera)
+        self.usuario = User.objects.create_user('gestor', password='x', is_staff=True)
+
+    def _calificar(self, calificaciones, acreditacion='Ordinario'):
+        for calificacion in calificaciones:
+            materia = Materia.objects.create(clave=f'E{Materia.objects.count():03d}', nombre='Materia', creditos=5)
+            MateriaCarrera.objects.create(materia=materia, carrera=self.carrera, semestre=1)
+            Calificacion.objects.create(
+                alumno=self.alumno, materia=materia, periodo_escolar=self.periodo,
+                calificacion=calificacion, creditos=5, acreditacion=acreditacion,
+            )
+
+    def test_histograma_y_conteos_condicionales(self):
+        from .estadisticas import estadisticas_calificaciones
+
+        self._calificar([Decimal('0'), Decimal('59.99'), Decimal('60'), Decimal('75.5'), Decimal('89.99')])
+        self._calificar([Decimal('90'), Decimal('100')], acreditacion='Extraordinario')
+
+        with self.assertNumQueries(6):
+            stats = estadisticas_calificaciones()
+        self.assertEqual([cantidad for _, cantidad in stats['rangos']], [2, 1, 1, 1, 2])
+        self.assertEqual((stats['total'], stats['aprobadas'], stats['reprobadas']), (7, 5, 2))
+        self.assertEqual(stats['por_acreditacion'], {'Ordinario': 5, 'Extraordinario': 2})
+        self.assertEqual(stats['creditos'], 35)
+        self.assertEqual(stats['del_mes'], 7)
+
+    def test_tableros_con_consultas_constantes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+
+        self.client.force_login(self.usuario, backend='django.contrib.auth.backends.ModelBackend')
+        urls = [
+            reverse('datos_academicos:gestion_calificaciones'),
+            reverse('datos_academicos:gestion_alumnos'),
+            reverse('datos_academicos:gestion_materias'),
+        ]
+        self._calificar([Decimal('70')])
+        pocas = []
+        for url in urls:
+            with CaptureQueriesContext(connection) as consultas:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            pocas.append(len(consultas))
+
+        self._calificar([Decimal(c) for c in range(40, 100, 3)])
+        for url, antes in zip(urls, pocas):
+            with CaptureQueriesContext(connection) as consultas:
+                self.client.get(url)
+            self.assertEqual(len(consultas), antes, url)
+
+
+class BusquedaAlumnosTestCase(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.carrera = Carrera.objects.create(clave='ISC', nombre='Ingeniería en Sistemas')
+        self.gomez = Alumno.objects.create(
+            matricula='20240031', nombre='José Ángel', apellido_paterno='Gómez', apellido_materno='Peña',
+            carrera=self.carrera,
+        )
+        self.gomezano = Alumno.objects.create(
+            matricula='20240032', nombre='Ana', apellido_paterno='Gomezano', apellido_materno='Ruiz',
+            carrera=self.carrera,
+        )
+        self.client.force_login(
+            User.objects.create_user('gestor', password='x', is_staff=True),
+            backend='django.contrib.auth.backends.ModelBackend',
+        )
+
+    def test_sin_acentos_ni_mayusculas_y_por_relevancia(self):
+        from .busqueda import buscar_alumnos
+
+        self.assertEqual(list(buscar_alumnos('GOMEZ')), [self.gomez, self.gomezano])
+        self.assertEqual(list(buscar_alumnos('gomez ana')), [self.gomezano])
+        self.assertEqual(list(buscar_alumnos('jose pena')), [self.gomez])
+        self.assertEqual(list(buscar_alumnos('sistemas 2024003')), [self.gomez, self.gomezano])
+        self.assertEqual(list(buscar_alumnos('perez')), [])
+        # Parte de la matrícula (no prefijo) y consulta sin palabras buscables
+        self.assertEqual(list(buscar_alumnos('0032')), [self.gomezano])
+        self.assertNotIn('LIKE', str(buscar_alumnos('0032').query))
+        self.assertEqual(list(buscar_alumnos('¿?', Alumno.objects.order_by('-matricula'))), [self.gomez, self.gomezano])
+
+    def test_indice_al_guardar_alumno_y_carrera(self):
+        from .busqueda import buscar_alumnos
+
+        self.gomezano.apellido_paterno = 'Núñez'
+        self.gomezano.save()
+        self.assertEqual(list(buscar_alumnos('nunez')), [self.gomezano])
+        self.assertEqual(list(buscar_alumnos('gomez')), [self.gomez])
+
+        self.carrera.nombre = 'Ingeniería Industrial'
+        self.carrera.save()
+        self.assertEqual(list(buscar_alumnos('industrial')), [self.gomez, self.gomezano])
+        self.assertEqual(list(buscar_alumnos('sistemas')), [])
+
+    def test_vistas_usan_el_indice(self):
+        from django.urls import reverse
+
+        respuesta = self.client.get(reverse('datos_academicos:api_alumnos_list'), {'q': 'Gomez'})
+        self.assertEqual([a['matricula'] for a in respuesta.json()['results']], ['20240031', '20240032'])
+        respuesta = self.client.get(reverse('datos_academicos:buscar_alumno_ajax'), {'q': 'pena jose'})
+        self.assertEqual([a['matricula'] for a in respuesta.json()['results']], ['20240031'])
+
+
+class PaginacionPorCursorTestCase(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.carrera = Carrera.objects.create(clave='ISC', nombre='Sistemas')
+        self.alumnos = [
+            Alumno.objects.create(matricula=f'2024{i:04d}', nombre=f'Alumno {i}', carrera=self.carrera)
+            for i in range(7)
+        ]
+        materia = Materia.objects.create(clave='MAT1', nombre='Álgebra', creditos=5)
+        periodo = PeriodoEscolar.objects.create(
+            ciclo='Enero-Junio', año=2024, fecha_inicio=date(2024, 1, 1), fecha_fin=date(2024, 6, 30),
+        )
+        for alumno in self.alumnos:
+            Calificacion.objects.create(alumno=alumno, materia=materia, periodo_escolar=periodo, calificacion=80)
+        self.client.force_login(
+            User.objects.create_user('gestor', password='x', is_staff=True),
+            backend='django.contrib.auth.backends.ModelBackend',
+        )
+
+    def _recorrer(self, url, campo, **params):
+        vistos, cursor = [], ''
+        while True:
+            datos = self.client.get(url, {**params, 'cursor': cursor, 'page_size': 3}).json()
+            self.assertNotIn('total', datos)
+            vistos += [item[campo] for item in datos['results']]
+            cursor = datos['siguiente']
+            if not cursor:
+                return vistos
+
+    def test_apis_json_por_cursor(self):
+        from django.urls import reverse
+
+        url = reverse('datos_academicos:api_alumnos_list')
+        self.assertEqual(self._recorrer(url, 'matricula'), [a.matricula for a in self.alumnos])
+        self.assertEqual(self._recorrer(url, 'matricula', q='alumno'), [a.matricula for a in self.alumnos])
+        datos = self.client.get(url, {'cursor': '', 'total': 'estimado'}).json()
+        self.assertEqual(datos['total_estimado'], 7)
+        self.assertEqual(self.client.get(url, {'cursor': 'no-es-cursor'}).status_code, 400)
+        # Sin cursor se conserva la paginación por número de página
+        self.assertEqual(self.client.get(url, {'page': 1}).json()['total'], 7)
+
+        url = reverse('datos_academicos:api_calificaciones_list')
+        ids = sorted(Calificacion.objects.values_list('id', flat=True), reverse=True)
+        self.assertEqual(self._recorrer(url, 'id'), ids)
+        self.assertEqual(self._recorrer(url, 'id', order='antiguas'), ids[::-1])
+
+    def test_viewsets_por_cursor(self):
+        datos = self.client.get('/datos_academicos/api/carreras/', {'cursor': '', 'total': 'exacto'}).json()
+        self.assertEqual(datos['total'], 1)
+        self.assertIsNone(datos['siguiente'])
+        self.assertEqual(len(self.client.get('/datos_academicos/api/carreras/').json()), 1)
+        self.assertEqual(self.client.get('/datos_academicos/api/carreras/', {'cursor': '%%'}).status_code, 400)
+
+
+class SerieTemporalTestCase(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from procedimientos.models import Tramite
+
+        carrera = Carrera.objects.create(clave='ISC', nombre='Sistemas')
+        alumno = Alumno.objects.create(matricula='20240001', nombre='Ana', carrera=carrera)
+        self.hoy = timezone.localdate()
+        # Hoy (dos), hace 3 días y hace 40 días (fuera de la ventana por defecto)
+        for dias in (0, 0, 3, 40):
+            tramite = Tramite.objects.create(alumno=alumno, tipo='kardex')
+            Tramite.objects.filter(pk=tramite.pk).update(fecha_solicitud=timezone.now() - timedelta(days=dias))
+        self.client.force_login(
+            User.objects.create_user('gestor', password='x', is_staff=True),
+            backend='django.contrib.auth.backends.ModelBackend',
+        )
+
+    def test_una_consulta_y_dias_rellenos(self):
+        from procedimientos.models import Tramite
+        from servicios_escolares.series import serie_temporal, ventana
+
+        with self.assertNumQueries(1):
+            puntos = serie_temporal(Tramite.objects.all(), 'fecha_solicitud', *ventana())
+        self.assertEqual(len(puntos), 30)
+        self.assertEqual(puntos[-1], {'fecha': self.hoy.isoformat(), 'count': 2})
+        self.assertEqual(puntos[-4]['count'], 1)
+        self.assertEqual(sum(p['count'] for p in puntos), 3)
+
+        meses = serie_temporal(
+            Tramite.objects.all(), 'fecha_solicitud', self.hoy - timedelta(days=60), self.hoy, 'mes',
+        )
+        self.assertTrue(all(p['fecha'].endswith('-01') for p in meses))
+        self.assertEqual(sum(p['count'] for p in meses), 4)
+
+    def test_api_series(self):
+        from django.urls import reverse
+
+        url = reverse('api_serie_temporal', args=['tramites'])
+        desde = (self.hoy - timedelta(days=60)).isoformat()
+        datos = self.client.get(url, {'granularidad': 'semana', 'desde': desde}).json()
+        self.assertEqual(datos['total'], 4)
+        self.assertEqual(self.client.get(url, {'tipo': 'boleta'}).json()['total'], 0)
+        self.assertEqual(self.client.get(url, {'granularidad': 'hora'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'desde': '2024-02-31'}).status_code, 400)
+        admision = reverse('api_serie_temporal', args=['solicitudes_admision'])
+        self.assertEqual(self.client.get(admision, {'periodo': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(admision, {'periodo': '7'}).json()['total'], 0)
+        self.assertEqual(self.client.get(reverse('api_serie_temporal', args=['otra'])).status_code, 404)
+        self.assertEqual(len(self.client.get(reverse('api_serie_temporal', args=['auditoria'])).json()['puntos']), 30)
+
+
+class CacheEtiquetasTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.carrera = Carrera.objects.create(clave='ISC', nombre='Sistemas')
+        self.calculos = 0
+
+    def _contar_alumnos(self):
+        self.calculos += 1
+        return Alumno.objects.count()
+
+    def test_invalidacion_por_senales_y_operaciones_masivas(self):
+        from audit.bulk import audited_update
+        from servicios_escolares.cache_etiquetas import en_cache
+
+        def valor():
+            return en_cache('prueba:alumnos', [Alumno], self._contar_alumnos)
+
+        self.assertEqual(valor(), 0)
+        self.assertEqual(valor(), 0)
+        self.assertEqual(self.calculos, 1)
+
+        alumno = Alumno.objects.create(matricula='20240001', nombre='Ana', carrera=self.carrera)
+        self.assertEqual(valor(), 1)
+        self.assertEqual(self.calculos, 2)
+
+        # Otro modelo no invalida; QuerySet.update auditado sí, aunque no envíe señales
+        Materia.objects.create(clave='MAT1', nombre='Álgebra', creditos=5)
+        valor()
+        self.assertEqual(self.calculos, 2)
+        audited_update(Alumno.objects.filter(pk=alumno.pk), estatus='Titulado')
+        valor()
+        self.assertEqual(self.calculos, 3)
+
+    def test_etiquetas_por_app_y_solo_las_registradas(self):
+        from unittest import mock
+        from django.core.cache import cache
+        from procedimientos.models import Tramite as TramiteProcedimientos
+        from .models import Tramite
+        from servicios_escolares import cache_etiquetas
+
+        self.assertEqual(cache_etiquetas.etiqueta_de(Alumno), 'datos_academicos.alumno')
+        self.assertNotEqual(cache_etiquetas.etiqueta_de(Tramite), cache_etiquetas.etiqueta_de(TramiteProcedimientos))
+
+        cache_etiquetas.en_cache('prueba:alumnos', [Alumno], self._contar_alumnos)
+        clave = cache_etiquetas._clave_etiqueta('datos_academicos.alumno')
+        Alumno.objects.create(matricula='20240001', nombre='Ana', carrera=self.carrera)
+        self.assertEqual(cache.get(clave), 2)
+
+        # Un modelo que ningún cálculo registró no toca la caché al guardarse
+        with mock.patch.object(cache_etiquetas, 'invalidar') as invalidar:
+            Materia.objects.create(clave='MAT1', nombre='Álgebra', creditos=5)
+        invalidar.assert_not_called()
+
+    def test_un_solo_proceso_recalcula(self):
+        from unittest import mock
+        from django.core.cache import cache
+        from servicios_escolares import cache_etiquetas
+
+        cache_etiquetas.en_cache('prueba:alumnos', [Alumno], self._contar_alumnos)
+        Alumno.objects.create(matricula='20240001', nombre='Ana', carrera=self.carrera)
+
+        # Mientras otro proceso tiene el candado se sirve el valor anterior
+        cache.add(cache_etiquetas._clave_candado('prueba:alumnos'), 1)
+        self.assertEqual(cache_etiquetas.en_cache('prueba:alumnos', [Alumno], self._contar_alumnos), 0)
+        self.assertEqual(self.calculos, 1)
+
+        # Sin valor anterior se espera y, si el otro no termina, se calcula
+        cache.add(cache_etiquetas._clave_candado('prueba:nuevo'), 1)
+        with mock.patch.object(cache_etiquetas, 'ESPERA_MAXIMA', 0.1):
+            self.assertEqual(cache_etiquetas.en_cache('prueba:nuevo', [Alumno], self._contar_alumnos), 1)
+
+        cache.delete(cache_etiquetas._clave_candado('prueba:alumnos'))
+        self.assertEqual(cache_etiquetas.en_cache('prueba:alumnos', [Alumno], self._contar_alumnos), 1)
+
+    def test_tablero_general(self):
+        from django.contrib.auth.models import User
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.force_login(
+            User.objects.create_user('gestor', password='x', is_staff=True),
+            backend='django.contrib.auth.backends.ModelBackend',
+        )
+        Alumno.objects.create(matricula='20240001', nombre='Ana', carrera=self.carrera, estatus='Inscrito')
+        self.assertEqual(self.client.get('/dashboard/').context['alumnos_inscritos'], 1)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/dashboard/')
+        # Los KPIs salen de la caché: solo se consultan los trámites recientes
+        self.assertFalse([q for q in consultas.captured_queries if 'datos_academicos_alumno' in q['sql']])
+        self.assertEqual(response.context['carreras'], ['Sistemas'])
+        Alumno.objects.create(matricula='20240002', nombre='Luis', carrera=self.carrera, estatus='Inscrito')
+        self.assertEqual(self.client.get('/dashboard/').context['alumnos_inscritos'], 2)
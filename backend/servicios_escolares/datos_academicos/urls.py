@@ -28,6 +28,7 @@ urlpatterns = [
     path('api/alumnos/<int:pk>/', views.alumno_detail_api, name='alumno_detail_api'),
     path('api/alumnos/', views.api_alumno_list, name='api_alumno_list'),
     path('api/materias/', views.api_materia_list, name='api_materia_list'),
+    path('api/materias/importar-excel/', views.MateriaExcelUploadView.as_view(), name='materia_excel_upload'),
     
     path('api/', include(router.urls)),
     
@@ -4,8 +4,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.db.models import Q, Count, Sum, Avg
-from django.utils.timezone import now
+from django.db.models import Q, Count
 from django.core.serializers.json import DjangoJSONEncoder
 from django.http import JsonResponse, Http404
 import json
@@ -20,8 +19,18 @@ from rest_framework.decorators import api_view
 from rest_framework.permissions import IsAuthenticated
 import pandas as pd
 import json
+import os
+import tempfile
 from .forms import AlumnoForm, TramiteForm, CalificacionForm
 from .models import PeriodoEscolar, Carrera, Materia, Grupo, Alumno, Docente, PlanEstudio, Tramite, Calificacion, MateriaCarrera
+from .plan_curricular import indice_curricular
+from .busqueda import buscar_alumnos
+from servicios_escolares.paginacion import CursorInvalido, paginar_por_cursor, tamano_pagina, totales
+from .estadisticas import (
+    ETIQUETAS_TABLERO_GENERAL, estadisticas_alumnos, estadisticas_calificaciones, estadisticas_materias,
+    kpis_tablero_general,
+)
+from servicios_escolares.cache_etiquetas import en_cache
 from django.http import JsonResponse
 from .serializer import (
     PeriodoEscolarSerializer,
@@ -38,9 +47,25 @@ from .forms_inscripcion import InscripcionForm
 from .utils_inscripcion import generar_formato_inscripcion, crear_plantillas_por_defecto
 from .models_inscripcion import Inscripcion
 from django.core.paginator import Paginator
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from excel_importer.ingesta import iterar_hojas
 
 # --- JSON APIs para gestión de alumnos (para tabs en gestión) ---
+def _cursor_invalido():
+    return JsonResponse({'error': 'Cursor no válido'}, status=400)
+
+
+def _alumno_en_lista(a):
+    return {
+        'id': a.id,
+        'matricula': a.matricula,
+        'nombre_completo': f"{a.nombre} {a.apellido_paterno or ''} {a.apellido_materno or ''}".strip(),
+        'carrera': a.carrera.nombre if a.carrera_id else '',
+        'estatus': a.estatus,
+        'semestre': a.semestre,
+    }
+
+
 @require_GET
 @login_required
 def api_alumnos_list(request):
@@ -52,46 +77,46 @@ def api_alumnos_list(request):
     - estatus: estatus exacto
     - page: número de página
     - page_size: tamaño de página (por defecto 24)
+    - cursor: con este parámetro (vacío para la primera página) pagina por
+      cursor y responde ``siguiente`` en lugar de ``page``/``total_pages``
+    - total: con cursor, 'exacto' o 'estimado' para incluir el total
     """
     q = request.GET.get('q', '').strip()
     carrera = request.GET.get('carrera')
     estatus = request.GET.get('estatus')
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 24))
 
     queryset = Alumno.objects.select_related('carrera')
 
-    if q:
-        queryset = queryset.filter(
-            Q(nombre__icontains=q) |
-            Q(apellido_paterno__icontains=q) |
-            Q(apellido_materno__icontains=q) |
-            Q(matricula__icontains=q) |
-            Q(carrera__nombre__icontains=q)
-        )
-
     if carrera:
         queryset = queryset.filter(carrera_id=carrera)
 
     if estatus:
         queryset = queryset.filter(estatus=estatus)
 
-    queryset = queryset.order_by('matricula')
+    # Con texto de búsqueda, los más relevantes primero (ver busqueda.py)
+    queryset = buscar_alumnos(q, queryset) if q else queryset.order_by('matricula')
+
+    if 'cursor' in request.GET:
+        orden = ['-relevancia', 'matricula'] if 'relevancia' in queryset.query.annotations else ['matricula']
+        try:
+            alumnos, siguiente = paginar_por_cursor(
+                queryset, orden, request.GET.get('cursor'), tamano_pagina(request.GET.get('page_size'), 24),
+            )
+        except CursorInvalido:
+            return _cursor_invalido()
+        return JsonResponse({
+            'results': [_alumno_en_lista(a) for a in alumnos],
+            'siguiente': siguiente,
+            **totales(queryset, request.GET.get('total')),
+        })
 
+    page = int(request.GET.get('page', 1))
+    page_size = int(request.GET.get('page_size', 24))
     paginator = Paginator(queryset, page_size)
     page_obj = paginator.get_page(page)
 
-    items = [{
-        'id': a.id,
-        'matricula': a.matricula,
-        'nombre_completo': f"{a.nombre} {a.apellido_paterno or ''} {a.apellido_materno or ''}".strip(),
-        'carrera': a.carrera.nombre if a.carrera_id else '',
-        'estatus': a.estatus,
-        'semestre': a.semestre,
-    } for a in page_obj.object_list]
-
     return JsonResponse({
-        'results': items,
+        'results': [_alumno_en_lista(a) for a in page_obj.object_list],
         'page': page_obj.number,
         'total_pages': paginator.num_pages,
         'total': paginator.count,
@@ -188,13 +213,8 @@ def api_alumno_list(request):
     if len(query) < 2:
         return JsonResponse([], safe=False)
     
-    # Filtrar alumnos con la consulta
-    alumnos = Alumno.objects.filter(
-        Q(nombre__icontains=query) | 
-        Q(apellido_paterno__icontains=query) |
-        Q(apellido_materno__icontains=query) |
-        Q(matricula__icontains=query)
-    ).filter(activo=True)
+    # Filtrar alumnos con la consulta (más relevantes primero)
+    alumnos = buscar_alumnos(query, Alumno.objects.filter(activo=True))
     
     # Limitar a 10 resultados
     alumnos = alumnos[:10]
@@ -246,56 +266,23 @@ def api_periodos_list(request):
 # Views servicios escolares
 @login_required(login_url='/datos_academicos/servicios/login/')
 def dashboard(request):
-    # KPIs
-    alumnos_inscritos = Alumno.objects.filter(estatus='Inscrito').count()
+    # KPIs y gráficas: en caché hasta que cambie un alumno, una carrera o un trámite
+    kpis = en_cache('tablero:general', ETIQUETAS_TABLERO_GENERAL, kpis_tablero_general)
     variacion_alumnos = 5  # Ejemplo, calcula real según tu lógica
-
-    tramites_en_curso = Tramite.objects.filter(estado='En proceso').count()
     variacion_tramites = -3  # Ejemplo
-
-    egresados = Alumno.objects.filter(estatus='Titulado').count()
     variacion_egresados = 2
-
-    certificados_emitidos = Tramite.objects.filter(tipo='certificado').count()
     variacion_certificados = 7
 
-    # Datos para gráfico alumnos por carrera
-    datos_carreras = (
-        Alumno.objects
-        .values('carrera__nombre')
-        .annotate(cantidad=Count('id'))
-        .order_by('-cantidad')
-    )
-    carreras = [item['carrera__nombre'] for item in datos_carreras]
-    cantidades_carreras = [item['cantidad'] for item in datos_carreras]
-
-    # Datos para gráfico trámites por tipo
-    datos_tramites = (
-        Tramite.objects
-        .values('tipo')
-        .annotate(cantidad=Count('id'))
-        .order_by('-cantidad')
-    )
-    tramites_tipos = [item['tipo'] for item in datos_tramites]
-    tramites_cantidades = [item['cantidad'] for item in datos_tramites]
-
     # Trámites recientes
     tramites_recientes = Tramite.objects.order_by('-fecha_solicitud')[:5]
 
     context = {
         'segment': 'dashboard',
-        'alumnos_inscritos': alumnos_inscritos,
+        **kpis,
         'variacion_alumnos': variacion_alumnos,
-        'tramites_en_curso': tramites_en_curso,
         'variacion_tramites': variacion_tramites,
-        'egresados': egresados,
         'variacion_egresados': variacion_egresados,
-        'certificados_emitidos': certificados_emitidos,
         'variacion_certificados': variacion_certificados,
-        'carreras': carreras,
-        'cantidades_carreras': cantidades_carreras,
-        'tramites_tipos': tramites_tipos,
-        'tramites_cantidades': tramites_cantidades,
         'tramites_recientes': tramites_recientes,
     }
     return render(request, 'datos_academicos/dashboard.html', context)
@@ -303,47 +290,9 @@ def dashboard(request):
 # Gestión de alumnos por servicios escolares
 @login_required(login_url='/datos_academicos/servicios/login/')
 def gestion_alumnos(request):
-    from datetime import datetime, timedelta
-    from django.db.models import Q, Case, When, IntegerField, FloatField, F, Count, Avg
-    
-    # Estadísticas generales de alumnos
-    total_alumnos = Alumno.objects.count()
-    alumnos_inscritos = Alumno.objects.filter(estatus='Inscrito').count()
-    nuevos_ingresos = Alumno.objects.filter(division_estudio='Nuevo Ingreso').count()
-    reingresos = Alumno.objects.filter(division_estudio='Reingreso').count()
-    promedio_general = Alumno.objects.aggregate(promedio=Avg('promedio'))['promedio'] or 0
-    
-    # Porcentaje de inscritos
-    porcentaje_inscritos = (alumnos_inscritos / total_alumnos * 100) if total_alumnos > 0 else 0
-    
-    # Alumnos del mes actual
-    mes_actual = datetime.now().replace(day=1)
-    alumnos_mes = Alumno.objects.filter(
-        fecha_inscripcion__gte=mes_actual
-    ).count() if hasattr(Alumno, 'fecha_inscripcion') else 0
-    
-    # Total de créditos aprobados
-    total_creditos_aprobados = Alumno.objects.aggregate(
-        total=Sum('creditos_aprobados')
-    )['total'] or 0
-    
-    # Estadísticas por carrera
-    carreras_stats = Alumno.objects.values('carrera__nombre', 'carrera__clave').annotate(
-        num_alumnos=Count('id'),
-        promedio=Avg('promedio'),
-        inscritos=Count('id', filter=Q(estatus='Inscrito'))
-    ).annotate(
-        porcentaje_inscritos=Case(
-            When(num_alumnos=0, then=0),
-            default=F('inscritos') * 100.0 / F('num_alumnos'),
-            output_field=FloatField()
-        )
-    ).order_by('-num_alumnos')[:5]
-    
-    # Distribución por estatus
-    estatus_distribucion = Alumno.objects.values('estatus').annotate(
-        cantidad=Count('id')
-    ).order_by('-cantidad')
+    stats = estadisticas_alumnos()
+    carreras_stats = stats['por_carrera']
+    estatus_distribucion = stats['por_estatus']
     
     # Colores para gráficos
     colores_estatus = {
@@ -366,14 +315,14 @@ def gestion_alumnos(request):
     context = {
         'segment': 'gestion_alumnos',
         'username': request.user.username if request.user.is_authenticated else None,
-        'total_alumnos': total_alumnos,
-        'alumnos_inscritos': alumnos_inscritos,
-        'nuevos_ingresos': nuevos_ingresos,
-        'reingresos': reingresos,
-        'promedio_general': promedio_general,
-        'porcentaje_inscritos': porcentaje_inscritos,
-        'alumnos_mes': alumnos_mes,
-        'total_creditos_aprobados': total_creditos_aprobados,
+        'total_alumnos': stats['total'],
+        'alumnos_inscritos': stats['inscritos'],
+        'nuevos_ingresos': stats['nuevos_ingresos'],
+        'reingresos': stats['reingresos'],
+        'promedio_general': stats['promedio'],
+        'porcentaje_inscritos': stats['porcentaje_inscritos'],
+        'alumnos_mes': 0,  # Alumno no registra fecha de inscripción
+        'total_creditos_aprobados': stats['creditos_aprobados'],
         'carreras_populares': carreras_stats,
         'carreras': Carrera.objects.all(),
         'estatus_distribucion': estatus_distribucion,
@@ -386,114 +335,30 @@ def gestion_alumnos(request):
 
 @login_required
 def gestion_calificaciones(request):
-    from datetime import datetime, timedelta
-    from django.db.models import Q, Case, When, IntegerField, FloatField, F
-    
-    # Estadísticas generales de calificaciones
-    total_calificaciones = Calificacion.objects.count()
-    calificaciones_aprobadas = Calificacion.objects.filter(calificacion__gte=60).count()
-    calificaciones_reprobadas = Calificacion.objects.filter(calificacion__lt=60).count()
-    promedio_general = Calificacion.objects.aggregate(promedio=Avg('calificacion'))['promedio'] or 0
-    
-    # Porcentajes de aprobación y reprobación
-    porcentaje_aprobacion = (calificaciones_aprobadas / total_calificaciones * 100) if total_calificaciones > 0 else 0
-    porcentaje_reprobacion = (calificaciones_reprobadas / total_calificaciones * 100) if total_calificaciones > 0 else 0
-    
-    # Calificaciones del mes actual
-    mes_actual = datetime.now().replace(day=1)
-    calificaciones_mes = Calificacion.objects.filter(
-        fecha_registro__gte=mes_actual
-    ).count() if hasattr(Calificacion, 'fecha_registro') else 0
-    
-    # Total de créditos
-    total_creditos = Calificacion.objects.aggregate(
-        total=Sum('creditos')
-    )['total'] or 0
-    
-    # Estadísticas por tipo de acreditación
-    acreditaciones_ordinario = Calificacion.objects.filter(acreditacion='Ordinario').count()
-    acreditaciones_convalidacion = Calificacion.objects.filter(acreditacion='Convalidación').count()
-    acreditaciones_extraordinario = Calificacion.objects.filter(acreditacion='Extraordinario').count()
-    
-    acreditacion_stats = Calificacion.objects.values('acreditacion').annotate(
-        total=Count('id')
-    ).order_by('-total')
-    
+    # Todas las cifras salen de estadisticas_calificaciones (una consulta por bloque)
+    stats = estadisticas_calificaciones()
+    por_acreditacion = stats['por_acreditacion']
+    acreditacion_stats = stats['acreditaciones']
     acreditacion_labels = [item['acreditacion'] for item in acreditacion_stats]
     acreditacion_data = [item['total'] for item in acreditacion_stats]
     
-    # Calificaciones por carrera
-    datos_calificaciones_carrera = (
-        Calificacion.objects
-        .values('alumno__carrera__nombre')
-        .annotate(cantidad=Count('id'))
-        .order_by('-cantidad')
-    )
-    carreras_calificaciones = [item['alumno__carrera__nombre'] for item in datos_calificaciones_carrera]
-    cantidades_calificaciones = [item['cantidad'] for item in datos_calificaciones_carrera]
+    carreras_calificaciones = [item['alumno__carrera__nombre'] for item in stats['por_carrera']]
+    cantidades_calificaciones = [item['cantidad'] for item in stats['por_carrera']]
     
-    # Distribución de calificaciones por rango
-    rangos_calificaciones = [
-        {'rango': '0-59 (Reprobado)', 'cantidad': Calificacion.objects.filter(calificacion__lt=60).count()},
-        {'rango': '60-69 (Suficiente)', 'cantidad': Calificacion.objects.filter(calificacion__gte=60, calificacion__lt=70).count()},
-        {'rango': '70-79 (Bien)', 'cantidad': Calificacion.objects.filter(calificacion__gte=70, calificacion__lt=80).count()},
-        {'rango': '80-89 (Notable)', 'cantidad': Calificacion.objects.filter(calificacion__gte=80, calificacion__lt=90).count()},
-        {'rango': '90-100 (Excelente)', 'cantidad': Calificacion.objects.filter(calificacion__gte=90).count()},
-    ]
-    rangos_nombres = [item['rango'] for item in rangos_calificaciones]
-    rangos_cantidades = [item['cantidad'] for item in rangos_calificaciones]
+    rangos_nombres = [rango for rango, _ in stats['rangos']]
+    rangos_cantidades = [cantidad for _, cantidad in stats['rangos']]
     
-    # Materias con más calificaciones registradas - con estadísticas adicionales
-    materias_populares = (
-        Calificacion.objects
-        .values('materia__nombre', 'materia__clave')
-        .annotate(
-            num_calificaciones=Count('id'),
-            promedio=Avg('calificacion'),
-            aprobadas=Count(Case(When(calificacion__gte=60, then=1), output_field=IntegerField())),
-            total_evaluaciones=Count('id')
-        )
-        .annotate(
-            porcentaje_aprobacion=Case(
-                When(total_evaluaciones=0, then=0),
-                default=F('aprobadas') * 100.0 / F('total_evaluaciones'),
-                output_field=FloatField()
-            )
-        )
-        .order_by('-num_calificaciones')[:10]
-    )
-    
-    # Calificaciones por período escolar
-    datos_periodos = (
-        Calificacion.objects
-        .values('periodo_escolar__ciclo', 'periodo_escolar__año')
-        .annotate(cantidad=Count('id'))
-        .order_by('-periodo_escolar__año', '-periodo_escolar__ciclo')
+    # Calificaciones por período (recientes primero) y tendencia de los primeros seis
+    datos_periodos = sorted(
+        stats['por_periodo'],
+        key=lambda item: (item['periodo_escolar__año'] or 0, item['periodo_escolar__ciclo'] or ''),
+        reverse=True,
     )
-    
-    # Tendencias por período escolar
-    periodos_stats = Calificacion.objects.values(
-        'periodo_escolar__ciclo', 'periodo_escolar__año'
-    ).annotate(
-        promedio=Avg('calificacion'),
-        total=Count('id')
-    ).order_by('periodo_escolar__año', 'periodo_escolar__ciclo')[:6]
-    
+    periodos_stats = stats['por_periodo'][:6]
     periodos_nombres = [f"{item['periodo_escolar__ciclo']} {item['periodo_escolar__año']}" for item in periodos_stats]
     periodos_promedios = [float(item['promedio']) if item['promedio'] else 0 for item in periodos_stats]
     
-    # Alertas y notificaciones
-    materias_bajo_rendimiento = Calificacion.objects.values(
-        'materia__nombre'
-    ).annotate(
-        promedio=Avg('calificacion')
-    ).filter(promedio__lt=60)
-    
-    materias_excelencia = Calificacion.objects.values(
-        'materia__nombre'
-    ).annotate(
-        promedio=Avg('calificacion')
-    ).filter(promedio__gte=90)
+    promedio_general = stats['promedio']
     
     # Calificaciones pendientes (simulado - ajustar según lógica de negocio)
     calificaciones_pendientes = 0  # Implementar lógica específica si es necesario
@@ -503,19 +368,19 @@ def gestion_calificaciones(request):
         'username': request.user.username if request.user.is_authenticated else None,
         
         # Estadísticas generales
-        'total_calificaciones': total_calificaciones,
-        'calificaciones_aprobadas': calificaciones_aprobadas,
-        'calificaciones_reprobadas': calificaciones_reprobadas,
+        'total_calificaciones': stats['total'],
+        'calificaciones_aprobadas': stats['aprobadas'],
+        'calificaciones_reprobadas': stats['reprobadas'],
         'promedio_general': round(promedio_general, 2) if promedio_general else 0,
-        'porcentaje_aprobacion': round(porcentaje_aprobacion, 1),
-        'porcentaje_reprobacion': round(porcentaje_reprobacion, 1),
-        'calificaciones_mes': calificaciones_mes,
-        'total_creditos': total_creditos,
+        'porcentaje_aprobacion': round(stats['porcentaje_aprobacion'], 1),
+        'porcentaje_reprobacion': round(stats['porcentaje_reprobacion'], 1),
+        'calificaciones_mes': stats['del_mes'],
+        'total_creditos': stats['creditos'],
         
         # Estadísticas por acreditación
-        'acreditaciones_ordinario': acreditaciones_ordinario,
-        'acreditaciones_convalidacion': acreditaciones_convalidacion,
-        'acreditaciones_extraordinario': acreditaciones_extraordinario,
+        'acreditaciones_ordinario': por_acreditacion.get('Ordinario', 0),
+        'acreditaciones_convalidacion': por_acreditacion.get('Convalidación', 0),
+        'acreditaciones_extraordinario': por_acreditacion.get('Extraordinario', 0),
         'acreditacion_stats': acreditacion_stats,
         'acreditacion_labels': json.dumps(acreditacion_labels),
         'acreditacion_data': json.dumps(acreditacion_data),
@@ -529,75 +394,43 @@ def gestion_calificaciones(request):
         'periodos_promedios': json.dumps(periodos_promedios),
         
         # Listas para mostrar en tablas
-        'materias_populares': materias_populares,
+        'materias_populares': stats['materias_populares'],
         'datos_periodos': datos_periodos,
-        'materias_bajo_rendimiento': materias_bajo_rendimiento,
-        'materias_excelencia': materias_excelencia,
+        'materias_bajo_rendimiento': stats['materias_bajo_rendimiento'],
+        'materias_excelencia': stats['materias_excelencia'],
         'calificaciones_pendientes': calificaciones_pendientes,
     }
     return render(request, 'datos_academicos/gestion_calificaciones.html', context)
 
 @login_required
 def gestion_materias(request):
-    # Estadísticas de materias
-    total_materias = Materia.objects.count()
-    materias_obligatorias = Materia.objects.filter(tipo='Obligatoria').count()
-    materias_optativas = Materia.objects.filter(tipo='Optativa').count()
-    materias_especialidad = Materia.objects.filter(tipo='Especialidad').count()
-    
-    # Estadísticas de planes de estudio
-    total_planes = PlanEstudio.objects.count()
-    planes_activos = total_planes  # Todos los planes se consideran activos por ahora
+    stats = estadisticas_materias()
     
     # Materias por carrera
-    datos_materias_carrera = (
-        MateriaCarrera.objects
-        .values('carrera__nombre')
-        .annotate(cantidad=Count('materia'))
-        .order_by('-cantidad')
-    )
-    carreras_materias = [item['carrera__nombre'] for item in datos_materias_carrera]
-    cantidades_materias = [item['cantidad'] for item in datos_materias_carrera]
+    carreras_materias = [nombre for nombre, _ in stats['por_carrera']]
+    cantidades_materias = [cantidad for _, cantidad in stats['por_carrera']]
     
     # Distribución de créditos por tipo de materia
-    datos_creditos = (
-        Materia.objects
-        .values('tipo')
-        .annotate(total_creditos=Sum('creditos'))
-        .order_by('-total_creditos')
-    )
-    tipos_materia = [item['tipo'] for item in datos_creditos]
-    creditos_por_tipo = [item['total_creditos'] for item in datos_creditos]
-    
-    # Materias más utilizadas en calificaciones
-    materias_populares = (
-        Materia.objects
-        .annotate(num_calificaciones=Count('calificaciones'))
-        .order_by('-num_calificaciones')[:5]
-    )
-    
-    # Promedio de créditos por materia
-    promedio_creditos = Materia.objects.aggregate(
-        promedio=Avg('creditos')
-    )['promedio'] or 0
+    tipos_materia = [item['tipo'] for item in stats['por_tipo']]
+    creditos_por_tipo = [item['total_creditos'] for item in stats['por_tipo']]
     
     context = {
         'segment': 'gestion_materias',
         'username': request.user.username if request.user.is_authenticated else None,
         # Estadísticas generales
-        'total_materias': total_materias,
-        'materias_obligatorias': materias_obligatorias,
-        'materias_optativas': materias_optativas,
-        'materias_especialidad': materias_especialidad,
-        'total_planes': total_planes,
-        'planes_activos': planes_activos,
-        'promedio_creditos': round(promedio_creditos, 1),
+        'total_materias': stats['total'],
+        'materias_obligatorias': stats['obligatorias'],
+        'materias_optativas': stats['optativas'],
+        'materias_especialidad': stats['especialidad'],
+        'total_planes': stats['total_planes'],
+        'planes_activos': stats['total_planes'],  # Todos los planes se consideran activos por ahora
+        'promedio_creditos': round(stats['promedio_creditos'], 1),
         # Datos para gráficos (convertidos a JSON)
         'carreras_materias': json.dumps(carreras_materias),
         'cantidades_materias': json.dumps(cantidades_materias),
         'tipos_materia': json.dumps(tipos_materia),
         'creditos_por_tipo': json.dumps(creditos_por_tipo),
-        'materias_populares': materias_populares,
+        'materias_populares': stats['populares'],
     }
     return render(request, 'datos_academicos/gestion_materias.html', context)
 
@@ -614,22 +447,13 @@ class AlumnoListView(LoginRequiredMixin, ListView):
         carrera = self.request.GET.get('carrera')
         estatus = self.request.GET.get('estatus')
 
-        if q:
-            queryset = queryset.filter(
-                Q(nombre__icontains=q) |
-                Q(apellido_paterno__icontains=q) |
-                Q(apellido_materno__icontains=q) |
-                Q(matricula__icontains=q) |
-                Q(carrera__nombre__icontains=q)
-            )
-
         if carrera:
             queryset = queryset.filter(carrera_id=carrera)
 
         if estatus:
             queryset = queryset.filter(estatus=estatus)
 
-        return queryset.order_by('matricula')
+        return buscar_alumnos(q, queryset) if q.strip() else queryset.order_by('matricula')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -730,45 +554,77 @@ class TramiteViewSet(viewsets.ModelViewSet):
     serializer_class = TramiteSerializer
     permission_classes = [IsAuthenticated]
 
+
+def _entero_celda(valor, defecto=0):
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return defecto
+
+
+class MateriaExcelUploadView(APIView):
+    """
+    Carga materias desde uno o varios libros (p. ej. los de todas las
+    carreras). Las hojas se leen en paralelo con la ingesta del importador;
+    de cada libro se toma la primera hoja con columnas 'CLAVE' y
+    'NOMBRE DE LA MATERIA' y las materias se guardan desde este proceso.
+    """
     parser_classes = [MultiPartParser]
+    permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        archivo = request.FILES.get("archivo")
-        if not archivo:
+        archivos = request.FILES.getlist("archivo")
+        if not archivos:
             return Response({"error": "No se envió archivo"}, status=status.HTTP_400_BAD_REQUEST)
 
+        rutas = []
         try:
-            # Cargar todas las hojas
-            hojas = pd.read_excel(archivo, sheet_name=None)
+            for archivo in archivos:
+                with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as destino:
+                    for chunk in archivo.chunks():
+                        destino.write(chunk)
+                rutas.append(destino.name)
 
-            hoja_materias = None
-            for nombre_hoja, df in hojas.items():
-                columnas = [col.strip().upper() for col in df.columns if isinstance(col, str)]
-                if "CLAVE" in columnas and "NOMBRE DE LA MATERIA" in columnas:
-                    hoja_materias = df
-                    break
+            hojas_materias = {}
+            for hoja in iterar_hojas(rutas, encabezados_requeridos=["CLAVE", "NOMBRE DE LA MATERIA"], en_orden=True):
+                hojas_materias.setdefault(hoja.libro, hoja)
 
-            if hoja_materias is None:
+            if not hojas_materias:
                 return Response({"error": "No se encontró una hoja con columnas 'CLAVE' y 'NOMBRE DE LA MATERIA'"}, status=status.HTTP_400_BAD_REQUEST)
 
-            hoja_materias = hoja_materias.dropna(subset=["CLAVE", "NOMBRE DE LA MATERIA"])
-
-            for _, fila in hoja_materias.iterrows():
-                Materia.objects.update_or_create(
-                    clave=str(fila["CLAVE"]).strip(),
-                    defaults={
-                        "nombre": str(fila["NOMBRE DE LA MATERIA"]).strip(),
-                        "creditos": int(fila.get("CRED", 0)),
-                        "horas_teoricas": int(fila.get("T", 0)),
-                        "horas_practicas": int(fila.get("P", 0)),
-                        "tipo": str(fila.get("TIPO DE CURSO", "")).strip(),
-                    }
-                )
-
-            return Response({"mensaje": "Materias importadas correctamente"}, status=status.HTTP_201_CREATED)
+            procesadas = 0
+            with transaction.atomic():
+                for hoja in hojas_materias.values():
+                    col_clave = hoja.columna("CLAVE")
+                    col_nombre = hoja.columna("NOMBRE DE LA MATERIA")
+                    col_creditos = hoja.columna("CRED", "CRÉD")
+                    col_teoria = hoja.columna("T")
+                    col_practica = hoja.columna("P")
+                    col_tipo = hoja.columna("TIPO DE CURSO")
+
+                    for _, fila in hoja.filas:
+                        clave, nombre = fila[col_clave], fila[col_nombre]
+                        # Las retículas repiten una fila de subencabezados ('CLAVE', 'MATERIA', ...)
+                        if clave is None or nombre is None or str(clave).upper() == "CLAVE":
+                            continue
+                        defaults = {
+                            "nombre": str(nombre),
+                            "creditos": _entero_celda(fila[col_creditos]) if col_creditos is not None else 0,
+                            "horas_teoria": _entero_celda(fila[col_teoria]) if col_teoria is not None else 0,
+                            "horas_practica": _entero_celda(fila[col_practica]) if col_practica is not None else 0,
+                        }
+                        if col_tipo is not None and fila[col_tipo]:
+                            defaults["tipo"] = str(fila[col_tipo])
+                        Materia.objects.update_or_create(clave=str(clave), defaults=defaults)
+                        procesadas += 1
+
+            return Response({"mensaje": f"Materias importadas correctamente: {procesadas}"}, status=status.HTTP_201_CREATED)
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            for ruta in rutas:
+                os.remove(ruta)
 
 
 class CalificacionListView(LoginRequiredMixin, ListView):
@@ -826,19 +682,14 @@ def calificacion_create(request):
                     materia = Materia.objects.get(id=materia_id)
                     calificacion = form.save(commit=False)
                     calificacion.materia = materia
+                    # El promedio y créditos del alumno se ajustan en signals.py
                     calificacion.save()
-                    # Recalcular promedio y créditos del alumno
-                    if calificacion.alumno:
-                        calificacion.alumno.actualizar_datos_academicos()
                     messages.success(request, 'Calificación creada correctamente.')
                     return redirect('datos_academicos:calificacion_list')
                 except Materia.DoesNotExist:
                     messages.error(request, f'No se encontró la materia con ID: {materia_id}')
             else:
                 calificacion = form.save()
-                # Recalcular promedio y créditos del alumno
-                if calificacion.alumno:
-                    calificacion.alumno.actualizar_datos_academicos()
                 messages.success(request, 'Calificación creada correctamente.')
                 return redirect('datos_academicos:calificacion_list')
         else:
@@ -859,13 +710,15 @@ def calificacion_create(request):
 @require_GET
 @login_required
 def api_calificaciones_list(request):
-    """Devuelve lista paginada de calificaciones con filtros simples."""
+    """Devuelve lista paginada de calificaciones con filtros simples.
+
+    Con ``cursor`` (vacío para la primera página) pagina por cursor sobre
+    (fecha_registro, id) como ``api_alumnos_list``; ``total`` es opcional.
+    """
     q = request.GET.get('q', '').strip()
     periodo = request.GET.get('periodo')
     acreditacion = request.GET.get('acreditacion')
     order = request.GET.get('order', 'recientes')  # recientes | antiguas
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 25))
 
     qs = Calificacion.objects.select_related('alumno', 'materia', 'periodo_escolar')
 
@@ -882,16 +735,38 @@ def api_calificaciones_list(request):
     if acreditacion:
         qs = qs.filter(acreditacion=acreditacion)
 
-    # Ordenamiento por fecha de registro
-    if order == 'antiguas':
-        qs = qs.order_by('fecha_registro')
-    else:
-        qs = qs.order_by('-fecha_registro')
+    # Ordenamiento por fecha de registro (id desempata; índice (fecha_registro, id))
+    orden = ['fecha_registro', 'id'] if order == 'antiguas' else ['-fecha_registro', '-id']
+    qs = qs.order_by(*orden)
+
+    if 'cursor' in request.GET:
+        try:
+            calificaciones, siguiente = paginar_por_cursor(
+                qs, orden, request.GET.get('cursor'), tamano_pagina(request.GET.get('page_size')),
+            )
+        except CursorInvalido:
+            return _cursor_invalido()
+        return JsonResponse({
+            'results': [_calificacion_en_lista(c) for c in calificaciones],
+            'siguiente': siguiente,
+            **totales(qs, request.GET.get('total')),
+        })
 
+    page = int(request.GET.get('page', 1))
+    page_size = int(request.GET.get('page_size', 25))
     paginator = Paginator(qs, page_size)
     page_obj = paginator.get_page(page)
 
-    items = [{
+    return JsonResponse({
+        'results': [_calificacion_en_lista(c) for c in page_obj.object_list],
+        'page': page_obj.number,
+        'total_pages': paginator.num_pages,
+        'total': paginator.count,
+    })
+
+
+def _calificacion_en_lista(c):
+    return {
         'id': c.id,
         'alumno': f"{c.alumno.nombre} ({c.alumno.matricula})",
         'alumno_nombre': c.alumno.nombre,
@@ -905,14 +780,7 @@ def api_calificaciones_list(request):
         'acreditacion': c.acreditacion,
         'fecha_registro': c.fecha_registro.isoformat() if c.fecha_registro else None,
         'observaciones': c.observaciones or '',
-    } for c in page_obj.object_list]
-
-    return JsonResponse({
-        'results': items,
-        'page': page_obj.number,
-        'total_pages': paginator.num_pages,
-        'total': paginator.count,
-    })
+    }
 
 @require_POST
 @login_required
@@ -984,9 +852,6 @@ def api_calificacion_create(request):
         cal.save()
     except IntegrityError:
         return JsonResponse({'success': False, 'message': 'La calificación ya existe (restricción de unicidad).'}, status=409)
-    # Recalcular promedio y créditos del alumno
-    if cal.alumno:
-        cal.alumno.actualizar_datos_academicos()
 
     return JsonResponse({
         'success': True,
@@ -1121,13 +986,11 @@ class PlanEstudioListView(LoginRequiredMixin, ListView):
         # Años disponibles para filtro
         años_disponibles = PlanEstudio.objects.values_list('año', flat=True).distinct().order_by('-año')
         
-        # Estadísticas de materias por plan
+        # Estadísticas de materias por plan (del índice de planes, sin consultas por plan)
+        indice = indice_curricular()
         planes_con_materias = []
         for plan in self.get_queryset():
-            materias_count = MateriaCarrera.objects.filter(carrera=plan.carrera).count()
-            creditos_totales = MateriaCarrera.objects.filter(carrera=plan.carrera).aggregate(
-                total_creditos=Sum('materia__creditos')
-            )['total_creditos'] or 0
+            materias_count, creditos_totales = indice.totales(plan.carrera_id)
             
             planes_con_materias.append({
                 'plan': plan,
@@ -1137,12 +1000,9 @@ class PlanEstudioListView(LoginRequiredMixin, ListView):
         
         # Estadísticas por carrera
         stats_por_carrera = []
-        for carrera in Carrera.objects.all():
-            planes_carrera = PlanEstudio.objects.filter(carrera=carrera).count()
-            materias_carrera = MateriaCarrera.objects.filter(carrera=carrera).count()
-            creditos_carrera = MateriaCarrera.objects.filter(carrera=carrera).aggregate(
-                total=Sum('materia__creditos')
-            )['total'] or 0
+        for carrera in Carrera.objects.annotate(total_planes=Count('planes_estudios')):
+            planes_carrera = carrera.total_planes
+            materias_carrera, creditos_carrera = indice.totales(carrera.pk)
             
             if planes_carrera > 0:
                 stats_por_carrera.append({
@@ -1160,7 +1020,7 @@ class PlanEstudioListView(LoginRequiredMixin, ListView):
             'stats_por_carrera': stats_por_carrera,
             'total_carreras': Carrera.objects.count(),
             'promedio_materias_por_carrera': round(
-                MateriaCarrera.objects.count() / max(Carrera.objects.count(), 1), 1
+                indice.total_relaciones() / max(Carrera.objects.count(), 1), 1
             )
         })
         
@@ -1346,12 +1206,7 @@ def buscar_alumno_ajax(request):
         # Búsqueda general para autocompletado
         query = request.GET.get('q', '')
         if len(query) >= 3:
-            alumnos = Alumno.objects.filter(
-                Q(matricula__icontains=query) |
-                Q(nombre__icontains=query) |
-                Q(apellido_paterno__icontains=query) |
-                Q(apellido_materno__icontains=query)
-            )[:10]
+            alumnos = buscar_alumnos(query, Alumno.objects.select_related('carrera'))[:10]
             
             results = []
             for alumno in alumnos:
@@ -1440,13 +1295,11 @@ class PlanEstudioListView(LoginRequiredMixin, ListView):
         # Años disponibles para filtro
         años_disponibles = PlanEstudio.objects.values_list('año', flat=True).distinct().order_by('-año')
         
-        # Estadísticas de materias por plan
+        # Estadísticas de materias por plan (del índice de planes, sin consultas por plan)
+        indice = indice_curricular()
         planes_con_materias = []
         for plan in self.get_queryset():
-            materias_count = MateriaCarrera.objects.filter(carrera=plan.carrera).count()
-            creditos_totales = MateriaCarrera.objects.filter(carrera=plan.carrera).aggregate(
-                total_creditos=Sum('materia__creditos')
-            )['total_creditos'] or 0
+            materias_count, creditos_totales = indice.totales(plan.carrera_id)
             
             planes_con_materias.append({
                 'plan': plan,
@@ -1456,12 +1309,9 @@ class PlanEstudioListView(LoginRequiredMixin, ListView):
         
         # Estadísticas por carrera
         stats_por_carrera = []
-        for carrera in Carrera.objects.all():
-            planes_carrera = PlanEstudio.objects.filter(carrera=carrera).count()
-            materias_carrera = MateriaCarrera.objects.filter(carrera=carrera).count()
-            creditos_carrera = MateriaCarrera.objects.filter(carrera=carrera).aggregate(
-                total=Sum('materia__creditos')
-            )['total'] or 0
+        for carrera in Carrera.objects.annotate(total_planes=Count('planes_estudios')):
+            planes_carrera = carrera.total_planes
+            materias_carrera, creditos_carrera = indice.totales(carrera.pk)
             
             if planes_carrera > 0:
                 stats_por_carrera.append({
@@ -1479,7 +1329,7 @@ class PlanEstudioListView(LoginRequiredMixin, ListView):
             'stats_por_carrera': stats_por_carrera,
             'total_carreras': Carrera.objects.count(),
             'promedio_materias_por_carrera': round(
-                MateriaCarrera.objects.count() / max(Carrera.objects.count(), 1), 1
+                indice.total_relaciones() / max(Carrera.objects.count(), 1), 1
             )
         })
         
@@ -7,13 +7,14 @@ from django.contrib.auth.models import Group
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.urls import reverse
-from django.db.models import Count, Avg
+from django.db.models import Count
 from django.utils import timezone
 from datetime import datetime, timedelta
 
 from .forms_auth import AlumnoLoginForm, AlumnoPasswordResetForm
 from datos_academicos.forms_servicios import ServiciosPerfilForm
 from .models import Alumno, Calificacion, PeriodoEscolar
+from .resumen import resumen_de, semestre_en_carrera
 from procedimientos.models import Tramite
 
 
@@ -74,7 +75,7 @@ def alumno_dashboard_view(request):
     
     # Obtener el alumno asociado al usuario
     try:
-        alumno = Alumno.objects.get(matricula=request.user.username)
+        alumno = Alumno.objects.select_related('carrera', 'resumen_academico').get(matricula=request.user.username)
     except Alumno.DoesNotExist:
         messages.error(request, 'No se encontró información del alumno.')
         return redirect('datos_academicos:alumno_login')
@@ -82,10 +83,11 @@ def alumno_dashboard_view(request):
     # Obtener período escolar activo
     periodo_activo = PeriodoEscolar.objects.filter(activo=True).first()
     
-    # Estadísticas del alumno
-    total_calificaciones = Calificacion.objects.filter(alumno=alumno).count()
-    promedio_general = alumno.calcular_promedio()
-    creditos_aprobados = alumno.calcular_creditos_aprobados()
+    # Estadísticas del alumno (precalculadas, ver agregados.py y resumen.py)
+    resumen = resumen_de(alumno)
+    total_calificaciones = resumen.total_calificaciones
+    promedio_general = float(alumno.promedio)
+    creditos_aprobados = alumno.creditos_aprobados
     creditos_totales = alumno.carrera.creditos_totales
     
     # Progreso académico
@@ -113,21 +115,11 @@ def alumno_dashboard_view(request):
     ).count()
     
     # Datos para gráficos
-    calificaciones_por_semestre = []
-    for i in range(1, semestre_actual + 1):
-        materias_semestre_i = Calificacion.objects.filter(
-            alumno=alumno,
-            materia__materiacarrera__semestre=i,
-            materia__materiacarrera__carrera=alumno.carrera
-        )
-        if materias_semestre_i.exists():
-            promedio_semestre = materias_semestre_i.aggregate(
-                promedio=Avg('calificacion')
-            )['promedio']
-            calificaciones_por_semestre.append({
-                'semestre': i,
-                'promedio': round(float(promedio_semestre or 0), 2)
-            })
+    calificaciones_por_semestre = [
+        {'semestre': s['semestre'], 'promedio': s['promedio']}
+        for s in resumen.por_semestre
+        if 1 <= s['semestre'] <= semestre_actual
+    ]
     
     context = {
         'alumno': alumno,
@@ -161,36 +153,29 @@ def alumno_calificaciones_view(request):
     
     # Obtener el alumno asociado al usuario
     try:
-        alumno = Alumno.objects.get(matricula=request.user.username)
+        alumno = Alumno.objects.select_related('carrera', 'resumen_academico').get(matricula=request.user.username)
     except Alumno.DoesNotExist:
         messages.error(request, 'No se encontró información del alumno.')
         return redirect('datos_academicos:alumno_login')
     
-    # Obtener calificaciones agrupadas por semestre
+    # Calificaciones con el semestre de su materia en la carrera del alumno (una sola consulta)
     calificaciones = Calificacion.objects.filter(
         alumno=alumno
-    ).select_related('materia', 'periodo_escolar').order_by(
-        'materia__materiacarrera__semestre', 'materia__nombre'
-    )
+    ).select_related('materia', 'periodo_escolar').annotate(
+        semestre_carrera=semestre_en_carrera()
+    ).order_by('semestre_carrera', 'materia__nombre')
     
     # Agrupar por semestre
     calificaciones_por_semestre = {}
     for calificacion in calificaciones:
-        semestre = calificacion.materia.materiacarrera_set.filter(
-            carrera=alumno.carrera
-        ).first()
-        semestre_num = semestre.semestre if semestre else 0
-        
-        if semestre_num not in calificaciones_por_semestre:
-            calificaciones_por_semestre[semestre_num] = []
-        
-        calificaciones_por_semestre[semestre_num].append(calificacion)
+        calificaciones_por_semestre.setdefault(calificacion.semestre_carrera, []).append(calificacion)
     
-    # Calcular estadísticas
-    promedio_general = alumno.calcular_promedio()
-    total_materias = calificaciones.count()
-    materias_aprobadas = calificaciones.filter(calificacion__gte=6.0).count()
-    materias_reprobadas = calificaciones.filter(calificacion__lt=6.0).count()
+    # Estadísticas (precalculadas, ver agregados.py y resumen.py)
+    resumen = resumen_de(alumno)
+    promedio_general = float(alumno.promedio)
+    total_materias = resumen.total_calificaciones
+    materias_aprobadas = resumen.materias_aprobadas
+    materias_reprobadas = resumen.materias_reprobadas
     
     context = {
         'alumno': alumno,
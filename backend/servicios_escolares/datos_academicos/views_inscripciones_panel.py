@@ -4,9 +4,11 @@ from django.contrib import messages
 from django.db import transaction
 from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
+from django.db.models import Count, Q
 from django.utils import timezone
 
 from admision.email_utils import send_email_safe
+from servicios_escolares.cache_etiquetas import en_cache, registrar_etiquetas
 
 from .models_inscripcion_simple import InscripcionSimple
 # Reinscripción eliminada del sistema
@@ -27,6 +29,31 @@ def _is_admin_user(user):
         return False
 
 
+ETIQUETAS_INSCRIPCIONES = registrar_etiquetas(
+    "datos_academicos.inscripcionsimple", "datos_academicos.inscripcionnueva",
+)
+
+
+def _stats_inscripciones():
+    """Conteos por estado de Inscripción Simple y Nueva (públicas), una consulta por modelo."""
+    simple = InscripcionSimple.objects.order_by().aggregate(
+        total=Count("id"),
+        pendientes=Count("id", filter=Q(estado="Pendiente")),
+        aprobadas=Count("id", filter=Q(estado="Aprobada")),
+        rechazadas=Count("id", filter=Q(estado="Rechazada")),
+    )
+    nueva = InscripcionNueva.objects.order_by().aggregate(
+        total=Count("id"),
+        borrador=Count("id", filter=Q(estado="Borrador")),
+        enviadas=Count("id", filter=Q(estado="Enviado")),
+        revision=Count("id", filter=Q(estado="En Revisión")),
+        aprobadas=Count("id", filter=Q(estado="Aprobada")),
+        rechazadas=Count("id", filter=Q(estado="Rechazada")),
+        completadas=Count("id", filter=Q(estado="Completada")),
+    )
+    return {"simple": simple, "nueva": nueva}
+
+
 @login_required
 def inscripciones_panel_admin(request):
     """Panel administrativo de inscripciones con estilo de Admisión."""
@@ -34,29 +61,14 @@ def inscripciones_panel_admin(request):
         messages.error(request, "Acceso restringido: solo personal administrativo.")
         return redirect("datos_academicos:servicios_login")
 
-    # Stats Inscripción Simple
-    stats_simple = {
-        "total": InscripcionSimple.objects.count(),
-        "pendientes": InscripcionSimple.objects.filter(estado="Pendiente").count(),
-        "aprobadas": InscripcionSimple.objects.filter(estado="Aprobada").count(),
-        "rechazadas": InscripcionSimple.objects.filter(estado="Rechazada").count(),
-    }
+    # Stats de Inscripción Simple y Nueva: en caché hasta que cambie una inscripción
+    stats = en_cache("tablero:inscripciones", ETIQUETAS_INSCRIPCIONES, _stats_inscripciones)
     recientes_simple = InscripcionSimple.objects.order_by("-fecha_solicitud")[:5]
 
     # Reinscripción removida: limpiar estadísticas y recientes
     stats_reins = None
     recientes_reins = []
 
-    # Stats Inscripción Nueva (públicas)
-    stats_nueva = {
-        "total": InscripcionNueva.objects.count(),
-        "borrador": InscripcionNueva.objects.filter(estado="Borrador").count(),
-        "enviadas": InscripcionNueva.objects.filter(estado="Enviado").count(),
-        "revision": InscripcionNueva.objects.filter(estado="En Revisión").count(),
-        "aprobadas": InscripcionNueva.objects.filter(estado="Aprobada").count(),
-        "rechazadas": InscripcionNueva.objects.filter(estado="Rechazada").count(),
-        "completadas": InscripcionNueva.objects.filter(estado="Completada").count(),
-    }
     recientes_nueva = InscripcionNueva.objects.select_related("carrera_solicitada", "periodo_escolar").order_by("-creado_en")[:5]
 
     periodo_activo = PeriodoEscolar.objects.filter(activo=True).first()
@@ -64,10 +76,10 @@ def inscripciones_panel_admin(request):
     context = {
         "title": "Panel de Inscripciones",
         "periodo_activo": periodo_activo,
-        "stats_simple": stats_simple,
+        "stats_simple": stats["simple"],
         "recientes_simple": recientes_simple,
         # Se removieron estadísticas y recientes de Reinscripción
-        "stats_nueva": stats_nueva,
+        "stats_nueva": stats["nueva"],
         "recientes_nueva": recientes_nueva,
         "estados_nueva_choices": InscripcionNueva.ESTADO_CHOICES,
     }
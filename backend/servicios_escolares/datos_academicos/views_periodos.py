@@ -5,6 +5,7 @@ from django.db.models import Count
 from django.utils import timezone
 from datetime import datetime
 
+from audit.bulk import audited_update
 from .models import PeriodoEscolar, Alumno
 from servicios_escolares.forms import PeriodoEscolarForm
 from admision.models import PeriodoAdmision
@@ -172,6 +173,6 @@ def periodo_aplicar_transicion(request):
     """Transición automática: marcar alumnos como 'No Inscrito' al finalizar periodo."""
     hoy = timezone.now().date()
     afectados = Alumno.objects.filter(fin_semestre__isnull=False, fin_semestre__lte=hoy, estatus='Inscrito')
-    count = afectados.update(estatus='No Inscrito')
+    count = audited_update(afectados, estatus='No Inscrito')
     messages.success(request, f'Transición aplicada: {count} alumnos marcados como No Inscrito.')
     return redirect('datos_academicos:periodos_listar')
\ No newline at end of file
@@ -1,6 +1,13 @@
 from django.contrib import admin
-from .models import ModeloAutorizado
+from .models import ModeloAutorizado, ImportacionExcel
 
 
 # Register your models here.
-admin.site.register(ModeloAutorizado)
\ No newline at end of file
+admin.site.register(ModeloAutorizado)
+
+
+@admin.register(ImportacionExcel)
+class ImportacionExcelAdmin(admin.ModelAdmin):
+    list_display = ('id', 'modelo', 'usuario', 'hoja', 'total_filas', 'fecha_creacion')
+    list_filter = ('modelo',)
+    readonly_fields = ('encabezados', 'total_filas', 'fecha_creacion')
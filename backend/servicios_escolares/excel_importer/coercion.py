@@ -0,0 +1,177 @@
+"""
+Conversión de tipos por columna para el importador de Excel.
+
+Cada columna mapeada de un lote se convierte en una sola pasada con
+pandas/NumPy (numéricos, fechas y choices mediante una tabla precalculada;
+los decimales se truncan con ``Decimal`` sobre las celdas válidas). El resultado es una lista de valores por campo y
+una máscara de errores por fila que consume el escritor por filas
+(``ImportadorLotes``).
+"""
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+from django.db.models import ForeignKey, ManyToManyField
+from django.utils import timezone
+
+TIPOS_ENTEROS = {
+    'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+}
+
+# Los enteros se truncan a int64: lo que no cabe se desbordaría en el cast
+LIMITE_INT64 = 2.0 ** 63
+
+
+def tabla_choices(field):
+    """Valor normalizado (minúsculas) -> valor del choice, calculada una vez por campo."""
+    tabla = {}
+    for choice_val, _ in field.flatchoices:
+        tabla.setdefault(str(choice_val).strip().lower(), choice_val)
+    return tabla
+
+
+class LoteCoercionado:
+    """Valores convertidos por campo y el primer error de cada fila (o None)."""
+
+    def __init__(self, total):
+        self.valores = {}
+        self.errores = [None] * total
+        self.fallos_fk = [False] * total
+
+    def marcar(self, mascara, mensajes):
+        """Registra ``mensajes[i]`` en las filas de ``mascara`` que aún no tienen error."""
+        for i in np.flatnonzero(mascara):
+            if self.errores[i] is None:
+                self.errores[i] = mensajes(i) if callable(mensajes) else mensajes
+
+    def datos_fila(self, i):
+        return {campo: valores[i] for campo, valores in self.valores.items()}
+
+
+class CoercionColumnas:
+    """Convierte los lotes de un modelo; las tablas de choices se precalculan aquí."""
+
+    def __init__(self, campos, col_indices, resolutor):
+        self.campos = campos
+        self.col_indices = col_indices
+        self.resolutor = resolutor
+        self.choices = {campo: tabla_choices(f) for campo, f in campos.items() if f.choices}
+
+    def convertir(self, filas):
+        lote = LoteCoercionado(len(filas))
+        columnas = {
+            campo: pd.Series([fila[idx] for fila in filas], dtype=object)
+            for campo, idx in self.col_indices.items()
+        }
+        vacios = {campo: (serie.isna() | (serie == '')).to_numpy() for campo, serie in columnas.items()}
+
+        # Primero los obligatorios de todas las columnas, como en la validación fila por fila
+        for campo, field in self.campos.items():
+            if not (field.null or field.blank):
+                lote.marcar(vacios[campo], f"Campo obligatorio '{campo}' vacío.")
+
+        for campo, field in self.campos.items():
+            serie, vacio = columnas[campo], vacios[campo]
+            if isinstance(field, (ForeignKey, ManyToManyField)):
+                valores, invalido = self._relacion(campo, field, serie, vacio, lote)
+            elif field.choices:
+                valores, invalido = self._choice(campo, serie, vacio)
+            elif field.get_internal_type() == 'DecimalField':
+                valores, invalido = self._decimal(field, serie, vacio)
+            elif field.get_internal_type() in TIPOS_ENTEROS:
+                valores, invalido = self._entero(serie, vacio)
+            elif field.get_internal_type() in ('DateField', 'DateTimeField'):
+                valores, invalido = self._fecha(field, serie, vacio)
+            else:
+                valores = [None if v else x for x, v in zip(serie.tolist(), vacio)]
+                invalido = None
+            lote.valores[campo] = valores
+            if invalido is not None:
+                lote.marcar(invalido, self._mensaje(campo, field, serie))
+        return lote
+
+    # ------------------------------------------------------------------
+    # Conversores por tipo (una pasada por columna)
+    # ------------------------------------------------------------------
+    def _relacion(self, campo, field, serie, vacio, lote):
+        valores = self.resolutor.resolver_columna(campo, field.related_model, serie, vacio)
+        sin_resolver = np.array([v is None for v in valores]) & ~vacio
+        for i in np.flatnonzero(sin_resolver):
+            if lote.errores[i] is None:
+                lote.fallos_fk[i] = True
+        return valores, sin_resolver
+
+    def _choice(self, campo, serie, vacio):
+        normalizada = serie.map(lambda v: str(v).strip().lower(), na_action='ignore')
+        convertida = normalizada.map(self.choices[campo])
+        invalido = convertida.isna().to_numpy() & ~vacio
+        return [None if v or i else x for x, v, i in zip(convertida.tolist(), vacio, invalido)], invalido
+
+    @staticmethod
+    def _numerica(serie):
+        limpia = serie.map(lambda v: v.strip() if isinstance(v, str) else v)
+        numeros = pd.to_numeric(limpia, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        return numeros, ~np.isfinite(numeros)
+
+    def _decimal(self, field, serie, vacio):
+        # NumPy solo decide qué celdas son numéricas; el valor se lee como Decimal del
+        # texto original para no perder dígitos ni redondear antes de truncar
+        _, no_numerico = self._numerica(serie)
+        invalido = no_numerico & ~vacio
+        cuanto = Decimal(1).scaleb(-field.decimal_places)
+        # Con más dígitos que max_digits no cabe en la columna
+        limite = Decimal(10) ** (field.max_digits - field.decimal_places) if field.max_digits else None
+        valores = []
+        for i, (x, v) in enumerate(zip(serie.tolist(), vacio)):
+            if v or invalido[i]:
+                valores.append(None)
+                continue
+            try:
+                valor = Decimal(str(x).strip()).quantize(cuanto, rounding=ROUND_DOWN)
+            except (InvalidOperation, ValueError):
+                valor = None
+            if valor is None or (limite is not None and abs(valor) >= limite):
+                invalido[i] = True
+                valor = None
+            valores.append(valor)
+        return valores, invalido
+
+    def _entero(self, serie, vacio):
+        numeros, no_numerico = self._numerica(serie)
+        truncados = np.trunc(np.where(no_numerico, 0, numeros))
+        fuera = np.abs(truncados) >= LIMITE_INT64
+        enteros = np.where(fuera, 0, truncados).astype('int64')
+        invalido = (no_numerico | fuera) & ~vacio
+        return [None if v or i else int(x) for x, v, i in zip(enteros, vacio, invalido)], invalido
+
+    def _fecha(self, field, serie, vacio):
+        texto = serie.map(lambda v: v.strip() if isinstance(v, str) else v)
+        # ISO (lo que guarda el staging) primero; el resto como texto día/mes/año
+        fechas = pd.to_datetime(texto, errors='coerce', format='ISO8601')
+        pendientes = fechas.isna() & ~pd.Series(vacio)
+        if pendientes.any():
+            fechas[pendientes] = pd.to_datetime(texto[pendientes], errors='coerce', format='mixed', dayfirst=True)
+        invalido = fechas.isna().to_numpy() & ~vacio
+
+        es_datetime = field.get_internal_type() == 'DateTimeField'
+        valores = []
+        for ts, v, i in zip(fechas.tolist(), vacio, invalido):
+            if v or i:
+                valores.append(None)
+            elif es_datetime:
+                dt = ts.to_pydatetime()
+                valores.append(timezone.make_aware(dt) if timezone.is_naive(dt) else dt)
+            else:
+                valores.append(ts.date())
+        return valores, invalido
+
+    @staticmethod
+    def _mensaje(campo, field, serie):
+        if isinstance(field, (ForeignKey, ManyToManyField)):
+            return lambda i: (
+                f"No se encontró instancia relacionada para FK '{campo}' con valor '{serie.iat[i]}'."
+            )
+        if field.choices:
+            return lambda i: f"Valor '{serie.iat[i]}' no válido para campo con choices '{campo}'."
+        return lambda i: f"Error al convertir campo '{campo}': valor '{serie.iat[i]}' no válido."
@@ -1,4 +1,5 @@
 from django import forms
+from .models import ImportacionExcel
 
 class UploadExcelForm(forms.Form):
     archivo = forms.FileField(
@@ -31,4 +32,31 @@ class MapeoCamposForm(forms.Form):
         super().__init__(*args, **kwargs)
         opciones = [('', '---')] + [(col, col) for col in columnas_excel]
         for campo in campos_modelo:
-            self.fields[campo] = forms.ChoiceField(choices=opciones, required=False, label=f"Asignar columna para '{campo}'")
\ No newline at end of file
+            self.fields[campo] = forms.ChoiceField(choices=opciones, required=False, label=f"Asignar columna para '{campo}'")
+
+
+class OpcionesImportacionForm(forms.Form):
+    """
+    Qué hacer con los registros que ya existen y si solo se simula la
+    importación. Se envía junto con el mapeo, con prefijo 'opciones' para no
+    chocar con los nombres de campos del modelo.
+    """
+    modo = forms.ChoiceField(
+        choices=ImportacionExcel.MODOS,
+        initial='omitir',
+        required=False,
+        label='Registros existentes',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    simulacion = forms.BooleanField(
+        required=False,
+        label='Solo simular (mostrar cuántos registros se crearían, actualizarían o quedarían igual, sin guardar)',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('prefix', 'opciones')
+        super().__init__(*args, **kwargs)
+
+    def clean_modo(self):
+        return self.cleaned_data.get('modo') or 'omitir'
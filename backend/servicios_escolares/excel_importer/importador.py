@@ -0,0 +1,475 @@
+"""
+Motor de importación por lotes para el importador genérico de Excel.
+
+Las filas se convierten por columna (ver ``coercion``), se validan por lotes
+y se escriben con ``bulk_create`` (con bitácora, ver ``audit.bulk``) dentro
+de un savepoint por lote. Si el lote completo falla en la base de datos
+(p. ej. por una restricción ``unique_together``), se reintenta fila por fila
+para conservar el reporte de errores por fila (``filas_invalidas``).
+
+Los duplicados se detectan por lote con una sola consulta ``IN`` sobre la
+clave única del modelo. Con ``modo='actualizar'`` los registros existentes
+se actualizan (``bulk_update`` solo con los campos que cambiaron) en lugar
+de omitirse, y con ``simulacion=True`` se calcula todo sin escribir nada.
+"""
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction, DatabaseError
+from django.db.models import ForeignKey, ManyToManyField
+
+from audit.bulk import audited_bulk_create, audited_bulk_update
+
+from .coercion import CoercionColumnas
+from .utils import ResolutorRelaciones
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_POR_DEFECTO = 500
+
+# 'omitir' deja intactos los registros existentes; 'actualizar' hace upsert
+MODOS_IMPORTACION = ('omitir', 'actualizar')
+
+# Campos de Materia que cambian cómo cuentan sus calificaciones en los agregados del alumno
+CAMPOS_REGLAS_MATERIA = {'creditos', 'cuenta_promedio'}
+
+
+def tamano_lote_configurado():
+    """Tamaño de lote definido en settings (EXCEL_IMPORTER_TAMANO_LOTE)."""
+    return getattr(settings, 'EXCEL_IMPORTER_TAMANO_LOTE', TAMANO_LOTE_POR_DEFECTO)
+
+
+class ResultadoImportacion:
+    """Acumula los contadores y el reporte de filas omitidas de una importación."""
+
+    def __init__(self):
+        self.registros_importados = 0
+        self.registros_actualizados = 0
+        self.registros_sin_cambios = 0
+        self.filas_invalidas = []
+        self.filas_omitidas_fk = 0
+        self.resolucion_fk = []
+
+    def omitir(self, idx, fila, razon):
+        self.filas_invalidas.append((idx, fila, razon))
+        logger.warning(f"Fila {idx + 2} omitida: {razon}")
+
+
+class ImportadorLotes:
+    """
+    Importa filas (listas de celdas) a ``ModelClass`` usando el mapeo
+    ``col_indices`` (campo -> índice de columna).
+
+    Uso:
+        importador = ImportadorLotes(ModelClass, col_indices, tamano_lote=500,
+                                     modo='actualizar', simulacion=False)
+        resultado = importador.importar(enumerate(filas))
+    """
+
+    def __init__(self, ModelClass, col_indices, tamano_lote=None, modo='omitir', simulacion=False):
+        self.ModelClass = ModelClass
+        self.col_indices = col_indices
+        self.tamano_lote = max(1, int(tamano_lote or tamano_lote_configurado()))
+        if modo not in MODOS_IMPORTACION:
+            raise ValueError(f"Modo de importación no válido: {modo}")
+        self.modo = modo
+        self.simulacion = simulacion
+        opts = ModelClass._meta
+        # Se resuelven una sola vez por importación, no por celda
+        self.campos = {campo: opts.get_field(campo) for campo in col_indices}
+        self.campos_m2m = {c for c, f in self.campos.items() if isinstance(f, ManyToManyField)}
+        self.campos_fk = [c for c, f in self.campos.items() if isinstance(f, ForeignKey)]
+        self.es_materia = ModelClass.__name__ == 'Materia'
+        self.es_alumno = ModelClass.__name__ == 'Alumno'
+        self.es_calificacion = ModelClass.__name__ == 'Calificacion'
+        self.campos_identidad = self._campos_identidad()
+        self.campos_actualizables = [
+            c for c in self.campos if c not in self.campos_m2m and c not in self.campos_identidad
+        ]
+        self.claves_vistas = set()
+        self.resolutor = ResolutorRelaciones()
+        self.coercion = CoercionColumnas(self.campos, col_indices, self.resolutor)
+        self.resultado = ResultadoImportacion()
+
+    def _campos_identidad(self):
+        """
+        Campos que identifican un registro existente: el primer campo único
+        mapeado o, si no hay, la primera restricción compuesta cuyos campos
+        estén todos mapeados. Vacío si el mapeo no permite detectar duplicados.
+        """
+        opts = self.ModelClass._meta
+        for f in opts.concrete_fields:
+            if f.unique and not f.primary_key and f.name in self.campos:
+                return (f.name,)
+        compuestas = [tuple(grupo) for grupo in opts.unique_together]
+        compuestas += [tuple(c.fields) for c in opts.total_unique_constraints]
+        for grupo in compuestas:
+            if grupo and all(c in self.campos for c in grupo):
+                return grupo
+        return ()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def importar(self, filas_numeradas):
+        """Procesa un iterable de tuplas (idx, fila) en lotes."""
+        lote = []
+        for idx, fila in filas_numeradas:
+            lote.append((idx, fila))
+            if len(lote) >= self.tamano_lote:
+                self.procesar_lote(lote)
+                lote = []
+        if lote:
+            self.procesar_lote(lote)
+        self.resultado.filas_invalidas.sort(key=lambda item: item[0])
+        self.resultado.resolucion_fk = self.resolutor.resumen()
+        for linea in self.resultado.resolucion_fk:
+            logger.info(linea)
+        return self.resultado
+
+    def procesar_lote(self, lote):
+        validas = []
+        convertido = self.coercion.convertir([fila for _, fila in lote])
+        for i, (idx, fila) in enumerate(lote):
+            if convertido.errores[i] is not None:
+                if convertido.fallos_fk[i]:
+                    self.resultado.filas_omitidas_fk += 1
+                self.resultado.omitir(idx, fila, convertido.errores[i])
+                continue
+            validas.append((idx, fila, convertido.datos_fila(i)))
+
+        nuevos, existentes, materias = self.clasificar(validas)
+        objetos = self.validar(nuevos)
+        actualizados = self.preparar_actualizaciones(existentes)
+
+        if self.simulacion:
+            self.resultado.registros_importados += len(objetos)
+            self.resultado.registros_actualizados += len(actualizados)
+            for idx, fila, datos, _ in materias:
+                if self.modo == 'omitir':
+                    self.resultado.filas_invalidas.append(
+                        (idx, fila, f"Materia con clave {datos.get('clave')} ya existe - se procesaría la relación")
+                    )
+            return
+
+        if objetos:
+            self.escribir(objetos)
+        if actualizados:
+            self.escribir_actualizaciones(actualizados)
+        for idx, fila, datos, materia in materias:
+            self.procesar_materia_existente(idx, fila, datos, materia)
+
+    # ------------------------------------------------------------------
+    # Duplicados
+    # ------------------------------------------------------------------
+    def clave_identidad(self, datos):
+        """Clave normalizada de una fila, o None si le falta algún campo de identidad."""
+        if not self.campos_identidad:
+            return None
+        clave = []
+        for campo in self.campos_identidad:
+            valor = datos.get(campo)
+            if valor is None:
+                return None
+            field = self.campos[campo]
+            if isinstance(field, ForeignKey):
+                valor = getattr(valor, field.target_field.attname)
+            else:
+                try:
+                    valor = field.to_python(valor)
+                except ValidationError:
+                    return None
+            clave.append(valor)
+        return tuple(clave)
+
+    def buscar_existentes(self, claves):
+        """Registros ya guardados con alguna de ``claves``: una sola consulta por lote."""
+        if not claves:
+            return {}
+        filtro = {
+            f"{campo}__in": {clave[i] for clave in claves}
+            for i, campo in enumerate(self.campos_identidad)
+        }
+        attnames = [self.campos[campo].attname for campo in self.campos_identidad]
+        # Con claves compuestas el IN por columna trae un superconjunto; se filtra aquí
+        existentes = {}
+        for obj in self.ModelClass.objects.filter(**filtro):
+            clave = tuple(getattr(obj, attname) for attname in attnames)
+            if clave in claves:
+                existentes[clave] = obj
+        return existentes
+
+    def clasificar(self, validas):
+        """
+        Separa las filas del lote en nuevas, existentes a actualizar y materias
+        existentes (cuya relación con la carrera se procesa aparte). Los
+        duplicados que no se actualizan quedan en el reporte de omitidas.
+        """
+        claves_filas = [self.clave_identidad(datos) for _, _, datos in validas]
+        existentes_bd = self.buscar_existentes(set(claves_filas) - self.claves_vistas - {None})
+
+        nuevos, existentes, materias = [], [], []
+        for (idx, fila, datos), clave in zip(validas, claves_filas):
+            if clave is None:
+                nuevos.append((idx, fila, datos))
+                continue
+            if clave in self.claves_vistas:
+                # Repetida dentro del mismo archivo: la primera aparición gana
+                if self.es_materia:
+                    materias.append((idx, fila, datos, None))
+                else:
+                    self._duplicado(idx, fila, datos, "en el archivo")
+                continue
+            self.claves_vistas.add(clave)
+
+            existente = existentes_bd.get(clave)
+            if existente is None:
+                nuevos.append((idx, fila, datos))
+                continue
+            if self.modo == 'actualizar':
+                existentes.append((idx, fila, datos, existente))
+            if self.es_materia:
+                materias.append((idx, fila, datos, existente))
+            elif self.modo == 'omitir':
+                self._duplicado(idx, fila, datos, "con")
+        return nuevos, existentes, materias
+
+    def _duplicado(self, idx, fila, datos, donde):
+        filtro_unico = {campo: datos[campo] for campo in self.campos_identidad}
+        self.resultado.filas_invalidas.append((idx, fila, f"Registro duplicado {donde} {filtro_unico}"))
+        logger.info(f"Fila {idx + 2} omitida: registro duplicado {donde} {filtro_unico}")
+
+    # ------------------------------------------------------------------
+    # Conversión y validación
+    # ------------------------------------------------------------------
+    def validar(self, nuevos):
+        """
+        Construye y valida las instancias. La unicidad la resuelve la BD y las
+        FKs ya fueron resueltas contra el índice, así que no se revalidan.
+        """
+        objetos = []
+        for idx, fila, datos in nuevos:
+            atributos = {k: v for k, v in datos.items() if k not in self.campos_m2m}
+            relaciones = {k: datos[k] for k in self.campos_m2m if datos.get(k) is not None}
+            if self.es_materia:
+                relaciones['semestre'] = datos.get('semestre')
+            try:
+                obj = self.ModelClass(**atributos)
+                obj.full_clean(exclude=self.campos_fk, validate_unique=False, validate_constraints=False)
+            except ValidationError as e:
+                self.resultado.omitir(idx, fila, f"Error de validación: {e}")
+                continue
+            except Exception as e:
+                self.resultado.omitir(idx, fila, f"Error inesperado: {e}")
+                continue
+            objetos.append((idx, fila, obj, relaciones))
+        return objetos
+
+    def preparar_actualizaciones(self, existentes):
+        """
+        Aplica a cada registro existente los valores de su fila y devuelve
+        [(obj, campos_modificados)]. Las celdas vacías conservan el valor
+        guardado; los registros sin cambios solo se cuentan.
+        """
+        actualizados = []
+        for idx, fila, datos, obj in existentes:
+            modificados = []
+            for campo in self.campos_actualizables:
+                valor = datos.get(campo)
+                if valor is None:
+                    continue
+                field = self.campos[campo]
+                if isinstance(field, ForeignKey):
+                    if getattr(obj, field.attname) != getattr(valor, field.target_field.attname):
+                        setattr(obj, campo, valor)
+                        modificados.append(campo)
+                    continue
+                try:
+                    valor = field.to_python(valor)
+                except ValidationError as e:
+                    self.resultado.omitir(idx, fila, f"Error de validación: {e}")
+                    modificados = None
+                    break
+                if getattr(obj, field.attname) != valor:
+                    setattr(obj, field.attname, valor)
+                    modificados.append(campo)
+
+            if modificados is None:
+                continue
+            if not modificados:
+                self.resultado.registros_sin_cambios += 1
+                continue
+            try:
+                obj.full_clean(exclude=self.campos_fk, validate_unique=False, validate_constraints=False)
+            except ValidationError as e:
+                self.resultado.omitir(idx, fila, f"Error de validación: {e}")
+                continue
+            actualizados.append((idx, fila, obj, modificados))
+        return actualizados
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def _opciones_bulk_create(self):
+        """
+        En modo actualizar, si la BD lo soporta, un registro insertado por otro
+        proceso entre la consulta de existentes y el INSERT se actualiza en
+        lugar de hacer fallar el lote (ON CONFLICT ... DO UPDATE).
+        """
+        if (self.modo == 'actualizar' and self.campos_identidad and self.campos_actualizables
+                and connection.features.supports_update_conflicts_with_target):
+            return {
+                'update_conflicts': True,
+                'unique_fields': list(self.campos_identidad),
+                'update_fields': self.campos_actualizables,
+            }
+        return {}
+
+    def escribir(self, objetos):
+        try:
+            with transaction.atomic():
+                audited_bulk_create(
+                    self.ModelClass, [obj for _, _, obj, _ in objetos], **self._opciones_bulk_create()
+                )
+                self.crear_relaciones(objetos)
+                self.indexar_busqueda([obj for _, _, obj, _ in objetos])
+                self.actualizar_agregados([(obj, None) for _, _, obj, _ in objetos])
+            self.resultado.registros_importados += len(objetos)
+        except DatabaseError as e:
+            logger.info(f"Lote de {len(objetos)} filas rechazado ({e}); reintentando fila por fila.")
+            for idx, fila, obj, relaciones in objetos:
+                obj.pk = None
+                obj._state.adding = True
+                try:
+                    with transaction.atomic():
+                        obj.save()
+                        self.crear_relaciones([(idx, fila, obj, relaciones)])
+                    self.resultado.registros_importados += 1
+                except Exception as e_fila:
+                    self.resultado.filas_invalidas.append((idx, fila, f"Error inesperado: {e_fila}"))
+                    logger.error(f"Fila {idx + 2} omitida por excepción inesperada", exc_info=True)
+
+    def escribir_actualizaciones(self, actualizados):
+        """``bulk_update`` con la unión de los campos modificados del lote."""
+        campos = sorted({campo for _, _, _, modificados in actualizados for campo in modificados})
+        try:
+            with transaction.atomic():
+                audited_bulk_update(self.ModelClass, [obj for _, _, obj, _ in actualizados], campos)
+                self.indexar_busqueda([obj for _, _, obj, _ in actualizados])
+                self.actualizar_agregados([(obj, modificados) for _, _, obj, modificados in actualizados])
+            self.resultado.registros_actualizados += len(actualizados)
+        except DatabaseError as e:
+            logger.info(f"Actualización de {len(actualizados)} registros rechazada ({e}); reintentando fila por fila.")
+            for idx, fila, obj, modificados in actualizados:
+                try:
+                    with transaction.atomic():
+                        obj.save(update_fields=modificados)
+                    self.resultado.registros_actualizados += 1
+                except Exception as e_fila:
+                    self.resultado.filas_invalidas.append((idx, fila, f"Error inesperado: {e_fila}"))
+                    logger.error(f"Fila {idx + 2} no actualizada por excepción inesperada", exc_info=True)
+
+    def indexar_busqueda(self, objetos):
+        """bulk_create/bulk_update no envían señales: el índice de búsqueda de alumnos se rehace aquí."""
+        if not self.es_alumno or not objetos:
+            return
+        from datos_academicos.busqueda import indexar_alumnos
+        indexar_alumnos(self.ModelClass.objects.filter(matricula__in=[obj.matricula for obj in objetos]))
+
+    def actualizar_agregados(self, objetos):
+        """
+        bulk_create/bulk_update tampoco envían las señales que mantienen el
+        promedio, los créditos y el resumen académico de los alumnos: se
+        recalculan aquí los de los alumnos afectados por el lote.
+        ``objetos`` es [(obj, campos_modificados)], con None en las altas.
+        """
+        from datos_academicos.agregados import recalcular_agregados
+        from datos_academicos.models import Alumno, Calificacion
+        from datos_academicos.resumen import descartar_resumenes
+
+        alumnos = set()
+        materias = []
+        for obj, modificados in objetos:
+            if self.es_calificacion:
+                alumnos.add(obj.alumno_id)
+                # Una calificación que cambia de alumno también deja de contar para el anterior
+                anterior = getattr(obj, '_valores_guardados', None)
+                if anterior:
+                    alumnos.add(anterior[0])
+            elif self.es_materia and modificados and CAMPOS_REGLAS_MATERIA & set(modificados):
+                materias.append(obj.pk)
+            elif self.es_alumno and modificados and 'carrera' in modificados:
+                alumnos.add(obj.pk)
+        if materias:
+            alumnos.update(
+                Calificacion.objects.filter(materia_id__in=materias).values_list('alumno_id', flat=True)
+            )
+        alumnos.discard(None)
+        if not alumnos:
+            return
+        afectados = Alumno.objects.filter(pk__in=alumnos)
+        recalcular_agregados(afectados)
+        descartar_resumenes(afectados)
+
+    def crear_relaciones(self, objetos):
+        """Crea en bloque las filas de las tablas intermedias M2M."""
+        if self.es_materia:
+            from datos_academicos import plan_curricular
+            from datos_academicos.models import MateriaCarrera
+            audited_bulk_create(MateriaCarrera, [
+                MateriaCarrera(materia=obj, carrera=relaciones['carreras'], semestre=relaciones['semestre'])
+                for _, _, obj, relaciones in objetos if relaciones.get('carreras')
+            ])
+            # bulk_create no envía señales
+            plan_curricular.invalidar()
+            return
+
+        for campo in self.campos_m2m:
+            field = self.campos[campo]
+            through = field.remote_field.through
+            if not through._meta.auto_created:
+                continue
+            origen = field.m2m_field_name()
+            destino = field.m2m_reverse_field_name()
+            through.objects.bulk_create([
+                through(**{origen: obj, destino: relaciones[campo]})
+                for _, _, obj, relaciones in objetos if relaciones.get(campo) is not None
+            ])
+
+    def procesar_materia_existente(self, idx, fila, datos, materia_existente=None):
+        """
+        Crea o actualiza la relación MateriaCarrera de una materia ya registrada.
+        ``materia_existente`` viene de la consulta del lote; si es None (clave
+        repetida en el archivo) se busca la materia recién creada.
+        """
+        from datos_academicos.models import MateriaCarrera
+        if materia_existente is None:
+            materia_existente = self.ModelClass.objects.filter(clave=datos.get('clave')).first()
+        if materia_existente is None:
+            self.resultado.filas_invalidas.append(
+                (idx, fila, f"Materia con clave {datos.get('clave')} no pudo registrarse")
+            )
+            return
+
+        if datos.get('carreras'):
+            carrera = datos['carreras']
+            semestre = datos.get('semestre')
+            materia_carrera, created = MateriaCarrera.objects.get_or_create(
+                materia=materia_existente,
+                carrera=carrera,
+                defaults={'semestre': semestre}
+            )
+            if not created and semestre is not None and materia_carrera.semestre != semestre:
+                materia_carrera.semestre = semestre
+                materia_carrera.save()
+                logger.info(f"Semestre actualizado para {materia_existente.clave} en {carrera}: {semestre}")
+
+            action = "creada" if created else "actualizada"
+            logger.info(f"Relación {action} para materia {materia_existente.clave} con carrera {carrera}")
+
+        # En modo actualizar la fila ya se contó como actualizada o sin cambios
+        if self.modo == 'omitir':
+            self.resultado.filas_invalidas.append(
+                (idx, fila, f"Materia con clave {datos.get('clave')} ya existe - relación procesada")
+            )
@@ -0,0 +1,174 @@
+"""
+Ingesta de libros completos de Excel (una o varias hojas, uno o varios libros).
+
+Cada hoja es independiente, así que se lee en un pool de procesos y se
+normaliza a ``HojaLeida``: encabezados limpios y filas con el número de fila
+de Excel, celdas vacías como None y textos sin espacios sobrantes. Las hojas
+se entregan en el proceso que llama conforme terminan; ahí se escribe en la
+base de datos con un solo escritor. Así, recargar los libros de todas las
+carreras tarda lo que la hoja más grande y no la suma de todas.
+
+Los workers no tocan Django: solo openpyxl.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import openpyxl
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Filas que se revisan al buscar la fila de encabezados
+MAX_FILAS_ENCABEZADO = 20
+
+
+def normalizar_encabezado(valor):
+    return str(valor).strip().upper() if valor is not None else ''
+
+
+def _normalizar_celda(valor):
+    if isinstance(valor, str):
+        valor = valor.strip()
+        return valor or None
+    return valor
+
+
+class HojaLeida:
+    """
+    Hoja normalizada al formato común de filas. ``filas`` es una lista de
+    (número de fila en Excel, [valores]) sin filas vacías.
+    """
+
+    def __init__(self, libro, hoja, encabezados, filas, fila_encabezado):
+        self.libro = libro
+        self.hoja = hoja
+        self.encabezados = encabezados
+        self.filas = filas
+        self.fila_encabezado = fila_encabezado
+
+    def __repr__(self):
+        return f"<HojaLeida {os.path.basename(self.libro)}:{self.hoja} ({len(self.filas)} filas)>"
+
+    def columna(self, *opciones):
+        """Índice de la primera columna cuyo encabezado coincide con alguna opción, o None."""
+        normalizados = [normalizar_encabezado(e) for e in self.encabezados]
+        for opcion in opciones:
+            opcion = normalizar_encabezado(opcion)
+            if opcion in normalizados:
+                return normalizados.index(opcion)
+        return None
+
+    def registros(self):
+        """Filas como diccionarios encabezado -> valor."""
+        for numero, valores in self.filas:
+            yield numero, dict(zip(self.encabezados, valores))
+
+    def como_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame([valores for _, valores in self.filas], columns=self.encabezados, dtype=object)
+
+
+def _encabezados_unicos(fila):
+    """Nombres de columna como los deja pandas: 'Unnamed: i' y sufijos '.n' en repetidos."""
+    vistos = {}
+    encabezados = []
+    for i, valor in enumerate(fila):
+        nombre = str(valor).strip() if valor is not None and str(valor).strip() else f"Unnamed: {i}"
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre = f"{nombre}.{vistos[nombre]}"
+        else:
+            vistos[nombre] = 0
+        encabezados.append(nombre)
+    return encabezados
+
+
+def leer_hoja(ruta, hoja, encabezados_requeridos=None):
+    """
+    Lee una hoja en modo read-only y la normaliza. Con
+    ``encabezados_requeridos`` la fila de encabezados es la primera (de las
+    primeras ``MAX_FILAS_ENCABEZADO``) que los contiene todos, y si ninguna
+    los contiene devuelve None; sin ellos es la primera fila no vacía.
+    """
+    requeridos = {normalizar_encabezado(e) for e in encabezados_requeridos or ()}
+    wb = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        ws = wb[hoja]
+        encabezados = None
+        fila_encabezado = None
+        filas = []
+        for numero, valores in enumerate(ws.iter_rows(values_only=True), start=1):
+            valores = [_normalizar_celda(v) for v in valores]
+            if not any(v is not None for v in valores):
+                continue
+            if encabezados is None:
+                if requeridos and not requeridos <= {normalizar_encabezado(v) for v in valores}:
+                    if numero >= MAX_FILAS_ENCABEZADO:
+                        return None
+                    continue
+                encabezados = _encabezados_unicos(valores)
+                fila_encabezado = numero
+                continue
+            ancho = len(encabezados)
+            filas.append((numero, (valores + [None] * (ancho - len(valores)))[:ancho]))
+    finally:
+        wb.close()
+
+    if encabezados is None:
+        return None
+    return HojaLeida(ruta, hoja, encabezados, filas, fila_encabezado)
+
+
+def nombres_hojas(ruta):
+    wb = openpyxl.load_workbook(ruta, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def procesos_configurados():
+    """Tamaño del pool (EXCEL_IMPORTER_PROCESOS); por defecto, uno por CPU."""
+    return getattr(settings, 'EXCEL_IMPORTER_PROCESOS', None) or os.cpu_count() or 1
+
+
+def iterar_hojas(rutas, encabezados_requeridos=None, procesos=None, en_orden=False):
+    """
+    Genera las ``HojaLeida`` de todas las hojas de ``rutas`` conforme se
+    terminan de leer, o en el orden de los libros si ``en_orden`` (para
+    escritores que dependen de hojas anteriores; la lectura sigue siendo
+    paralela). Las hojas sin los encabezados requeridos se descartan. Con un
+    solo proceso o una sola hoja se lee en el proceso actual.
+    """
+    tareas = [(ruta, hoja) for ruta in rutas for hoja in nombres_hojas(ruta)]
+    procesos = min(procesos or procesos_configurados(), len(tareas))
+
+    if procesos <= 1:
+        for ruta, hoja in tareas:
+            try:
+                leida = leer_hoja(ruta, hoja, encabezados_requeridos)
+            except Exception:
+                logger.error(f"No se pudo leer la hoja '{hoja}' de {os.path.basename(ruta)}", exc_info=True)
+                continue
+            if leida is not None:
+                yield leida
+        return
+
+    # 'spawn': los workers no heredan conexiones a la BD ni hilos del proceso web
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+        futuros = {
+            pool.submit(leer_hoja, ruta, hoja, encabezados_requeridos): (ruta, hoja)
+            for ruta, hoja in tareas
+        }
+        for futuro in (list(futuros) if en_orden else as_completed(futuros)):
+            ruta, hoja = futuros[futuro]
+            try:
+                leida = futuro.result()
+            except Exception:
+                logger.error(f"No se pudo leer la hoja '{hoja}' de {os.path.basename(ruta)}", exc_info=True)
+                continue
+            if leida is not None:
+                yield leida
@@ -0,0 +1,122 @@
+"""
+Lectura de rangos de Excel en modo streaming.
+
+El libro se abre con ``read_only=True`` y las filas se recorren con
+``iter_rows(values_only=True)``, así que nunca se carga la hoja completa.
+Las celdas combinadas se leen del XML de la hoja (el modo read-only de
+openpyxl no las expone) y solo se expanden las que cruzan el rango pedido.
+"""
+from collections import defaultdict
+from xml.etree.ElementTree import iterparse
+
+import openpyxl
+from openpyxl.utils import range_boundaries
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_MERGE_CELL = _NS + 'mergeCell'
+_MERGE_CELLS = _NS + 'mergeCells'
+_SHEET_DATA = _NS + 'sheetData'
+_ROW = _NS + 'row'
+
+
+def _intersecta(limites, min_col, min_row, max_col, max_row):
+    minc, minr, maxc, maxr = limites
+    return minc <= max_col and maxc >= min_col and minr <= max_row and maxr >= min_row
+
+
+def _fuente_xml(ws):
+    """
+    Función que abre el XML de la hoja, o None. ``_get_source`` es interno de
+    openpyxl (versión fijada en requirements.txt).
+    """
+    return getattr(ws, '_get_source', None)
+
+
+def _rangos_combinados(ruta_archivo, ws, min_col, min_row, max_col, max_row):
+    """Límites de los rangos combinados de la hoja que intersectan el rango pedido."""
+    limites = (min_col, min_row, max_col, max_row)
+    abrir_fuente = _fuente_xml(ws)
+    if abrir_fuente is None:
+        # Sin acceso al XML: las combinadas se leen abriendo el libro en modo normal
+        wb = openpyxl.load_workbook(ruta_archivo)
+        try:
+            return [
+                r.bounds for r in wb[ws.title].merged_cells.ranges
+                if _intersecta(r.bounds, *limites)
+            ]
+        finally:
+            wb.close()
+
+    rangos = []
+    datos = None
+    with abrir_fuente() as fuente:
+        for evento, elem in iterparse(fuente, events=('start', 'end')):
+            if evento == 'start':
+                if elem.tag == _SHEET_DATA:
+                    datos = elem
+                continue
+            if elem.tag == _MERGE_CELL:
+                rango = range_boundaries(elem.get('ref'))
+                if _intersecta(rango, *limites):
+                    rangos.append(rango)
+            elif elem.tag == _MERGE_CELLS:
+                # Solo hay un <mergeCells> por hoja; lo que sigue no interesa
+                break
+            elif elem.tag == _ROW and datos is not None:
+                # Las filas ya leídas no se conservan en memoria
+                datos.clear()
+            elem.clear()
+    return rangos
+
+
+def iterar_rango_excel(ruta_archivo, nombre_hoja, rango_excel):
+    """
+    Genera las filas (listas de valores) de ``rango_excel``. Una celda
+    cubierta por un rango combinado toma el valor de la celda superior
+    izquierda del rango, aunque esa celda quede fuera del rango pedido.
+    """
+    wb = openpyxl.load_workbook(ruta_archivo, data_only=True, read_only=True)
+    try:
+        if nombre_hoja not in wb.sheetnames:
+            raise ValueError(f"La hoja '{nombre_hoja}' no existe en el archivo.")
+        ws = wb[nombre_hoja]
+
+        min_col, min_row, max_col, max_row = range_boundaries(rango_excel)
+        rangos = _rangos_combinados(ruta_archivo, ws, min_col, min_row, max_col, max_row)
+
+        # fila -> [(columna inicial, columna final, ancla)] solo dentro del rango pedido
+        cubiertas = defaultdict(list)
+        anclas = {}
+        anclas_por_fila = defaultdict(list)
+        for minc, minr, maxc, maxr in rangos:
+            anclas[(minr, minc)] = None
+            anclas_por_fila[minr].append(minc)
+            for r in range(max(minr, min_row), min(maxr, max_row) + 1):
+                cubiertas[r].append((max(minc, min_col), min(maxc, max_col), (minr, minc)))
+
+        # Se empieza a leer antes si alguna ancla queda arriba o a la izquierda del rango
+        fila_inicio = min([min_row] + [r for r, _ in anclas])
+        col_inicio = min([min_col] + [c for _, c in anclas])
+        ancho = max_col - col_inicio + 1
+
+        for r, valores in enumerate(
+            ws.iter_rows(min_row=fila_inicio, max_row=max_row, min_col=col_inicio,
+                         max_col=max_col, values_only=True),
+            start=fila_inicio,
+        ):
+            valores = list(valores) + [None] * (ancho - len(valores))
+            for c in anclas_por_fila.get(r, ()):
+                anclas[(r, c)] = valores[c - col_inicio]
+            if r < min_row:
+                continue
+            for c_ini, c_fin, ancla in cubiertas.get(r, ()):
+                for c in range(c_ini, c_fin + 1):
+                    valores[c - col_inicio] = anclas[ancla]
+            yield valores[min_col - col_inicio:]
+    finally:
+        wb.close()
+
+
+def leer_rango_excel(ruta_archivo, nombre_hoja, rango_excel):
+    """Versión en lista de ``iterar_rango_excel`` para rangos pequeños (vista previa)."""
+    return list(iterar_rango_excel(ruta_archivo, nombre_hoja, rango_excel))
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from excel_importer.models import ImportacionExcel
+from excel_importer.tareas import procesar_importacion, trabajos_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Procesa las importaciones de Excel en cola (y reanuda las abandonadas por un worker caído)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina, en lugar de quedarse esperando nuevos',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=5,
+            help='Segundos entre revisiones de la cola (por defecto: 5)',
+        )
+        parser.add_argument(
+            '--reintentar',
+            type=int,
+            metavar='ID',
+            help='Vuelve a encolar una importación fallida; continúa desde su último lote confirmado',
+        )
+
+    def handle(self, *args, **options):
+        if options.get('reintentar'):
+            actualizadas = ImportacionExcel.objects.filter(
+                pk=options['reintentar'], estado='fallida'
+            ).update(estado='en_cola', error='', fecha_fin=None)
+            if not actualizadas:
+                raise CommandError(f"No existe una importación fallida con id {options['reintentar']}")
+            self.stdout.write(f"Importación {options['reintentar']} encolada de nuevo")
+
+        while True:
+            procesadas = 0
+            for importacion_id in list(trabajos_pendientes().values_list('pk', flat=True)):
+                importacion = procesar_importacion(importacion_id)
+                if importacion is None:
+                    continue
+                procesadas += 1
+                estilo = self.style.SUCCESS if importacion.estado == 'completada' else self.style.ERROR
+                self.stdout.write(estilo(
+                    f"Importación {importacion.pk}: {importacion.get_estado_display()} - "
+                    f"{importacion.registros_importados} creados, {importacion.registros_actualizados} actualizados, "
+                    f"{importacion.registros_sin_cambios} sin cambios, {importacion.filas_fallidas} omitidas"
+                ))
+
+            if options['una_vez']:
+                self.stdout.write(f"Trabajos procesados: {procesadas}")
+                return
+            if not procesadas:
+                time.sleep(options['intervalo'])
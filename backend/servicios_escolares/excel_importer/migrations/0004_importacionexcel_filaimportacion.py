@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('excel_importer', '0003_remove_modeloautorizado_app_label_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacionExcel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(max_length=500)),
+                ('hoja', models.CharField(max_length=100)),
+                ('rango', models.CharField(max_length=50)),
+                ('encabezados', models.JSONField(default=list)),
+                ('total_filas', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('modelo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='importaciones', to='excel_importer.modeloautorizado')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Importación de Excel',
+                'verbose_name_plural': 'Importaciones de Excel',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FilaImportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveIntegerField(help_text='Índice de la fila dentro del rango (sin encabezados)')),
+                ('datos', models.JSONField()),
+                ('importacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='filas', to='excel_importer.importacionexcel')),
+            ],
+            options={
+                'verbose_name': 'Fila de importación',
+                'verbose_name_plural': 'Filas de importación',
+                'ordering': ['importacion', 'numero'],
+                'unique_together': {('importacion', 'numero')},
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('excel_importer', '0004_importacionexcel_filaimportacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filaimportacion',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='estado',
+            field=models.CharField(choices=[('preparada', 'Preparada'), ('en_cola', 'En cola'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='preparada', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='fecha_fin',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='fecha_inicio',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='filas_fallidas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='filas_procesadas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='mapeo',
+            field=models.JSONField(blank=True, default=dict, help_text='Campo del modelo -> índice de columna'),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='registros_importados',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='resumen',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='siguiente_fila',
+            field=models.PositiveIntegerField(default=0, help_text='Primera fila no confirmada; permite reanudar'),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='tamano_lote',
+            field=models.PositiveIntegerField(default=500),
+        ),
+        migrations.AddIndex(
+            model_name='importacionexcel',
+            index=models.Index(fields=['estado', 'fecha_actualizacion'], name='excel_impor_estado_6123c6_idx'),
+        ),
+    ]
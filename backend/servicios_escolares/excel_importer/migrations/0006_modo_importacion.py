@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('excel_importer', '0005_trabajo_importacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='modo',
+            field=models.CharField(choices=[('omitir', 'Omitir registros existentes'), ('actualizar', 'Actualizar registros existentes')], default='omitir', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='registros_actualizados',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='registros_sin_cambios',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='simulacion',
+            field=models.BooleanField(default=False, help_text='Calcula los conteos sin escribir en la base de datos'),
+        ),
+    ]
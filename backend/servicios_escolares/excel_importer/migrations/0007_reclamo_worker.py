@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('excel_importer', '0006_modo_importacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='token_worker',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='importacionexcel',
+            name='vence_reclamo',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='importacionexcel',
+            index=models.Index(fields=['estado', 'vence_reclamo'], name='excel_impor_estado_707aad_idx'),
+        ),
+    ]
@@ -1,5 +1,9 @@
+from datetime import timedelta
+
 from django.db import models
 from django.apps import apps
+from django.contrib.auth.models import User
+from django.utils import timezone
 
 class ModeloAutorizado(models.Model):
     nombre_app = models.CharField(max_length=100, default=None, blank=True)
@@ -11,3 +15,155 @@ class ModeloAutorizado(models.Model):
 
     def get_model_class(self):
         return apps.get_model(self.nombre_app, self.nombre_modelo)
+
+
+class ImportacionExcel(models.Model):
+    """
+    Importación de un archivo: referencia al archivo subido, sus filas en
+    staging y el avance del trabajo que las importa por lotes.
+    """
+    ESTADOS = [
+        ('preparada', 'Preparada'),
+        ('en_cola', 'En cola'),
+        ('procesando', 'Procesando'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+    MODOS = [
+        ('omitir', 'Omitir registros existentes'),
+        ('actualizar', 'Actualizar registros existentes'),
+    ]
+
+    modelo = models.ForeignKey(ModeloAutorizado, on_delete=models.CASCADE, related_name='importaciones')
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    ruta = models.CharField(max_length=500)
+    hoja = models.CharField(max_length=100)
+    rango = models.CharField(max_length=50)
+    encabezados = models.JSONField(default=list)
+    total_filas = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    # Trabajo de importación
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='preparada')
+    mapeo = models.JSONField(default=dict, blank=True, help_text="Campo del modelo -> índice de columna")
+    tamano_lote = models.PositiveIntegerField(default=500)
+    modo = models.CharField(max_length=20, choices=MODOS, default='omitir')
+    simulacion = models.BooleanField(default=False, help_text="Calcula los conteos sin escribir en la base de datos")
+    siguiente_fila = models.PositiveIntegerField(default=0, help_text="Primera fila no confirmada; permite reanudar")
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    filas_fallidas = models.PositiveIntegerField(default=0)
+    registros_importados = models.PositiveIntegerField(default=0)
+    registros_actualizados = models.PositiveIntegerField(default=0)
+    registros_sin_cambios = models.PositiveIntegerField(default=0)
+    resumen = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+    # Reclamo del worker que procesa el trabajo: solo él confirma lotes, y lo renueva con cada uno
+    token_worker = models.CharField(max_length=32, blank=True)
+    vence_reclamo = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Importación de Excel"
+        verbose_name_plural = "Importaciones de Excel"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_actualizacion']),
+            models.Index(fields=['estado', 'vence_reclamo']),
+        ]
+
+    def __str__(self):
+        return f"Importación {self.pk} de {self.modelo} ({self.total_filas} filas)"
+
+    @property
+    def terminada(self):
+        return self.estado in ('completada', 'fallida')
+
+    @property
+    def sin_worker(self):
+        """En cola más tiempo que la vigencia de un reclamo: ningún worker la ha tomado."""
+        from .tareas import MINUTOS_TRABAJO_ABANDONADO
+
+        limite = timezone.now() - timedelta(minutes=MINUTOS_TRABAJO_ABANDONADO)
+        return self.estado == 'en_cola' and self.fecha_actualizacion is not None and self.fecha_actualizacion < limite
+
+    def progreso(self):
+        """Avance del trabajo para el endpoint de sondeo (JSON)."""
+        porcentaje = round(self.filas_procesadas * 100 / self.total_filas, 1) if self.total_filas else 100.0
+        eta = None
+        if self.estado == 'procesando' and self.fecha_inicio and self.filas_procesadas:
+            transcurrido = (timezone.now() - self.fecha_inicio).total_seconds()
+            restantes = self.total_filas - self.filas_procesadas
+            eta = round(transcurrido / self.filas_procesadas * restantes)
+        return {
+            'id': self.pk,
+            'estado': self.estado,
+            'estado_display': self.get_estado_display(),
+            'total_filas': self.total_filas,
+            'filas_procesadas': self.filas_procesadas,
+            'filas_fallidas': self.filas_fallidas,
+            'registros_importados': self.registros_importados,
+            'registros_actualizados': self.registros_actualizados,
+            'registros_sin_cambios': self.registros_sin_cambios,
+            'modo': self.modo,
+            'simulacion': self.simulacion,
+            'porcentaje': porcentaje,
+            'eta_segundos': eta,
+            'terminada': self.terminada,
+            'sin_worker': self.sin_worker,
+            'resumen': self.resumen,
+            'error': self.error,
+        }
+
+    def reiniciar_trabajo(self):
+        """Deja el trabajo listo para procesarse desde la primera fila (p. ej. tras una simulación)."""
+        self.filas.exclude(error='').update(error='')
+        self.siguiente_fila = 0
+        self.filas_procesadas = 0
+        self.filas_fallidas = 0
+        self.registros_importados = 0
+        self.registros_actualizados = 0
+        self.registros_sin_cambios = 0
+        self.resumen = []
+        self.error = ''
+        self.fecha_inicio = None
+        self.fecha_fin = None
+
+    def agregar_filas(self, filas, tamano_lote=1000):
+        """Guarda en staging las filas de un iterable, en bloques de ``tamano_lote``."""
+        from .utils import json_safe
+
+        lote = []
+        numero = self.total_filas
+        for fila in filas:
+            lote.append(FilaImportacion(importacion=self, numero=numero, datos=[json_safe(v) for v in fila]))
+            numero += 1
+            if len(lote) >= tamano_lote:
+                FilaImportacion.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            FilaImportacion.objects.bulk_create(lote)
+        self.total_filas = numero
+        self.save(update_fields=['total_filas'])
+
+    def vista_previa(self, limite=5):
+        """Primeras ``limite`` filas; solo se leen esas de la tabla de staging."""
+        return list(self.filas.order_by('numero').values_list('datos', flat=True)[:limite])
+
+
+class FilaImportacion(models.Model):
+    """Fila de Excel ya serializada a JSON, pendiente de importar."""
+    importacion = models.ForeignKey(ImportacionExcel, on_delete=models.CASCADE, related_name='filas')
+    numero = models.PositiveIntegerField(help_text="Índice de la fila dentro del rango (sin encabezados)")
+    datos = models.JSONField()
+    error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Fila de importación"
+        verbose_name_plural = "Filas de importación"
+        unique_together = ('importacion', 'numero')
+        ordering = ['importacion', 'numero']
+
+    def __str__(self):
+        return f"Fila {self.numero + 2} de importación {self.importacion_id}"
@@ -0,0 +1,214 @@
+"""
+Trabajos de importación en segundo plano.
+
+Una importación se encola desde la vista de mapeo y la procesa un worker:
+el comando ``procesar_importaciones`` o, si ``EXCEL_IMPORTER_WORKER = 'hilo'``,
+un pool de hilos dentro del mismo proceso. Cada lote se confirma en una
+transacción junto con el avance del trabajo (``siguiente_fila``), de modo
+que si el worker muere el trabajo se reanuda desde el último lote
+confirmado.
+
+Al reclamar un trabajo el worker guarda un token y un vencimiento
+(``vence_reclamo``) que renueva con cada lote. Si un lote tarda más que eso,
+otro worker puede reclamar el trabajo; el primero ya no puede confirmar su
+avance (el UPDATE filtra por su token), revierte ese lote y se retira.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from audit.context import enviar_con_contexto
+
+from .importador import ImportadorLotes, ResultadoImportacion
+from .models import ImportacionExcel, FilaImportacion
+
+logger = logging.getLogger(__name__)
+
+# Un trabajo 'procesando' sin avance en este tiempo se considera abandonado
+# (vigencia del reclamo del worker, renovada con cada lote)
+MINUTOS_TRABAJO_ABANDONADO = 10
+
+
+class ReclamoPerdido(Exception):
+    """Otro worker reclamó el trabajo mientras este procesaba un lote."""
+
+_executor = None
+
+
+def _worker_en_hilo():
+    return getattr(settings, 'EXCEL_IMPORTER_WORKER', 'comando') == 'hilo'
+
+
+def _obtener_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'EXCEL_IMPORTER_HILOS', 1),
+            thread_name_prefix='excel_importer',
+        )
+    return _executor
+
+
+def encolar_importacion(importacion, col_indices, tamano_lote, despachar=True, modo='omitir', simulacion=False):
+    """
+    Guarda el mapeo y las opciones y deja la importación lista para el
+    worker. Con ``despachar=False`` el llamador la procesa en línea.
+    """
+    importacion.mapeo = col_indices
+    importacion.tamano_lote = tamano_lote
+    importacion.modo = modo
+    importacion.simulacion = simulacion
+    importacion.estado = 'en_cola'
+    importacion.save(update_fields=[
+        'mapeo', 'tamano_lote', 'modo', 'simulacion', 'estado', 'fecha_actualizacion',
+    ])
+    if despachar and _worker_en_hilo():
+        # Lo que audite el hilo queda atribuido al request que encoló el trabajo
+        transaction.on_commit(lambda: enviar_con_contexto(_obtener_executor(), _procesar_en_hilo, importacion.pk))
+
+
+def _procesar_en_hilo(importacion_id):
+    try:
+        procesar_importacion(importacion_id)
+    finally:
+        close_old_connections()
+
+
+def _vencimiento_reclamo():
+    return timezone.now() + timedelta(minutes=MINUTOS_TRABAJO_ABANDONADO)
+
+
+def trabajos_pendientes():
+    """Trabajos en cola o abandonados por un worker cuyo reclamo venció."""
+    ahora = timezone.now()
+    limite = ahora - timedelta(minutes=MINUTOS_TRABAJO_ABANDONADO)
+    return ImportacionExcel.objects.filter(
+        Q(estado='en_cola')
+        | Q(estado='procesando', vence_reclamo__lt=ahora)
+        # Reclamados antes de que existiera vence_reclamo
+        | Q(estado='procesando', vence_reclamo__isnull=True, fecha_actualizacion__lt=limite)
+    ).order_by('fecha_creacion')
+
+
+def reclamar_importacion(importacion_id):
+    """
+    Marca el trabajo como 'procesando' con un token nuevo solo si nadie más
+    lo tiene (UPDATE condicional).
+    """
+    ahora = timezone.now()
+    token = uuid.uuid4().hex
+    reclamados = trabajos_pendientes().filter(pk=importacion_id).update(
+        estado='procesando', token_worker=token, vence_reclamo=_vencimiento_reclamo(), fecha_actualizacion=ahora,
+    )
+    if not reclamados:
+        return None
+    importacion = ImportacionExcel.objects.select_related('modelo').get(pk=importacion_id)
+    if importacion.fecha_inicio is None:
+        importacion.fecha_inicio = ahora
+        importacion.save(update_fields=['fecha_inicio'])
+    return importacion
+
+
+def _guardar_reclamada(importacion, campos):
+    """
+    ``save(update_fields=campos)`` que solo escribe si el trabajo sigue
+    reclamado con el token de este worker, y renueva el reclamo.
+    """
+    importacion.vence_reclamo = _vencimiento_reclamo()
+    importacion.fecha_actualizacion = timezone.now()
+    valores = {campo: getattr(importacion, campo) for campo in [*campos, 'vence_reclamo', 'fecha_actualizacion']}
+    guardados = ImportacionExcel.objects.filter(
+        pk=importacion.pk, token_worker=importacion.token_worker,
+    ).update(**valores)
+    if not guardados:
+        raise ReclamoPerdido(f"La importación {importacion.pk} fue reclamada por otro worker")
+
+
+def procesar_importacion(importacion_id):
+    """
+    Procesa un trabajo desde su ``siguiente_fila``. Devuelve la importación
+    o None si otro worker ya la estaba procesando o la reclamó a medio camino.
+    """
+    importacion = reclamar_importacion(importacion_id)
+    if importacion is None:
+        return None
+
+    try:
+        ModelClass = importacion.modelo.get_model_class()
+        importador = ImportadorLotes(
+            ModelClass, importacion.mapeo, tamano_lote=importacion.tamano_lote,
+            modo=importacion.modo, simulacion=importacion.simulacion,
+        )
+        while True:
+            # Cada lote se lee por rango de 'numero': no hay cursores abiertos entre commits
+            lote = list(
+                importacion.filas.filter(numero__gte=importacion.siguiente_fila)
+                .order_by('numero').values_list('numero', 'datos')[:importador.tamano_lote]
+            )
+            if not lote:
+                break
+            _confirmar_lote(importacion, importador, lote)
+
+        importacion.estado = 'completada'
+        importacion.resumen = importador.resolutor.resumen()
+        importacion.fecha_fin = timezone.now()
+        _guardar_reclamada(importacion, ['estado', 'resumen', 'fecha_fin'])
+        # Solo se conservan en staging las filas con error (para el reporte descargable);
+        # una simulación las conserva todas para poder ejecutarse después
+        if not importacion.simulacion:
+            importacion.filas.filter(error='').delete()
+        logger.info(
+            f"Importación {importacion.pk} completada{' (simulación)' if importacion.simulacion else ''}: "
+            f"{importacion.registros_importados} creados, {importacion.registros_actualizados} actualizados, "
+            f"{importacion.registros_sin_cambios} sin cambios, {importacion.filas_fallidas} omitidas."
+        )
+    except ReclamoPerdido:
+        # El lote en curso se revirtió; el trabajo sigue con el otro worker
+        logger.warning(f"Importación {importacion.pk} reclamada por otro worker; este la abandona", exc_info=True)
+        return None
+    except Exception as e:
+        logger.error(f"Importación {importacion.pk} fallida", exc_info=True)
+        importacion.estado = 'fallida'
+        importacion.error = str(e)
+        importacion.fecha_fin = timezone.now()
+        try:
+            _guardar_reclamada(importacion, ['estado', 'error', 'fecha_fin'])
+        except ReclamoPerdido:
+            logger.warning(f"Importación {importacion.pk} reclamada por otro worker; no se marca como fallida")
+            return None
+    return importacion
+
+
+def _confirmar_lote(importacion, importador, lote):
+    """
+    Escribe un lote y su avance en la misma transacción; si el reclamo del
+    worker se perdió, el lote se revierte (``ReclamoPerdido``).
+    """
+    importador.resultado = ResultadoImportacion()
+    with transaction.atomic():
+        importador.procesar_lote(lote)
+        resultado = importador.resultado
+
+        errores = {idx: razon for idx, _, razon in resultado.filas_invalidas}
+        if errores:
+            filas = list(importacion.filas.filter(numero__in=list(errores)))
+            for fila in filas:
+                fila.error = errores[fila.numero]
+            FilaImportacion.objects.bulk_update(filas, ['error'])
+
+        importacion.siguiente_fila = lote[-1][0] + 1
+        importacion.filas_procesadas += len(lote)
+        importacion.filas_fallidas += len(errores)
+        importacion.registros_importados += resultado.registros_importados
+        importacion.registros_actualizados += resultado.registros_actualizados
+        importacion.registros_sin_cambios += resultado.registros_sin_cambios
+        _guardar_reclamada(importacion, [
+            'siguiente_fila', 'filas_procesadas', 'filas_fallidas', 'registros_importados',
+            'registros_actualizados', 'registros_sin_cambios',
+        ])
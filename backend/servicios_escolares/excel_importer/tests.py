@@ -1,3 +1,466 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import openpyxl
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from audit.models import AuditLog
+from datos_academicos.models import (
+    Alumno, AlumnoResumenAcademico, Calificacion, Carrera, Materia, MateriaCarrera, PeriodoEscolar,
+)
+from .coercion import CoercionColumnas
+from .importador import ImportadorLotes
+from .ingesta import iterar_hojas
+from .lectura import iterar_rango_excel, leer_rango_excel
+from .utils import ResolutorRelaciones
+from .models import ModeloAutorizado, ImportacionExcel
+from .tareas import procesar_importacion, reclamar_importacion
+
+
+def _libro_excel(filas, hoja='Hoja1'):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = hoja
+    for fila in filas:
+        ws.append(fila)
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+class ImportadorLotesTestCase(TestCase):
+    def setUp(self):
+        self.carrera = Carrera.objects.create(clave='ISC', nombre='Sistemas')
+        Carrera.objects.create(clave='IND', nombre='Industrial')
+
+    def test_importa_en_lotes_y_reporta_filas_invalidas(self):
+        Materia.objects.create(clave='EXIST', nombre='Existente', creditos=4)
+        filas = [
+            ['NUEVA', 'Nueva materia', 4, 'Obligatoria'],
+            ['EXIST', 'Duplicada', 4, 'Obligatoria'],
+            ['', 'Sin clave', 4, 'Obligatoria'],
+            ['LOG', 'Logística', 'abc', 'Obligatoria'],
+            ['QUI', 'Química', 5, 'inexistente'],
+            ['MAT', 'Materiales', 5, 'especialidad'],
+        ]
+        col_indices = {'clave': 0, 'nombre': 1, 'creditos': 2, 'tipo': 3}
+        resultado = ImportadorLotes(Materia, col_indices, tamano_lote=2).importar(enumerate(filas))
+
+        self.assertEqual(resultado.registros_importados, 2)
+        self.assertEqual([idx for idx, _, _ in resultado.filas_invalidas], [1, 2, 3, 4])
+        self.assertTrue(Materia.objects.filter(clave='NUEVA').exists())
+        self.assertTrue(Materia.objects.filter(clave='MAT', tipo='Especialidad').exists())
+
+    def test_materia_repetida_crea_relacion_con_cada_carrera(self):
+        filas = [
+            ['MAT001', 'Cálculo', 5, 'ISC'],
+            ['MAT001', 'Cálculo', 5, 'IND'],
+        ]
+        col_indices = {'clave': 0, 'nombre': 1, 'creditos': 2, 'carreras': 3}
+        resultado = ImportadorLotes(Materia, col_indices).importar(enumerate(filas))
+
+        self.assertEqual(resultado.registros_importados, 1)
+        self.assertEqual(Materia.objects.count(), 1)
+        self.assertEqual(
+            set(MateriaCarrera.objects.values_list('carrera__clave', flat=True)),
+            {'ISC', 'IND'}
+        )
+
+    def test_duplicados_se_detectan_con_una_consulta_por_lote(self):
+        for i in range(4):
+            Materia.objects.create(clave=f'M{i}', nombre=f'Materia {i}', creditos=4)
+        filas = [[f'M{i}', f'Materia {i}', 4] for i in range(4)]
+        col_indices = {'clave': 0, 'nombre': 1, 'creditos': 2}
+
+        with self.assertNumQueries(1):
+            resultado = ImportadorLotes(Materia, col_indices).importar(enumerate(filas))
+        self.assertEqual(resultado.registros_importados, 0)
+        self.assertEqual(len(resultado.filas_invalidas), 4)
+
+    def test_modo_actualizar_y_simulacion(self):
+        Materia.objects.create(clave='A1', nombre='Álgebra', creditos=4)
+        Materia.objects.create(clave='B1', nombre='Biología', creditos=4)
+        filas = [
+            ['A1', 'Álgebra lineal', 5],
+            ['B1', 'Biología', 4],
+            ['C1', 'Cálculo', 5],
+        ]
+        col_indices = {'clave': 0, 'nombre': 1, 'creditos': 2}
+
+        simulado = ImportadorLotes(Materia, col_indices, modo='actualizar', simulacion=True).importar(enumerate(filas))
+        self.assertEqual(
+            (simulado.registros_importados, simulado.registros_actualizados, simulado.registros_sin_cambios),
+            (1, 1, 1)
+        )
+        self.assertEqual(Materia.objects.count(), 2)
+        self.assertEqual(Materia.objects.get(clave='A1').nombre, 'Álgebra')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = ImportadorLotes(Materia, col_indices, modo='actualizar').importar(enumerate(filas))
+        self.assertEqual(
+            (resultado.registros_importados, resultado.registros_actualizados, resultado.registros_sin_cambios),
+            (1, 1, 1)
+        )
+        self.assertEqual(resultado.filas_invalidas, [])
+        a1 = Materia.objects.get(clave='A1')
+        self.assertEqual((a1.nombre, a1.creditos), ('Álgebra lineal', 5))
+        self.assertTrue(Materia.objects.filter(clave='C1').exists())
+        # La escritura en bloque queda en la bitácora
+        self.assertEqual(
+            AuditLog.objects.filter(model_name='materia', object_id=str(a1.pk), action='update').get().changes,
+            {'creditos': {'old': 4, 'new': 5}, 'nombre': {'old': 'Álgebra', 'new': 'Álgebra lineal'}},
+        )
+        self.assertTrue(AuditLog.objects.filter(model_name='materia', action='create', extra__bulk='bulk_create').exists())
+
+    def test_escribir_calificaciones_recalcula_agregados_del_alumno(self):
+        calculo = Materia.objects.create(clave='CAL', nombre='Cálculo', creditos=5)
+        fisica = Materia.objects.create(clave='FIS', nombre='Física', creditos=4)
+        for materia in (calculo, fisica):
+            MateriaCarrera.objects.create(materia=materia, carrera=self.carrera, semestre=1)
+        alumno = Alumno.objects.create(matricula='20240100', nombre='Renata', carrera=self.carrera)
+        AlumnoResumenAcademico.objects.create(alumno=alumno)
+        periodo = PeriodoEscolar.objects.create(ciclo='Enero-Junio', año=2024)
+        # El periodo escolar no se puede resolver desde una celda: se escriben las instancias ya validadas
+        importador = ImportadorLotes(Calificacion, {'alumno': 0, 'materia': 1, 'calificacion': 2}, modo='actualizar')
+
+        importador.escribir([
+            (i, [], Calificacion(alumno=alumno, materia=materia, periodo_escolar=periodo, calificacion=valor), {})
+            for i, (materia, valor) in enumerate([(calculo, 9), (fisica, 5)])
+        ])
+        alumno.refresh_from_db()
+        self.assertEqual(alumno.promedio, Decimal('7.00'))
+        self.assertEqual((alumno.materias_promediadas, alumno.creditos_aprobados), (2, 5))
+        self.assertFalse(AlumnoResumenAcademico.objects.filter(alumno=alumno).exists())
+
+        existente = Calificacion.objects.get(alumno=alumno, materia=fisica)
+        existente.calificacion = Decimal('8')
+        importador.escribir_actualizaciones([(0, [], existente, ['calificacion'])])
+        alumno.refresh_from_db()
+        self.assertEqual(alumno.promedio, Decimal('8.50'))
+        self.assertEqual(alumno.creditos_aprobados, 9)
+
+        # Cambiar las reglas de la materia también recalcula a sus alumnos
+        ImportadorLotes(Materia, {'clave': 0, 'creditos': 1}, modo='actualizar').importar(enumerate([['CAL', 6]]))
+        alumno.refresh_from_db()
+        self.assertEqual(alumno.creditos_aprobados, 10)
+
+
+class ImportarModeloViewTestCase(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.user = User.objects.create_user('importador', password='x')
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.modelo = ModeloAutorizado.objects.create(nombre_app='datos_academicos', nombre_modelo='Materia')
+        self.url = reverse('importar_modelo', args=[self.modelo.pk])
+
+    def test_subida_usa_staging_y_no_la_sesion(self):
+        contenido = _libro_excel([
+            ['Clave', 'Nombre', 'Creditos'],
+            ['A1', 'Álgebra', 5],
+            ['B2', 'Biología', 4],
+        ])
+        with override_settings(MEDIA_ROOT=self.media):
+            archivo = SimpleUploadedFile('materias.xlsx', contenido)
+            respuesta = self.client.post(self.url, {
+                'subir_excel': '1', 'archivo': archivo, 'hoja': 'Hoja1', 'rango': 'A1:C3',
+            })
+        self.assertEqual(respuesta.status_code, 200)
+        importacion = ImportacionExcel.objects.get()
+        self.assertEqual(importacion.total_filas, 2)
+        self.assertEqual(importacion.encabezados, ['Clave', 'Nombre', 'Creditos'])
+        self.assertNotIn('datos_importacion', self.client.session)
+
+        respuesta = self.client.post(self.url, {
+            'importar_datos': '1', 'importacion_id': importacion.pk,
+            'clave': 'Clave', 'nombre': 'Nombre', 'creditos': 'Creditos',
+        })
+        importacion.refresh_from_db()
+        self.assertRedirects(respuesta, reverse('estado_importacion', args=[importacion.pk]))
+        self.assertEqual(importacion.estado, 'completada')
+        self.assertEqual(set(Materia.objects.values_list('clave', flat=True)), {'A1', 'B2'})
+        self.assertFalse(importacion.filas.exists())
+
+    def _subir(self, filas, rango):
+        with override_settings(MEDIA_ROOT=self.media):
+            archivo = SimpleUploadedFile('materias.xlsx', _libro_excel(filas))
+            self.client.post(self.url, {
+                'subir_excel': '1', 'archivo': archivo, 'hoja': 'Hoja1', 'rango': rango,
+            })
+        return ImportacionExcel.objects.latest('pk')
+
+    @override_settings(EXCEL_IMPORTER_FILAS_SINCRONAS=0, EXCEL_IMPORTER_TAMANO_LOTE=2)
+    def test_importacion_en_segundo_plano_con_progreso_y_reporte(self):
+        importacion = self._subir([
+            ['Clave', 'Nombre', 'Creditos'],
+            ['A1', 'Álgebra', 5],
+            ['B2', 'Biología', 'x'],
+            ['C3', 'Cálculo', 4],
+        ], 'A1:C4')
+        self.client.post(self.url, {
+            'importar_datos': '1', 'importacion_id': importacion.pk,
+            'clave': 'Clave', 'nombre': 'Nombre', 'creditos': 'Creditos',
+        })
+        importacion.refresh_from_db()
+        self.assertEqual(importacion.estado, 'en_cola')
+        self.assertFalse(Materia.objects.exists())
+        self.assertFalse(importacion.progreso()['sin_worker'])
+        # Sin worker que la reclame, la página de estado lo avisa pasado el plazo del reclamo
+        ImportacionExcel.objects.filter(pk=importacion.pk).update(
+            fecha_actualizacion=timezone.now() - timedelta(hours=1)
+        )
+        respuesta = self.client.get(reverse('estado_importacion', args=[importacion.pk]))
+        self.assertTrue(respuesta.context['progreso']['sin_worker'])
+        self.assertContains(respuesta, '<div class="alert alert-warning" id="avisoSinWorker">')
+
+        call_command('procesar_importaciones', '--una-vez', stdout=StringIO())
+
+        progreso = self.client.get(reverse('progreso_importacion', args=[importacion.pk])).json()
+        self.assertEqual(progreso['estado'], 'completada')
+        self.assertEqual(progreso['filas_procesadas'], 3)
+        self.assertEqual(progreso['registros_importados'], 2)
+        self.assertEqual(progreso['filas_fallidas'], 1)
+
+        reporte = self.client.get(reverse('errores_importacion', args=[importacion.pk]))
+        lineas = reporte.content.decode().splitlines()
+        self.assertEqual(len(lineas), 2)
+        self.assertTrue(lineas[1].startswith('3,'))
+
+    def test_simulacion_y_ejecucion_posterior(self):
+        Materia.objects.create(clave='A1', nombre='Álgebra', creditos=4)
+        importacion = self._subir([
+            ['Clave', 'Nombre', 'Creditos'],
+            ['A1', 'Álgebra lineal', 4],
+            ['B2', 'Biología', 4],
+        ], 'A1:C3')
+        self.client.post(self.url, {
+            'importar_datos': '1', 'importacion_id': importacion.pk,
+            'clave': 'Clave', 'nombre': 'Nombre', 'creditos': 'Creditos',
+            'opciones-modo': 'actualizar', 'opciones-simulacion': 'on',
+        })
+        importacion.refresh_from_db()
+        self.assertTrue(importacion.simulacion)
+        self.assertEqual((importacion.registros_importados, importacion.registros_actualizados), (1, 1))
+        self.assertEqual(Materia.objects.count(), 1)
+        self.assertEqual(importacion.filas.count(), 2)
+
+        self.client.post(reverse('ejecutar_importacion', args=[importacion.pk]))
+        importacion.refresh_from_db()
+        self.assertFalse(importacion.simulacion)
+        self.assertEqual(importacion.estado, 'completada')
+        self.assertEqual((importacion.registros_importados, importacion.registros_actualizados), (1, 1))
+        self.assertEqual(Materia.objects.get(clave='A1').nombre, 'Álgebra lineal')
+        self.assertTrue(Materia.objects.filter(clave='B2').exists())
+
+    def test_reanuda_desde_el_ultimo_lote_confirmado(self):
+        importacion = self._subir([
+            ['Clave', 'Nombre', 'Creditos'],
+            ['A1', 'Álgebra', 5],
+            ['B2', 'Biología', 4],
+        ], 'A1:C3')
+        # Simula un worker que murió tras confirmar la primera fila
+        ImportacionExcel.objects.filter(pk=importacion.pk).update(
+            estado='procesando', mapeo={'clave': 0, 'nombre': 1, 'creditos': 2},
+            siguiente_fila=1, filas_procesadas=1, registros_importados=1,
+            fecha_actualizacion=timezone.now() - timedelta(hours=1),
+        )
+        importacion = procesar_importacion(importacion.pk)
+
+        self.assertEqual(importacion.estado, 'completada')
+        self.assertEqual(list(Materia.objects.values_list('clave', flat=True)), ['B2'])
+        self.assertEqual(importacion.filas_procesadas, 2)
+        self.assertEqual(importacion.registros_importados, 2)
+
+    def test_worker_que_pierde_el_reclamo_revierte_su_lote(self):
+        importacion = self._subir([
+            ['Clave', 'Nombre', 'Creditos'],
+            ['A1', 'Álgebra', 5],
+        ], 'A1:C2')
+        ImportacionExcel.objects.filter(pk=importacion.pk).update(
+            estado='en_cola', mapeo={'clave': 0, 'nombre': 1, 'creditos': 2},
+        )
+        procesar_lote = ImportadorLotes.procesar_lote
+
+        def lote_lento(importador, lote):
+            procesar_lote(importador, lote)
+            # Mientras tanto el reclamo venció y otro worker tomó el trabajo
+            ImportacionExcel.objects.filter(pk=importacion.pk).update(
+                vence_reclamo=timezone.now() - timedelta(minutes=1),
+            )
+            self.assertTrue(reclamar_importacion(importacion.pk))
+
+        with mock.patch.object(ImportadorLotes, 'procesar_lote', lote_lento):
+            with self.assertLogs('excel_importer.tareas', 'WARNING'):
+                self.assertIsNone(procesar_importacion(importacion.pk))
+
+        self.assertFalse(Materia.objects.exists())
+        importacion.refresh_from_db()
+        self.assertEqual((importacion.estado, importacion.siguiente_fila), ('procesando', 0))
+
+
+class ResolutorRelacionesTestCase(TestCase):
+    def setUp(self):
+        Carrera.objects.create(clave='ISC', nombre='Ingeniería en Sistemas Computacionales')
+        Carrera.objects.create(clave='ILOG', nombre='Ingeniería en Logística')
+
+    def test_resuelve_con_una_consulta_por_modelo(self):
+        resolutor = ResolutorRelaciones()
+        serie = pd.Series([' isc ', 'ingeniería en logística', 'Ingenieria en Logistica', 'Arquitectura', 'ISC'])
+        # Claves de búsqueda en una consulta y solo las instancias resueltas en otra
+        with self.assertNumQueries(2):
+            instancias = resolutor.resolver_columna('carrera', Carrera, serie, np.zeros(len(serie), dtype=bool))
+        self.assertEqual(
+            [getattr(instancia, 'clave', None) for instancia in instancias],
+            ['ISC', 'ILOG', 'ILOG', None, 'ISC']
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(resolutor.resolver('carrera', Carrera, 'isc').clave, 'ISC')
+
+        self.assertEqual(
+            resolutor.estadisticas['carrera'],
+            {'exactos': 4, 'aproximados': 1, 'fallidos': 1}
+        )
+
+
+class CoercionColumnasTestCase(SimpleTestCase):
+    def test_convierte_columnas_y_marca_errores_por_fila(self):
+        col_indices = {'promedio': 0, 'semestre': 1, 'fecha_nacimiento': 2, 'sexo': 3}
+        campos = {campo: Alumno._meta.get_field(campo) for campo in col_indices}
+        filas = [
+            [8.3, '3', '2001-03-15T00:00:00', 'm'],
+            ['9.999', 4.7, '15/03/2001', ' F '],
+            ['abc', 1, None, 'M'],
+            [7, 2, 'no es fecha', 'X'],
+        ]
+        lote = CoercionColumnas(campos, col_indices, ResolutorRelaciones()).convertir(filas)
+
+        self.assertEqual(lote.datos_fila(0), {
+            'promedio': Decimal('8.30'), 'semestre': 3,
+            'fecha_nacimiento': date(2001, 3, 15), 'sexo': 'M',
+        })
+        self.assertEqual(lote.datos_fila(1)['promedio'], Decimal('9.99'))
+        self.assertEqual(lote.datos_fila(1)['semestre'], 4)
+        self.assertEqual(lote.datos_fila(1)['fecha_nacimiento'], date(2001, 3, 15))
+        self.assertEqual(lote.datos_fila(1)['sexo'], 'F')
+        self.assertEqual(lote.errores[:2], [None, None])
+        self.assertIn("'promedio'", lote.errores[2])
+        self.assertIn("'fecha_nacimiento'", lote.errores[3])
+
+    def test_numeros_fuera_de_rango_son_invalidos(self):
+        col_indices = {'promedio': 0, 'semestre': 1}
+        campos = {campo: Alumno._meta.get_field(campo) for campo in col_indices}
+        filas = [
+            [999.99, 1],
+            [1000, 1],
+            ['inf', 1],
+            [8, 1e19],
+            [8, '-inf'],
+        ]
+        lote = CoercionColumnas(campos, col_indices, ResolutorRelaciones()).convertir(filas)
+
+        self.assertEqual(lote.datos_fila(0), {'promedio': Decimal('999.99'), 'semestre': 1})
+        for i in (1, 2):
+            self.assertIn("'promedio'", lote.errores[i])
+        for i in (3, 4):
+            self.assertIn("'semestre'", lote.errores[i])
+
+
+    def test_decimales_se_truncan_sin_redondear(self):
+        col_indices = {'promedio': 0}
+        campos = {'promedio': Alumno._meta.get_field('promedio')}
+        filas = [[5.9999999], ['5.999999999999999999'], ['-0.019'], ['123.456789012345678901']]
+        lote = CoercionColumnas(campos, col_indices, ResolutorRelaciones()).convertir(filas)
+
+        self.assertEqual(
+            [lote.datos_fila(i)['promedio'] for i in range(4)],
+            [Decimal('5.99'), Decimal('5.99'), Decimal('-0.01'), Decimal('123.45')]
+        )
+        self.assertEqual(lote.errores, [None] * 4)
+
+
+class LecturaExcelTestCase(SimpleTestCase):
+    def setUp(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = 'Hoja1'
+        ws['A1'] = 'Carrera'
+        ws.merge_cells('A1:A4')
+        ws['B2'], ws['C2'] = 'MAT001', 'Cálculo'
+        ws['B3'], ws['C3'] = 'MAT002', 'Álgebra'
+        ws['E1'] = 'Fuera del rango'
+        ws.merge_cells('E1:F4')
+        archivo = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+        archivo.close()
+        wb.save(archivo.name)
+        self.ruta = archivo.name
+        self.addCleanup(os.remove, self.ruta)
+
+    def test_expande_solo_combinadas_que_cruzan_el_rango(self):
+        filas = iterar_rango_excel(self.ruta, 'Hoja1', 'A2:C3')
+        self.assertNotIsInstance(filas, list)
+        self.assertEqual(list(filas), [
+            ['Carrera', 'MAT001', 'Cálculo'],
+            ['Carrera', 'MAT002', 'Álgebra'],
+        ])
+
+    def test_combinadas_sin_api_interna_de_openpyxl(self):
+        with mock.patch('excel_importer.lectura._fuente_xml', return_value=None):
+            self.assertEqual(leer_rango_excel(self.ruta, 'Hoja1', 'A2:C3'), [
+                ['Carrera', 'MAT001', 'Cálculo'],
+                ['Carrera', 'MAT002', 'Álgebra'],
+            ])
+
+    def test_hoja_inexistente(self):
+        with self.assertRaises(ValueError):
+            leer_rango_excel(self.ruta, 'Otra', 'A1:B2')
+
+
+class IngestaLibrosTestCase(SimpleTestCase):
+    def setUp(self):
+        wb = openpyxl.Workbook()
+        portada = wb.active
+        portada.title = 'Portada'
+        portada.append(['INSTITUTO TECNOLÓGICO'])
+        reticula = wb.create_sheet('RETICULA')
+        reticula.append(['CARRERA', 'INGENIERÍA QUÍMICA'])
+        reticula.append([])
+        reticula.append(['SEMESTRE', 'CLAVE ', 'NOMBRE DE LA MATERIA', 'CRED'])
+        reticula.append(['PRIMERO', ' ACA-0907 ', 'TALLER DE ÉTICA', 4])
+        reticula.append([])
+        reticula.append(['PRIMERO', 'ACC-0906', 'FUNDAMENTOS DE INVESTIGACIÓN', ''])
+        archivo = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+        archivo.close()
+        wb.save(archivo.name)
+        self.ruta = archivo.name
+        self.addCleanup(os.remove, self.ruta)
+
+    def test_normaliza_hojas_leidas_en_paralelo(self):
+        hojas = list(iterar_hojas([self.ruta], procesos=2, en_orden=True))
+        self.assertEqual([h.hoja for h in hojas], ['Portada', 'RETICULA'])
+
+        reticula = hojas[1]
+        self.assertEqual(reticula.fila_encabezado, 1)
+        self.assertEqual(reticula.encabezados, ['CARRERA', 'INGENIERÍA QUÍMICA', 'Unnamed: 2', 'Unnamed: 3'])
+
+    def test_busca_fila_de_encabezados_requeridos(self):
+        hojas = list(iterar_hojas([self.ruta], encabezados_requeridos=['clave', 'Nombre de la materia'], procesos=1))
+        self.assertEqual(len(hojas), 1)
+        hoja = hojas[0]
+        self.assertEqual(hoja.fila_encabezado, 3)
+        self.assertEqual(hoja.columna('CLAVE'), 1)
+        self.assertEqual(hoja.filas, [
+            (4, ['PRIMERO', 'ACA-0907', 'TALLER DE ÉTICA', 4]),
+            (6, ['PRIMERO', 'ACC-0906', 'FUNDAMENTOS DE INVESTIGACIÓN', None]),
+        ])
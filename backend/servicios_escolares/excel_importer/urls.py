@@ -1,7 +1,14 @@
 from django.urls import path
-from .views import importar_excel, importar_modelo
+from .views import (
+    importar_excel, importar_modelo, estado_importacion, progreso_importacion, errores_importacion,
+    ejecutar_importacion,
+)
 
 urlpatterns = [
     path('', importar_excel, name='importar_excel'),
     path('importar/<int:pk>/', importar_modelo, name='importar_modelo'),
+    path('importaciones/<int:importacion_id>/', estado_importacion, name='estado_importacion'),
+    path('importaciones/<int:importacion_id>/progreso/', progreso_importacion, name='progreso_importacion'),
+    path('importaciones/<int:importacion_id>/ejecutar/', ejecutar_importacion, name='ejecutar_importacion'),
+    path('importaciones/<int:importacion_id>/errores.csv', errores_importacion, name='errores_importacion'),
 ]
@@ -1,37 +1,167 @@
-from django.db.models import ForeignKey
-from difflib import get_close_matches
+from collections import Counter, defaultdict
+from datetime import datetime, date
+from decimal import Decimal
+from difflib import SequenceMatcher
 
 # Campos comunes a buscar en modelos relacionados
 FK_LOOKUP_FIELDS = ['clave', 'nombre', 'codigo']
 
-def obtener_instancia_relacionada(modelo_relacionado, valor_excel):
-    valor = str(valor_excel).strip()
+# Umbral de similitud para la búsqueda aproximada (igual que get_close_matches)
+FK_SIMILITUD_MINIMA = 0.85
+# Candidatos (por n-gramas compartidos) que se comparan con SequenceMatcher
+FK_MAX_CANDIDATOS = 25
 
-    # Filtrar solo campos que realmente existen en el modelo
-    campos_modelo = [f.name for f in modelo_relacionado._meta.get_fields()]
-    campos_a_buscar = [campo for campo in FK_LOOKUP_FIELDS if campo in campos_modelo]
-
-    # Buscar coincidencia exacta solo en campos válidos
-    for campo in campos_a_buscar:
+def json_safe(v):
+    """Convierte el valor de una celda a algo serializable en JSON."""
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        try:
+            return float(v)
+        except Exception:
+            return str(v)
+    if isinstance(v, bytes):
         try:
-            instancia = modelo_relacionado.objects.get(**{f"{campo}__iexact": valor})
-            return instancia
-        except modelo_relacionado.DoesNotExist:
-            print(f"No existe {modelo_relacionado.__name__} con {campo} = '{valor}'")
-            continue
-
-
-    # Búsqueda por similitud (opcional)
-    posibles = []
-    for campo in campos_a_buscar:
-        posibles += list(modelo_relacionado.objects.values_list(campo, flat=True))
-
-    coincidencias = get_close_matches(valor, [str(x) for x in posibles], n=1, cutoff=0.85)
-    if coincidencias:
-        for campo in campos_a_buscar:
-            try:
-                return modelo_relacionado.objects.get(**{f"{campo}__iexact": coincidencias[0]})
-            except modelo_relacionado.DoesNotExist:
+            return v.decode('utf-8', errors='ignore')
+        except Exception:
+            return str(v)
+    return v
+
+
+def normalizar_clave(valor):
+    """Normaliza un valor para comparaciones equivalentes a ``__iexact``."""
+    return str(valor).strip().casefold()
+
+
+def _trigramas(texto):
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceRelacion:
+    """
+    Claves de búsqueda (clave/nombre/codigo) de un modelo relacionado,
+    cargadas con una sola consulta y normalizadas en diccionarios de
+    clave -> pk. Las instancias se cargan solo para los pks que se resuelven.
+    """
+
+    def __init__(self, modelo_relacionado):
+        self.modelo = modelo_relacionado
+        campos_modelo = [f.name for f in modelo_relacionado._meta.get_fields()]
+        self.campos = [campo for campo in FK_LOOKUP_FIELDS if campo in campos_modelo]
+        # Un diccionario por campo, en el mismo orden de prioridad que FK_LOOKUP_FIELDS
+        self.exactos = {campo: {} for campo in self.campos}
+        ambiguos = {campo: set() for campo in self.campos}
+        self.cargadas = {}
+        self.ngramas = defaultdict(set)
+
+        if not self.campos:
+            return
+
+        filas = modelo_relacionado.objects.order_by().values_list('pk', *self.campos)
+        for pk, *valores in filas.iterator(chunk_size=2000):
+            for campo, valor in zip(self.campos, valores):
+                if valor in (None, ''):
+                    continue
+                clave = normalizar_clave(valor)
+                if clave in self.exactos[campo] and self.exactos[campo][clave] != pk:
+                    ambiguos[campo].add(clave)
+                self.exactos[campo][clave] = pk
+
+        # Un valor repetido en un campo no identifica una sola instancia
+        for campo, claves in ambiguos.items():
+            for clave in claves:
+                self.exactos[campo].pop(clave, None)
+
+        for campo in self.campos:
+            for clave in self.exactos[campo]:
+                for ngrama in _trigramas(clave):
+                    self.ngramas[ngrama].add(clave)
+
+    def buscar_exacto(self, clave):
+        for campo in self.campos:
+            pk = self.exactos[campo].get(clave)
+            if pk is not None:
+                return pk
+        return None
+
+    def buscar_aproximado(self, clave):
+        """Compara solo contra los valores que comparten más n-gramas con ``clave``."""
+        votos = Counter()
+        for ngrama in _trigramas(clave):
+            votos.update(self.ngramas.get(ngrama, ()))
+        mejor, mejor_ratio = None, FK_SIMILITUD_MINIMA
+        for candidato, _ in votos.most_common(FK_MAX_CANDIDATOS):
+            matcher = SequenceMatcher(None, clave, candidato)
+            if matcher.real_quick_ratio() < mejor_ratio or matcher.quick_ratio() < mejor_ratio:
                 continue
+            ratio = matcher.ratio()
+            if ratio >= mejor_ratio:
+                mejor, mejor_ratio = candidato, ratio
+        return self.buscar_exacto(mejor) if mejor is not None else None
+
+    def instancias(self, pks):
+        """{pk: instancia} con ``in_bulk``; solo se consultan los pks aún no cargados."""
+        faltantes = [pk for pk in set(pks) if pk is not None and pk not in self.cargadas]
+        if faltantes:
+            self.cargadas.update(self.modelo.objects.in_bulk(faltantes))
+        return self.cargadas
+
+
+class ResolutorRelaciones:
+    """
+    Resuelve celdas de Excel a instancias relacionadas durante una importación.
+
+    Cada modelo relacionado se indexa una sola vez, los resultados se
+    memorizan por valor de celda y se cuentan aciertos/fallos por columna
+    en ``estadisticas``.
+    """
+
+    def __init__(self):
+        self.indices = {}
+        self.memo = {}
+        self.estadisticas = defaultdict(lambda: {'exactos': 0, 'aproximados': 0, 'fallidos': 0})
+
+    def indice(self, modelo_relacionado):
+        if modelo_relacionado not in self.indices:
+            self.indices[modelo_relacionado] = IndiceRelacion(modelo_relacionado)
+        return self.indices[modelo_relacionado]
+
+    def _buscar(self, modelo_relacionado, clave):
+        memo_key = (modelo_relacionado, clave)
+        if memo_key not in self.memo:
+            indice = self.indice(modelo_relacionado)
+            pk = indice.buscar_exacto(clave)
+            tipo = 'exactos'
+            if pk is None:
+                pk = indice.buscar_aproximado(clave)
+                tipo = 'aproximados' if pk is not None else 'fallidos'
+            self.memo[memo_key] = (pk, tipo)
+        return self.memo[memo_key]
+
+    def resolver(self, campo, modelo_relacionado, valor_excel):
+        pk, tipo = self._buscar(modelo_relacionado, normalizar_clave(valor_excel))
+        self.estadisticas[campo][tipo] += 1
+        return self.indice(modelo_relacionado).instancias([pk]).get(pk)
+
+    def resolver_columna(self, campo, modelo_relacionado, serie, vacio):
+        """
+        Resuelve una columna completa (``pandas.Series``): cada valor distinto
+        se busca una sola vez. Las celdas vacías (``vacio``) quedan en None.
+        """
+        claves = serie.map(normalizar_clave, na_action='ignore')
+        resueltos = {}
+        for clave, veces in claves[~vacio].value_counts().items():
+            pk, tipo = self._buscar(modelo_relacionado, clave)
+            resueltos[clave] = pk
+            self.estadisticas[campo][tipo] += int(veces)
+        instancias = self.indice(modelo_relacionado).instancias(resueltos.values())
+        return [None if v else instancias.get(resueltos.get(c)) for c, v in zip(claves.tolist(), vacio)]
 
-    return None
+    def resumen(self):
+        """Texto por columna con los contadores de resolución."""
+        return [
+            f"FK '{campo}': {datos['exactos']} exactas, {datos['aproximados']} aproximadas, "
+            f"{datos['fallidos']} sin resolver."
+            for campo, datos in self.estadisticas.items()
+        ]
@@ -22,6 +22,7 @@ from docx.oxml.ns import qn
 from docx.shared import RGBColor, Pt, Cm
 from docsbuilder.models import Plantilla
 from docsbuilder.utils import armar_contexto_para_alumno
+from servicios_escolares.cache_etiquetas import en_cache, registrar_etiquetas
 from collections import defaultdict
 from datetime import datetime
 from io import BytesIO
@@ -346,12 +347,11 @@ def descargar_kardex(request, matricula):
     if not plantilla:
         return HttpResponse("No hay plantilla de Kardex configurada.", status=404)
 
-    # Obtener materias de la carrera del alumno usando la nueva relación
-    from datos_academicos.models import MateriaCarrera
-    materias_carrera_relaciones = MateriaCarrera.objects.filter(carrera=alumno.carrera).select_related('materia').order_by('semestre', 'materia__clave')
-    
-    # Obtener todas las materias universales
-    materias_universales = Materia.objects.filter(es_universal=True).order_by('clave')
+    # Plan de la carrera del alumno (por semestre y clave) y materias universales
+    from datos_academicos.plan_curricular import indice_curricular
+    indice = indice_curricular()
+    materias_carrera_relaciones = indice.plan(alumno.carrera_id)
+    materias_universales = indice.universales()
     
     # Obtener todas las calificaciones del alumno (incluyendo de otras carreras)
     califs = Calificacion.objects.filter(alumno=alumno).order_by('-fecha_registro')
@@ -367,7 +367,7 @@ def descargar_kardex(request, matricula):
         "creditos_totales": alumno.creditos_totales,
         "carrera": alumno.carrera.nombre,
         "plan_estudio": alumno.plan_estudio.clave if alumno.plan_estudio else '',
-        "PROMEDIO": alumno.calcular_promedio(incluir_todas=False),  # Solo materias que cuentan para promedio
+        "PROMEDIO": float(alumno.promedio),  # Solo materias que cuentan para promedio (ver agregados.py)
         "fecha_emision": datetime.now().strftime('%d/%m/%Y'),
     }
 
@@ -422,12 +422,12 @@ def descargar_kardex(request, matricula):
             materias_universales_list.append(materia)
     
     # Agregar materias de otras carreras que el alumno haya cursado
-    materias_otras_carreras = []
-    for calif_id in materias_con_calificacion:
-        materia = Materia.objects.get(id=calif_id)
-        # Si la materia no pertenece a la carrera del alumno (no existe relación MateriaCarrera)
-        if not MateriaCarrera.objects.filter(materia=materia, carrera=alumno.carrera).exists():
-            materias_otras_carreras.append(materia)
+    # (las que no están en el plan de su carrera)
+    materias_otras_carreras = sorted(
+        (indice.materias[materia_id] for materia_id in materias_con_calificacion
+         if materia_id in indice.materias and not indice.pertenece(materia_id, alumno.carrera_id)),
+        key=lambda materia: materia.clave,
+    )
 
     p_element = p._element
 
@@ -573,22 +573,9 @@ def descargar_kardex(request, matricula):
 
 # Auxiliar
 def actualizar_creditos_alumno(alumno):
-    # Obtener materias a través de la relación MateriaCarrera
-    materias_carrera = MateriaCarrera.objects.filter(carrera=alumno.carrera).select_related('materia')
-    materias = [mc.materia for mc in materias_carrera]
-    
-    califs = Calificacion.objects.filter(alumno=alumno)
-    calif_dict = {c.materia_id: c for c in califs}
-
-    total = sum(m.creditos for m in materias)
-    aprobados = sum(
-        m.creditos for m in materias
-        if (c := calif_dict.get(m.id)) and c.calificacion and float(c.calificacion) >= 6.0
-    )
-
-    alumno.creditos_totales = total
-    alumno.creditos_aprobados = aprobados
-    alumno.save(update_fields=['creditos_totales', 'creditos_aprobados'])
+    # Mismas reglas que los agregados del alumno (datos_academicos/agregados.py):
+    # materias de su carrera, calificación aprobatoria y cuenta_promedio
+    alumno.actualizar_datos_academicos()
 
 class ProcesoListView(LoginRequiredMixin, ListView):
     model = Proceso
@@ -604,60 +591,57 @@ class ProcesoListView(LoginRequiredMixin, ListView):
         context['segment'] = 'procesos'
         return context
 
-@login_required
-def dashboard_tramites(request):
-    """Vista del dashboard de trámites con KPIs, gráficos y acciones principales"""
-    
-    # KPIs de trámites
-    total_tramites = Tramite.objects.count()
-    tramites_pendientes = Tramite.objects.filter(estado='En proceso').count()
-    tramites_completados = Tramite.objects.filter(estado='Completado').count()
-    tramites_rechazados = Tramite.objects.filter(estado='Rechazado').count()
+
+ETIQUETAS_TABLERO_TRAMITES = registrar_etiquetas(Tramite, Proceso)
+
+
+def _kpis_tramites():
+    """KPIs de trámites por estado y tipo, y procesos activos, en cuatro consultas."""
+    resumen = Tramite.objects.order_by().aggregate(
+        total=Count('id'),
+        pendientes=Count('id', filter=Q(estado='En proceso')),
+        completados=Count('id', filter=Q(estado='Completado')),
+        rechazados=Count('id', filter=Q(estado='Rechazado')),
+    )
+    total_tramites = resumen['total']
     
     # Calcular porcentajes
-    porcentaje_completados = (tramites_completados / total_tramites * 100) if total_tramites > 0 else 0
-    porcentaje_pendientes = (tramites_pendientes / total_tramites * 100) if total_tramites > 0 else 0
+    porcentaje_completados = (resumen['completados'] / total_tramites * 100) if total_tramites > 0 else 0
+    porcentaje_pendientes = (resumen['pendientes'] / total_tramites * 100) if total_tramites > 0 else 0
     
-    # Datos para gráfico de trámites por tipo
-    datos_tipos = (
-        Tramite.objects
-        .values('tipo')
-        .annotate(cantidad=Count('id'))
-        .order_by('-cantidad')
-    )
-    tipos_tramites = [item['tipo'] for item in datos_tipos]
-    cantidades_tipos = [item['cantidad'] for item in datos_tipos]
+    # Datos para gráficos de trámites por tipo y por estado
+    datos_tipos = list(Tramite.objects.values('tipo').annotate(cantidad=Count('id')).order_by('-cantidad'))
+    datos_estados = list(Tramite.objects.values('estado').annotate(cantidad=Count('id')).order_by('-cantidad'))
     
-    # Datos para gráfico de trámites por estado
-    datos_estados = (
-        Tramite.objects
-        .values('estado')
-        .annotate(cantidad=Count('id'))
-        .order_by('-cantidad')
-    )
-    estados_tramites = [item['estado'] for item in datos_estados]
-    cantidades_estados = [item['cantidad'] for item in datos_estados]
+    return {
+        'total_tramites': total_tramites,
+        'tramites_pendientes': resumen['pendientes'],
+        'tramites_completados': resumen['completados'],
+        'tramites_rechazados': resumen['rechazados'],
+        'porcentaje_completados': round(porcentaje_completados, 1),
+        'porcentaje_pendientes': round(porcentaje_pendientes, 1),
+        'tipos_tramites': [item['tipo'] for item in datos_tipos],
+        'cantidades_tipos': [item['cantidad'] for item in datos_tipos],
+        'estados_tramites': [item['estado'] for item in datos_estados],
+        'cantidades_estados': [item['cantidad'] for item in datos_estados],
+        'procesos_activos': Proceso.objects.filter(activo=True).count(),
+    }
+
+
+@login_required
+def dashboard_tramites(request):
+    """Vista del dashboard de trámites con KPIs, gráficos y acciones principales"""
+    
+    # KPIs y gráficas: en caché hasta que cambie un trámite o un proceso
+    kpis = en_cache('tablero:tramites', ETIQUETAS_TABLERO_TRAMITES, _kpis_tramites)
     
     # Trámites recientes (últimos 10)
     tramites_recientes = Tramite.objects.order_by('-fecha_solicitud')[:10]
     
-    # Procesos activos
-    procesos_activos = Proceso.objects.filter(activo=True).count()
-    
     context = {
         'segment': 'dashboard_tramites',
-        'total_tramites': total_tramites,
-        'tramites_pendientes': tramites_pendientes,
-        'tramites_completados': tramites_completados,
-        'tramites_rechazados': tramites_rechazados,
-        'porcentaje_completados': round(porcentaje_completados, 1),
-        'porcentaje_pendientes': round(porcentaje_pendientes, 1),
-        'tipos_tramites': tipos_tramites,
-        'cantidades_tipos': cantidades_tipos,
-        'estados_tramites': estados_tramites,
-        'cantidades_estados': cantidades_estados,
+        **kpis,
         'tramites_recientes': tramites_recientes,
-        'procesos_activos': procesos_activos,
     }
     
     return render(request, 'procedimientos/dashboard_tramites.html', context)
@@ -6,6 +6,7 @@ from django.conf import settings
 from .models import Residencia, ResidenciaBitacoraEntry, Tramite, Bitacora
 from .forms import ActaResidenciaForm, ResidenciaForm
 from datos_academicos.models import Alumno, PeriodoEscolar
+from excel_importer.ingesta import iterar_hojas
 from docxtpl import DocxTemplate
 from docx2pdf import convert
 import pythoncom
@@ -43,13 +44,15 @@ def _buscar_col(cols, opciones):
 
 
 def _parse_residencias_desde_excel(path_excel):
-    xls = pd.ExcelFile(path_excel)
     creados = 0
     actualizados = 0
     entradas_bitacora = 0
 
-    for sheet_name in xls.sheet_names:
-        df = xls.parse(sheet_name)
+    # Las hojas se leen en paralelo; la escritura sigue aquí, en un solo proceso y en
+    # el orden del libro (la bitácora busca residencias de hojas anteriores)
+    for hoja in iterar_hojas([path_excel], en_orden=True):
+        sheet_name = hoja.hoja
+        df = hoja.como_dataframe()
         if df.empty:
             continue
 
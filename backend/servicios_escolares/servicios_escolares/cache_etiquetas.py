@@ -0,0 +1,160 @@
+"""
+Caché de cálculos de tableros y KPIs, etiquetada por modelo.
+
+Los tableros vuelven a contar todo en cada visita aunque los datos cambian
+mucho menos de lo que el personal refresca la página. ``en_cache`` guarda el
+resultado de un cálculo junto con la versión de cada etiqueta de la que
+depende (el ``label_lower`` del modelo: ``'datos_academicos.alumno'``,
+``'admision.solicitudadmision'``; se pueden pasar las clases):
+
+    kpis = en_cache('tablero:admision', [SolicitudAdmision, FichaAdmision], calcular_kpis)
+
+Guardar o borrar una instancia sube la versión de la etiqueta de su modelo
+(receptores ``post_save``/``post_delete`` de este módulo, conectados en
+``DatosAcademicosConfig.ready``) y las entradas que dependían de ella dejan
+de valer. Para no tocar la caché en cada ``save()`` de cualquier modelo, los
+receptores solo invalidan las etiquetas registradas en el proceso: las que
+ha usado ``en_cache`` o se declararon con ``registrar_etiquetas`` al importar
+el módulo del tablero. Lo que escribe sin señales (``bulk_create``,
+``QuerySet.update``) llama a ``invalidar_modelo``, que invalida siempre;
+``audit.bulk`` ya lo hace. Invalidar una etiqueta que ningún cálculo ha
+leído no escribe nada.
+
+Protección contra estampidas: cuando una entrada vence o se invalida, solo el
+proceso que toma el candado (``cache.add``) la recalcula; los demás siguen
+sirviendo el valor anterior mientras tanto, o esperan un momento si aún no
+hay ninguno. Las entradas viven en la caché el doble de su vigencia para
+tener ese valor anterior a mano.
+
+Funciona con cualquier backend de ``CACHES`` (``settings.CACHE_BACKEND``):
+en memoria o en archivos en desarrollo, Redis o Memcached en producción.
+Con ``LocMemCache`` cada proceso tiene su propia caché y no ve las
+invalidaciones de los demás: ahí, como con la invalidación que ocurre antes
+de confirmar la transacción o un ``save()`` en un proceso que no registró la
+etiqueta (un comando de gestión), el dato puede quedar atrasado hasta
+``CACHE_TABLEROS_TTL`` segundos.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = 'tableros'
+
+# Segundos que un proceso puede tener el candado de recálculo
+DURACION_CANDADO = 30
+
+# Espera máxima (y paso) de quien no tiene valor anterior mientras otro recalcula
+ESPERA_MAXIMA = 5.0
+PASO_ESPERA = 0.05
+
+# Etiquetas de las que depende algún cálculo en caché (en este proceso)
+_registradas = set()
+
+
+def ttl():
+    return getattr(settings, 'CACHE_TABLEROS_TTL', 120)
+
+
+def etiqueta_de(modelo):
+    # label_lower: dos apps pueden tener un modelo con el mismo nombre (Tramite)
+    return modelo._meta.concrete_model._meta.label_lower
+
+
+def registrar_etiquetas(*etiquetas):
+    """
+    Registra ``etiquetas`` (modelos o ``'app.modelo'``) para que los
+    receptores de señales las invaliden. Devuelve la lista de etiquetas.
+    """
+    nombres = [etiqueta if isinstance(etiqueta, str) else etiqueta_de(etiqueta) for etiqueta in etiquetas]
+    _registradas.update(nombres)
+    return nombres
+
+
+def _clave_etiqueta(etiqueta):
+    return f"{PREFIJO}:etiqueta:{etiqueta}"
+
+
+def _clave_valor(clave):
+    return f"{PREFIJO}:valor:{clave}"
+
+
+def _clave_candado(clave):
+    return f"{PREFIJO}:candado:{clave}"
+
+
+def versiones(etiquetas):
+    """{etiqueta: versión}; las que no existen se crean en 1 sin pisar las de otro proceso."""
+    claves = {_clave_etiqueta(etiqueta): etiqueta for etiqueta in etiquetas}
+    actuales = cache.get_many(list(claves))
+    faltantes = [clave for clave in claves if clave not in actuales]
+    if faltantes:
+        for clave in faltantes:
+            cache.add(clave, 1, timeout=None)
+        actuales.update(cache.get_many(faltantes))
+    return {etiqueta: actuales.get(clave, 1) for clave, etiqueta in claves.items()}
+
+
+def en_cache(clave, etiquetas, calcular, vigencia=None):
+    """
+    Valor de ``calcular()`` guardado bajo ``clave``. Se recalcula cuando
+    pasan ``vigencia`` segundos (por defecto ``CACHE_TABLEROS_TTL``) o se
+    invalida alguna de ``etiquetas`` (modelos o ``'app.modelo'``). El valor debe poder serializarse con
+    pickle (listas y diccionarios, no querysets sin evaluar).
+    """
+    vigencia = vigencia or ttl()
+    actuales = versiones(registrar_etiquetas(*etiquetas))
+    entrada = cache.get(_clave_valor(clave))
+    if entrada is not None:
+        guardadas, vence, valor = entrada
+        if guardadas == actuales and vence > time.time():
+            return valor
+
+    if cache.add(_clave_candado(clave), 1, timeout=DURACION_CANDADO):
+        try:
+            valor = calcular()
+            cache.set(_clave_valor(clave), (actuales, time.time() + vigencia, valor), timeout=vigencia * 2)
+            return valor
+        finally:
+            cache.delete(_clave_candado(clave))
+
+    # Otro proceso está recalculando
+    if entrada is not None:
+        return entrada[2]
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < limite:
+        time.sleep(PASO_ESPERA)
+        entrada = cache.get(_clave_valor(clave))
+        if entrada is not None:
+            return entrada[2]
+    logger.warning(f"Cálculo en caché '{clave}' sin respuesta de otro proceso; se calcula sin candado")
+    return calcular()
+
+
+def invalidar(*etiquetas):
+    """Sube la versión de ``etiquetas``; las entradas que dependían de ellas se recalculan."""
+    for etiqueta in etiquetas:
+        try:
+            cache.incr(_clave_etiqueta(etiqueta))
+        except ValueError:
+            # Nadie ha leído esta etiqueta (o la caché la descartó): no hay entradas que dependan de ella
+            pass
+
+
+def invalidar_modelo(modelo):
+    invalidar(etiqueta_de(modelo))
+
+
+@receiver(post_save, dispatch_uid='cache_etiquetas_post_save')
+@receiver(post_delete, dispatch_uid='cache_etiquetas_post_delete')
+def invalidar_por_cambio(sender, raw=False, **kwargs):
+    if raw:
+        return
+    etiqueta = etiqueta_de(sender)
+    if etiqueta in _registradas:
+        invalidar(etiqueta)
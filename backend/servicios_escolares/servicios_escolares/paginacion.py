@@ -0,0 +1,162 @@
+"""
+Paginación por cursor (keyset) para las APIs JSON.
+
+En lugar de ``OFFSET``/``COUNT`` la página siguiente se pide con los valores
+de orden de la última fila entregada:
+
+    WHERE (created_at, id) < (:ultimo_created_at, :ultimo_id)
+    ORDER BY created_at DESC, id DESC LIMIT :n
+
+así la página 500 cuesta lo mismo que la primera si hay un índice con esas
+columnas. El cursor que ve el cliente es opaco (JSON en base64).
+
+El orden debe terminar en una columna única (normalmente ``id``) y sus
+columnas no deben admitir NULL.
+
+Sin ``COUNT(*)`` por página, el total es opcional (``?total=exacto`` o
+``?total=estimado``, ver ``totales``). ``PaginacionPorCursor`` aplica lo mismo
+a los ViewSets de DRF cuando el request trae ``cursor``.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+TAMANO_MAXIMO = 200
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+class _CodificadorCursor(DjangoJSONEncoder):
+    # DjangoJSONEncoder recorta a milisegundos; el cursor necesita el valor exacto
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def codificar_cursor(valores):
+    datos = json.dumps(valores, cls=_CodificadorCursor, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        datos = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = json.loads(datos)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise CursorInvalido('Cursor no válido') from e
+    if not isinstance(valores, list):
+        raise CursorInvalido('Cursor no válido')
+    return valores
+
+
+def _campo(orden):
+    return orden.lstrip('-')
+
+
+def despues_de(orden, valores):
+    """
+    Condición "fila posterior a ``valores``" para ``orden``. Incluye la cota
+    sobre la primera columna para que la BD recorra el índice como rango.
+    """
+    if len(valores) != len(orden):
+        raise CursorInvalido('Cursor no válido')
+    condicion = Q()
+    iguales = Q()
+    for campo, valor in zip(orden, valores):
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= iguales & Q(**{f"{_campo(campo)}__{operador}": valor})
+        iguales &= Q(**{_campo(campo): valor})
+    primero = orden[0]
+    cota = Q(**{f"{_campo(primero)}__{'lte' if primero.startswith('-') else 'gte'}": valores[0]})
+    return cota & condicion
+
+
+def _valor(item, campo):
+    return item[campo] if isinstance(item, dict) else getattr(item, campo)
+
+
+def tamano_pagina(valor, defecto=25):
+    """``page_size`` del request acotado a 1..TAMANO_MAXIMO."""
+    try:
+        tamano = int(valor)
+    except (TypeError, ValueError):
+        return defecto
+    return max(1, min(tamano, TAMANO_MAXIMO))
+
+
+def paginar_por_cursor(queryset, orden, cursor=None, tamano=25):
+    """
+    Devuelve (items, siguiente): hasta ``tamano`` filas de ``queryset``
+    ordenadas por ``orden`` después de ``cursor``, y el cursor de la página
+    siguiente o None si no hay más. Lanza ``CursorInvalido``.
+    """
+    if cursor:
+        try:
+            queryset = queryset.filter(despues_de(orden, decodificar_cursor(cursor)))
+        except (ValidationError, TypeError, ValueError) as e:
+            raise CursorInvalido('Cursor no válido') from e
+    items = list(queryset.order_by(*orden)[:tamano + 1])
+    siguiente = None
+    if len(items) > tamano:
+        items = items[:tamano]
+        siguiente = codificar_cursor([_valor(items[-1], _campo(campo)) for campo in orden])
+    return items, siguiente
+
+
+def total_estimado(queryset):
+    """
+    Filas que estima el planificador de PostgreSQL (``EXPLAIN``, sin recorrer
+    la tabla); en los demás motores, el conteo exacto.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def totales(queryset, modo):
+    """Claves de total para la respuesta según ``?total=``: {'total'}, {'total_estimado'} o {}."""
+    if modo == 'exacto':
+        return {'total': queryset.count()}
+    if modo == 'estimado':
+        return {'total_estimado': total_estimado(queryset)}
+    return {}
+
+
+class PaginacionPorCursor(BasePagination):
+    """
+    Paginación por cursor para los ViewSets. Solo pagina si el request trae
+    ``cursor`` (vacío para la primera página); sin él la lista se devuelve
+    completa como antes. El orden es ``orden_cursor`` de la vista (por
+    defecto ``['id']``).
+    """
+    orden = ['id']
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'cursor' not in request.query_params:
+            return None
+        orden = getattr(view, 'orden_cursor', self.orden)
+        try:
+            items, self.siguiente = paginar_por_cursor(
+                queryset, orden, request.query_params.get('cursor'),
+                tamano_pagina(request.query_params.get('page_size')),
+            )
+        except CursorInvalido:
+            raise ParseError('Cursor no válido')
+        self.totales = totales(queryset, request.query_params.get('total'))
+        return items
+
+    def get_paginated_response(self, data):
+        return Response({'results': data, 'siguiente': self.siguiente, **self.totales})
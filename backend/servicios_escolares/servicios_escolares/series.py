@@ -0,0 +1,135 @@
+"""
+Series de tiempo para las gráficas de los tableros ("registros por día").
+
+``serie_temporal`` cuenta los registros de un queryset por día, semana o mes
+con una sola consulta agrupada por ``Trunc`` (en la zona horaria local) y
+rellena en Python los periodos sin registros:
+
+    serie_temporal(solicitudes, 'fecha_registro', desde, hasta)
+    -> [{'fecha': '2025-03-01', 'count': 4}, {'fecha': '2025-03-02', 'count': 0}, ...]
+
+Las semanas empiezan en lunes y los meses el día 1; la etiqueta de cada
+punto es ese primer día aunque quede antes de ``desde`` (solo se cuentan los
+registros dentro de la ventana).
+
+``SERIES`` registra las series que expone ``api_serie_temporal``
+(``/api/series/<nombre>/``) con los filtros que acepta cada una.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, DateField, DateTimeField
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+GRANULARIDADES = {'dia': 'day', 'semana': 'week', 'mes': 'month'}
+
+DIAS_POR_DEFECTO = 30
+
+# Ventana más larga que acepta la API (unos diez años)
+DIAS_MAXIMOS = 3660
+
+# nombre -> (modelo, campo de fecha, {parámetro GET: lookup})
+SERIES = {
+    'solicitudes_admision': (
+        'admision.models.SolicitudAdmision', 'fecha_registro',
+        {'periodo': 'periodo_id', 'estado': 'estado', 'carrera': 'carrera_interes'},
+    ),
+    'inscripciones': (
+        'datos_academicos.models_inscripcion_nueva.InscripcionNueva', 'creado_en',
+        {'estado': 'estado', 'carrera': 'carrera_solicitada_id'},
+    ),
+    'tramites': (
+        'procedimientos.models.Tramite', 'fecha_solicitud',
+        {'tipo': 'tipo', 'estado': 'estado'},
+    ),
+    'auditoria': (
+        'audit.models.AuditLog', 'created_at',
+        {'action': 'action', 'app_label': 'app_label', 'model_name': 'model_name'},
+    ),
+}
+
+
+def inicio_de_periodo(fecha, granularidad):
+    if granularidad == 'semana':
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == 'mes':
+        return fecha.replace(day=1)
+    return fecha
+
+
+def siguiente_periodo(fecha, granularidad):
+    if granularidad == 'semana':
+        return fecha + timedelta(days=7)
+    if granularidad == 'mes':
+        return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return fecha + timedelta(days=1)
+
+
+def periodos(desde, hasta, granularidad='dia'):
+    """Primer día de cada periodo que toca la ventana [desde, hasta]."""
+    fecha = inicio_de_periodo(desde, granularidad)
+    while fecha <= hasta:
+        yield fecha
+        fecha = siguiente_periodo(fecha, granularidad)
+
+
+def ventana(desde=None, hasta=None, dias=DIAS_POR_DEFECTO):
+    """(desde, hasta) inclusivos; por defecto los últimos ``dias`` días hasta hoy."""
+    hasta = hasta or timezone.localdate()
+    return desde or hasta - timedelta(days=dias - 1), hasta
+
+
+def serie_temporal(queryset, campo, desde, hasta, granularidad='dia'):
+    """
+    Registros de ``queryset`` por periodo entre ``desde`` y ``hasta``
+    (fechas, inclusivas) según ``campo`` (``DateField`` o ``DateTimeField``).
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad no válida: {granularidad}")
+    if isinstance(queryset.model._meta.get_field(campo), DateTimeField):
+        # Límites en hora local para que el filtro use el índice de la columna
+        limites = {
+            f"{campo}__gte": timezone.make_aware(datetime.combine(desde, time.min)),
+            f"{campo}__lt": timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min)),
+        }
+    else:
+        limites = {f"{campo}__gte": desde, f"{campo}__lte": hasta}
+
+    filas = queryset.filter(**limites).order_by().values(
+        inicio_periodo=Trunc(campo, GRANULARIDADES[granularidad], output_field=DateField()),
+    ).annotate(count=Count('pk'))
+    conteos = {fila['inicio_periodo']: fila['count'] for fila in filas}
+    return [
+        {'fecha': fecha.isoformat(), 'count': conteos.get(fecha, 0)} for fecha in periodos(desde, hasta, granularidad)
+    ]
+
+
+def condiciones_de(modelo, lookups, filtros):
+    """
+    {lookup: valor} de los ``filtros`` ({parámetro: texto}) que acepta la
+    serie, convertidos con el campo del modelo. Los parámetros desconocidos
+    se ignoran; un valor que el campo no acepta (``periodo=x``) es ValueError.
+    """
+    condiciones = {}
+    for parametro, valor in (filtros or {}).items():
+        if parametro not in lookups or not valor:
+            continue
+        lookup = lookups[parametro]
+        try:
+            condiciones[lookup] = modelo._meta.get_field(lookup).to_python(valor)
+        except ValidationError:
+            raise ValueError(f"Valor no válido para '{parametro}': {valor}")
+    return condiciones
+
+
+def serie_registrada(nombre, desde, hasta, granularidad='dia', filtros=None):
+    """
+    Serie ``nombre`` de ``SERIES`` filtrada con ``filtros`` (ver
+    ``condiciones_de``).
+    """
+    ruta, campo, lookups = SERIES[nombre]
+    modelo = import_string(ruta)
+    condiciones = condiciones_de(modelo, lookups, filtros)
+    return serie_temporal(modelo.objects.filter(**condiciones), campo, desde, hasta, granularidad)
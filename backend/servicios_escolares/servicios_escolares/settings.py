@@ -200,11 +200,86 @@ CORS_ALLOWED_ORIGINS = [
 
 TAILWIND_APP_NAME = 'theme'
 
+# Importador de Excel: filas por lote en bulk_create (un savepoint por lote)
+EXCEL_IMPORTER_TAMANO_LOTE = int(os.getenv('EXCEL_IMPORTER_TAMANO_LOTE', '500'))
+# Archivos con más filas se importan en segundo plano
+EXCEL_IMPORTER_FILAS_SINCRONAS = int(os.getenv('EXCEL_IMPORTER_FILAS_SINCRONAS', '1000'))
+# 'comando': los procesa `manage.py procesar_importaciones`; 'hilo': pool de hilos en el proceso web.
+# Con 'comando' y sin ese proceso, la página de estado avisa que ningún worker tomó el trabajo
+EXCEL_IMPORTER_WORKER = os.getenv('EXCEL_IMPORTER_WORKER', 'comando')
+# Procesos para leer en paralelo las hojas de un libro completo (vacío: uno por CPU)
+EXCEL_IMPORTER_PROCESOS = int(os.getenv('EXCEL_IMPORTER_PROCESOS', '0')) or None
+
+# Auditoría: solo estos modelos generan AuditLog (opciones en audit/registry.py).
+# Sesiones, content types, staging del importador y bitácoras propias quedan fuera.
+AUDIT_MODELS = {
+    'auth.User': {'excluir': ['password', 'last_login']},
+    'auth.Group': {},
+    'datos_academicos.Alumno': {},
+    'datos_academicos.Calificacion': {},
+    'datos_academicos.Materia': {},
+    'datos_academicos.MateriaCarrera': {},
+    'datos_academicos.Carrera': {},
+    'datos_academicos.PlanEstudio': {},
+    'datos_academicos.PeriodoEscolar': {},
+    'datos_academicos.Grupo': {},
+    'datos_academicos.Docente': {},
+    'datos_academicos.Tramite': {},
+    'procedimientos.Tramite': {},
+    'procedimientos.Residencia': {},
+    'procedimientos.Boleta': {'modo': 'accion'},
+    'procedimientos.ResidenciaBitacoraEntry': {'modo': 'accion'},
+    'admision.PeriodoAdmision': {},
+    'admision.SolicitudAdmision': {},
+    'admision.FichaAdmision': {},
+    'admision.ConfiguracionAdmision': {},
+    'admision.FormularioAdmision': {'modo': 'accion'},
+    'formbuilder.Formulario': {'modo': 'accion'},
+    'docsbuilder.Plantilla': {'modo': 'accion'},
+    'excel_importer.ModeloAutorizado': {},
+}
+# Meses completos de bitácora que se quedan en la tabla; lo anterior se archiva
+# con `manage.py archivar_auditoria` en AUDIT_ARCHIVO_DIR (media/archive/audit)
+AUDIT_RETENCION_MESES = int(os.getenv('AUDIT_RETENCION_MESES', '12'))
+AUDIT_ARCHIVO_DIR = os.getenv('AUDIT_ARCHIVO_DIR') or os.path.join(MEDIA_ROOT, 'archive', 'audit')
+
+# Segundos que un proceso conserva el índice de planes de estudio sin volver a
+# consultarlo aunque no reciba invalidación (datos_academicos.plan_curricular)
+PLAN_CURRICULAR_TTL = int(os.getenv('PLAN_CURRICULAR_TTL', '300'))
+
+# Caché compartida (tableros, índice de planes de estudio). CACHE_BACKEND:
+# locmem (por defecto, una por proceso), file, redis o memcached; en producción
+# con varios workers conviene redis o memcached. CACHE_LOCATION cambia la
+# ubicación por defecto de cada backend.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'servicios-escolares'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION') or _CACHE_BACKENDS[CACHE_BACKEND][1],
+        'KEY_PREFIX': 'servicios_escolares',
+    }
+}
+
+# Segundos que vale un cálculo de tablero en caché si no se invalida antes
+# (servicios_escolares.cache_etiquetas)
+CACHE_TABLEROS_TTL = int(os.getenv('CACHE_TABLEROS_TTL', '120'))
+
 '''
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
 }'''
 
+REST_FRAMEWORK = {
+    # Paginación por cursor cuando el request trae ?cursor= (servicios_escolares/paginacion.py)
+    'DEFAULT_PAGINATION_CLASS': 'servicios_escolares.paginacion.PaginacionPorCursor',
+}
+
 
 #BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
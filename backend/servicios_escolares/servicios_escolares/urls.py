@@ -27,6 +27,7 @@ urlpatterns = [
     path('', views.public_home, name='home_root'),
     path('configuracion/', views.configuracion, name='configuracion'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('api/series/<str:nombre>/', views.api_serie_temporal, name='api_serie_temporal'),
     path('styleguide/', views.styleguide, name='styleguide'),
 
     # Rutas admin
@@ -42,6 +43,7 @@ urlpatterns = [
     path('excel_importer/', include('excel_importer.urls')),
     path('procedimientos/', include('procedimientos.urls')),
     path('admision/', include(('admision.urls', 'admision'), namespace='admision')),
+    path('audit/', include('audit.urls')),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 
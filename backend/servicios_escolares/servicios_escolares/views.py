@@ -1,11 +1,15 @@
 from django.shortcuts import render, redirect
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
-from datos_academicos.models import PeriodoEscolar, Alumno
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET
+from datos_academicos.models import PeriodoEscolar
 from procedimientos.models import Tramite
-from django.db.models import Count
 from .utils import obtener_periodo_activo, necesita_crear_periodo
 from .forms import PeriodoEscolarForm
+from .cache_etiquetas import en_cache
+from datos_academicos.estadisticas import ETIQUETAS_TABLERO_GENERAL, kpis_tablero_general
+from .series import DIAS_MAXIMOS, GRANULARIDADES, SERIES, serie_registrada, ventana
 from django.contrib import messages
 from django.conf import settings
 
@@ -21,56 +25,23 @@ def styleguide(request):
 
 @login_required
 def dashboard(request):
-    # KPIs
-    alumnos_inscritos = Alumno.objects.filter(estatus='Inscrito').count()
+    # KPIs y gráficas: en caché hasta que cambie un alumno, una carrera o un trámite
+    kpis = en_cache('tablero:general', ETIQUETAS_TABLERO_GENERAL, kpis_tablero_general)
     variacion_alumnos = 5  # Ejemplo, calcula real según tu lógica
-
-    tramites_en_curso = Tramite.objects.filter(estado='En proceso').count()
     variacion_tramites = -3  # Ejemplo
-
-    egresados = Alumno.objects.filter(estatus='Titulado').count()
     variacion_egresados = 2
-
-    certificados_emitidos = Tramite.objects.filter(tipo='certificado').count()
     variacion_certificados = 7
 
-    # Datos para gráfico alumnos por carrera
-    datos_carreras = (
-        Alumno.objects
-        .values('carrera__nombre')
-        .annotate(cantidad=Count('id'))
-        .order_by('-cantidad')
-    )
-    carreras = [item['carrera__nombre'] for item in datos_carreras]
-    cantidades_carreras = [item['cantidad'] for item in datos_carreras]
-
-    # Datos para gráfico trámites por tipo
-    datos_tramites = (
-        Tramite.objects
-        .values('tipo')
-        .annotate(cantidad=Count('id'))
-        .order_by('-cantidad')
-    )
-    tramites_tipos = [item['tipo'] for item in datos_tramites]
-    tramites_cantidades = [item['cantidad'] for item in datos_tramites]
-
     # Trámites recientes
     tramites_recientes = Tramite.objects.order_by('-fecha_solicitud')[:5]
 
     context = {
         'segment': 'dashboard',
-        'alumnos_inscritos': alumnos_inscritos,
+        **kpis,
         'variacion_alumnos': variacion_alumnos,
-        'tramites_en_curso': tramites_en_curso,
         'variacion_tramites': variacion_tramites,
-        'egresados': egresados,
         'variacion_egresados': variacion_egresados,
-        'certificados_emitidos': certificados_emitidos,
         'variacion_certificados': variacion_certificados,
-        'carreras': carreras,
-        'cantidades_carreras': cantidades_carreras,
-        'tramites_tipos': tramites_tipos,
-        'tramites_cantidades': tramites_cantidades,
         'tramites_recientes': tramites_recientes,
     }
     return render(request, 'datos_academicos/dashboard.html', context)
@@ -113,3 +84,61 @@ def configuracion(request):
     }
     return render(request, 'app/configuracion.html', context)
 
+
+def _es_personal(user):
+    return (
+        user.is_staff or user.is_superuser or
+        user.groups.filter(name__in=['ServiciosEscolares', 'Servicios Escolares']).exists()
+    )
+
+
+def _fecha_parametro(valor):
+    """Fecha AAAA-MM-DD; None si no viene. ValueError si no es una fecha."""
+    if not valor:
+        return None
+    fecha = parse_date(valor)
+    if fecha is None:
+        raise ValueError(valor)
+    return fecha
+
+
+@require_GET
+@login_required
+def api_serie_temporal(request, nombre):
+    """
+    Serie de tiempo ``nombre`` (ver ``series.SERIES``) para las gráficas.
+
+    Parámetros (todos opcionales):
+    - desde / hasta: fechas AAAA-MM-DD (inclusivas); por defecto los últimos 30 días
+    - granularidad: dia | semana | mes
+    - los filtros de la serie (p. ej. periodo y estado en solicitudes_admision)
+    """
+    if not _es_personal(request.user):
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+    if nombre not in SERIES:
+        return JsonResponse({'error': f"Serie desconocida: {nombre}"}, status=404)
+
+    granularidad = request.GET.get('granularidad', 'dia')
+    if granularidad not in GRANULARIDADES:
+        return JsonResponse({'error': f"Granularidad no válida: {granularidad}"}, status=400)
+    try:
+        desde, hasta = ventana(_fecha_parametro(request.GET.get('desde')), _fecha_parametro(request.GET.get('hasta')))
+    except ValueError:
+        return JsonResponse({'error': 'Fecha no válida (AAAA-MM-DD)'}, status=400)
+    if desde > hasta:
+        return JsonResponse({'error': "'desde' es posterior a 'hasta'"}, status=400)
+    if (hasta - desde).days >= DIAS_MAXIMOS:
+        return JsonResponse({'error': f"La ventana no puede pasar de {DIAS_MAXIMOS} días"}, status=400)
+
+    try:
+        puntos = serie_registrada(nombre, desde, hasta, granularidad, filtros=request.GET.dict())
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'serie': nombre,
+        'granularidad': granularidad,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'total': sum(punto['count'] for punto in puntos),
+        'puntos': puntos,
+    })